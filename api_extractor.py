@@ -0,0 +1,266 @@
+"""
+Extracción de la tabla SLIR directamente desde el backend, sin recorrer la tabla en el navegador
+
+La página single-slir es una aplicación Angular/PrimeNG que rellena la tabla con una
+petición JSON. Aquí se reutilizan una vez las cookies/token de un navegador ya
+autenticado y después se piden las páginas de datos con un cliente HTTP con pool de
+conexiones, con páginas grandes y en paralelo.
+
+La URL y los nombres de parámetros del endpoint se configuran con SLIR_API_URL
+(plantilla con {code}) y los argumentos de ClienteApiSlir; comprobarlos en la
+pestaña Network de DevTools al cargar un código.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import quote, urlencode
+import json
+import math
+import os
+
+import urllib3
+
+from bitacora import obtener_logger
+from extract_info import obtener_directorio_salida, save_to_csv
+
+log = obtener_logger(__name__)
+
+
+# Plantilla del endpoint que devuelve las filas de un código SLIR
+API_URL = os.environ.get("SLIR_API_URL", "https://str.apps.valeo.com/slir/api/single-slir/{code}")
+
+# Claves habituales en las respuestas paginadas (Spring, PrimeNG lazy, etc.)
+CLAVES_FILAS = ("content", "data", "items", "rows", "records", "results")
+CLAVES_TOTAL_FILAS = ("totalElements", "totalRecords", "total", "count")
+CLAVES_TOTAL_PAGINAS = ("totalPages",)
+
+# Script que busca un token de acceso en localStorage/sessionStorage (p. ej. MSAL)
+SCRIPT_BUSCAR_TOKEN = """
+for (const almacen of [window.sessionStorage, window.localStorage]) {
+    for (let i = 0; i < almacen.length; i++) {
+        const clave = almacen.key(i);
+        const valor = almacen.getItem(clave) || '';
+        if (!/token/i.test(clave)) continue;
+        try {
+            const obj = JSON.parse(valor);
+            if (obj && obj.credentialType === 'AccessToken' && obj.secret) return obj.secret;
+            if (obj && obj.access_token) return obj.access_token;
+        } catch (e) {
+            if (valor.split('.').length === 3) return valor;
+        }
+    }
+}
+return null;
+"""
+
+
+def credenciales_desde_driver(driver):
+    """
+    Copia las credenciales de un navegador ya autenticado
+
+    Args:
+        driver: WebDriver en una página de la aplicación con la sesión iniciada
+
+    Returns:
+        dict: {"cookies": cabecera Cookie, "token": token Bearer o None, "user_agent": str}
+    """
+    cookies = "; ".join(f"{c['name']}={c['value']}" for c in driver.get_cookies())
+    try:
+        token = driver.execute_script(SCRIPT_BUSCAR_TOKEN)
+    except Exception:
+        token = None
+    try:
+        user_agent = driver.execute_script("return navigator.userAgent")
+    except Exception:
+        user_agent = None
+    return {"cookies": cookies, "token": token, "user_agent": user_agent}
+
+
+def _primera_clave(datos, claves):
+    for clave in claves:
+        if clave in datos:
+            return datos[clave]
+    return None
+
+
+def filas_de_respuesta(respuesta):
+    """Devuelve la lista de registros de una respuesta (lista directa o dentro de un objeto)"""
+    if isinstance(respuesta, list):
+        return respuesta
+    if isinstance(respuesta, dict):
+        filas = _primera_clave(respuesta, CLAVES_FILAS)
+        if isinstance(filas, list):
+            return filas
+    return []
+
+
+def registros_a_filas(registros, columnas=None, tipado=False):
+    """
+    Convierte registros JSON en las filas (diccionarios) que consume save_to_csv
+
+    Args:
+        registros (list): Registros tal como llegan del backend
+        columnas (dict): Correspondencia {clave_json: encabezado}. Define el orden y el
+                         nombre de las columnas; sin ella se usan las claves del JSON
+        tipado (bool): Si False, los valores se convierten a texto como en la tabla HTML
+
+    Returns:
+        list: Filas como diccionarios
+    """
+    filas = []
+    for registro in registros:
+        if not isinstance(registro, dict):
+            continue
+        if columnas:
+            fila = {encabezado: registro.get(clave) for clave, encabezado in columnas.items()}
+        else:
+            fila = dict(registro)
+
+        if not tipado:
+            fila = {k: "" if v is None else str(v) for k, v in fila.items()}
+
+        if any(v not in ("", None) for v in fila.values()):
+            filas.append(fila)
+    return filas
+
+
+class ClienteApiSlir:
+    """
+    Cliente HTTP con pool de conexiones para el endpoint de datos de SLIR
+
+    Uso:
+        cliente = ClienteApiSlir(credenciales_desde_driver(driver))
+        datos = cliente.extraer(code)
+        save_to_csv(datos, "salida.csv")
+    """
+
+    def __init__(self, credenciales=None, url_api=API_URL, tam_pagina=1000, hilos=4,
+                 param_pagina="page", param_tamano="size", primera_pagina=0,
+                 columnas=None, tipado=False, timeout=30):
+        """
+        Args:
+            credenciales (dict): Resultado de credenciales_desde_driver
+            url_api (str): Plantilla del endpoint con {code}
+            tam_pagina (int): Filas pedidas por página
+            hilos (int): Páginas descargadas a la vez (y tamaño del pool de conexiones)
+            param_pagina, param_tamano (str): Nombres de los parámetros de paginación
+            primera_pagina (int): Índice de la primera página (0 o 1 según el backend)
+            columnas (dict): Ver registros_a_filas
+            tipado (bool): Ver registros_a_filas
+            timeout (float): Timeout de cada petición en segundos
+        """
+        self.url_api = url_api
+        self.tam_pagina = tam_pagina
+        self.hilos = hilos
+        self.param_pagina = param_pagina
+        self.param_tamano = param_tamano
+        self.primera_pagina = primera_pagina
+        self.columnas = columnas
+        self.tipado = tipado
+
+        credenciales = credenciales or {}
+        self.cabeceras = {"Accept": "application/json"}
+        if credenciales.get("cookies"):
+            self.cabeceras["Cookie"] = credenciales["cookies"]
+        if credenciales.get("token"):
+            self.cabeceras["Authorization"] = f"Bearer {credenciales['token']}"
+        if credenciales.get("user_agent"):
+            self.cabeceras["User-Agent"] = credenciales["user_agent"]
+
+        self.http = urllib3.PoolManager(
+            maxsize=hilos,
+            block=True,
+            timeout=urllib3.Timeout(total=timeout),
+            retries=urllib3.Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504)),
+        )
+
+    def obtener_pagina(self, code, pagina):
+        """
+        Descarga una página de datos
+
+        Returns:
+            El JSON de la respuesta (lista u objeto)
+        """
+        params = urlencode({self.param_pagina: pagina, self.param_tamano: self.tam_pagina})
+        # El código va en la ruta: se escapa para que "/", "?" o "#" no cambien la URL
+        url = f"{self.url_api.format(code=quote(code, safe=''))}?{params}"
+        respuesta = self.http.request("GET", url, headers=self.cabeceras)
+        if respuesta.status != 200:
+            raise RuntimeError(f"El backend respondió {respuesta.status} para {url}")
+        return json.loads(respuesta.data.decode("utf-8"))
+
+    def _total_paginas(self, primera):
+        """Calcula el número de páginas a partir de la primera respuesta"""
+        if not isinstance(primera, dict):
+            return 1
+        total_paginas = _primera_clave(primera, CLAVES_TOTAL_PAGINAS)
+        if isinstance(total_paginas, int):
+            return max(1, total_paginas)
+        total_filas = _primera_clave(primera, CLAVES_TOTAL_FILAS)
+        if isinstance(total_filas, int):
+            return max(1, math.ceil(total_filas / self.tam_pagina))
+        return 1
+
+    def extraer(self, code):
+        """
+        Descarga todas las filas de un código: la primera página indica el total y el
+        resto se piden en paralelo
+
+        Returns:
+            dict: Mismo formato que los datos combinados de process_slir_code
+                  (table_data, pages_processed, total_pages, total_rows)
+        """
+        primera = self.obtener_pagina(code, self.primera_pagina)
+        total_paginas = self._total_paginas(primera)
+        log.debug(f"Código {code}: {total_paginas} páginas de hasta {self.tam_pagina} filas en el backend")
+
+        respuestas = [primera]
+        if total_paginas > 1:
+            indices = range(self.primera_pagina + 1, self.primera_pagina + total_paginas)
+            with ThreadPoolExecutor(max_workers=self.hilos) as executor:
+                # map conserva el orden de las páginas
+                respuestas.extend(executor.map(lambda p: self.obtener_pagina(code, p), indices))
+
+        filas = []
+        for respuesta in respuestas:
+            filas.extend(registros_a_filas(filas_de_respuesta(respuesta), self.columnas, self.tipado))
+
+        return {
+            "table_data": filas,
+            "pages_processed": len(respuestas),
+            "total_pages": total_paginas,
+            "total_rows": len(filas),
+        }
+
+
+def process_slir_code_api(code, cliente):
+    """
+    Equivalente a process_slir_code usando el backend en lugar de la tabla HTML
+
+    Args:
+        code (str): Código SLIR
+        cliente (ClienteApiSlir): Cliente ya configurado con las credenciales
+
+    Returns:
+        dict: Mismo formato que process_slir_code, o None si falla
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    try:
+        combined_data = cliente.extraer(code)
+        csv_filename = None
+        if combined_data["table_data"]:
+            csv_filename = os.path.join(obtener_directorio_salida(), f"slir_{code}_{timestamp}_data.csv")
+            if not save_to_csv(combined_data, csv_filename):
+                log.warning(f"No se pudo guardar el CSV de {code}: {csv_filename}")
+                return None
+
+        return {
+            "code": code,
+            "csv_file": csv_filename,
+            "extraction_time": timestamp,
+            "pages_processed": combined_data["pages_processed"],
+            "data": combined_data,
+            "success": True,
+        }
+    except Exception as e:
+        log.warning(f"Error extrayendo {code} desde el backend: {e}")
+        return None
@@ -0,0 +1,244 @@
+"""
+Arranque rápido: ruta fija del driver del navegador e importación diferida de Selenium
+
+Cada webdriver.Edge(...) sin ruta de driver pregunta a Selenium Manager, que lanza un
+proceso aparte y la primera vez necesita red. resolver_driver lo evita buscando, por
+este orden:
+
+    1. SLIR_EDGEDRIVER / SLIR_CHROMEDRIVER (ruta fijada a mano)
+    2. El driver incluido en el ejecutable de PyInstaller (sys._MEIPASS) o junto a él
+    3. La ruta guardada en RUTA_CACHE_DRIVERS por una ejecución anterior
+    4. msedgedriver / chromedriver en el PATH
+    5. Selenium Manager (una sola vez; el resultado se guarda en la caché)
+
+La ruta se resuelve una vez por proceso. Si el navegador se actualiza y el driver
+guardado deja de valer, iniciar_navegador lo descarta y vuelve a preguntar a Selenium
+Manager (ver driver_desfasado).
+
+Importar extract_info ya no carga la pila de WebDriver remoto (se importa al esperar o
+al arrancar el navegador). precalentar hace esas importaciones y la resolución del
+driver en un hilo mientras el llamador lee la lista de códigos. Con resolver=False
+solo importa: la resolución puede acabar en Selenium Manager (proceso aparte y red),
+que no merece la pena lanzar hasta saber que hay códigos que procesar.
+
+Uso:
+    precalentamiento = precalentar("edge", resolver=False)
+    codigos = leer_codigos("codigos.txt")
+    precalentamiento.esperar()
+    if codigos:
+        precalentar("edge")
+"""
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+from bitacora import obtener_logger
+
+log = obtener_logger(__name__)
+
+# Variables de entorno con la ruta fijada del driver de cada navegador
+VARIABLES_DRIVER = {"edge": "SLIR_EDGEDRIVER", "chrome": "SLIR_CHROMEDRIVER"}
+# Nombre del ejecutable del driver y del navegador para Selenium Manager
+BINARIOS_DRIVER = {"edge": "msedgedriver", "chrome": "chromedriver"}
+NAVEGADORES_MANAGER = {"edge": "MicrosoftEdge", "chrome": "chrome"}
+
+
+def _directorio_base():
+    """Carpeta del ejecutable de PyInstaller o, si no, la del script"""
+    if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+# Rutas de driver resueltas por Selenium Manager en ejecuciones anteriores
+RUTA_CACHE_DRIVERS = os.environ.get("SLIR_CACHE_DRIVERS") or os.path.join(_directorio_base(), "drivers.json")
+
+_rutas = {}
+_lock = threading.Lock()
+
+
+def _nombre_binario(navegador):
+    nombre = BINARIOS_DRIVER[navegador]
+    return nombre + ".exe" if sys.platform.startswith("win") else nombre
+
+
+def _leer_cache(ruta_cache=RUTA_CACHE_DRIVERS):
+    try:
+        with open(ruta_cache, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _guardar_cache(navegador, ruta_driver, ruta_cache=RUTA_CACHE_DRIVERS):
+    """Guarda (o borra, con ruta_driver None) la ruta del driver de un navegador"""
+    try:
+        cache = _leer_cache(ruta_cache)
+        if ruta_driver:
+            cache[navegador] = {"ruta": ruta_driver, "guardado": time.time()}
+        else:
+            cache.pop(navegador, None)
+        temporal = f"{ruta_cache}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(temporal, ruta_cache)
+    except OSError as e:
+        log.warning(f"No se pudo guardar la ruta del driver en {ruta_cache}: {e}")
+
+
+def _ruta_selenium_manager(navegador):
+    """Pregunta a Selenium Manager por el driver (lo descarga si hace falta)"""
+    from selenium.webdriver.common.selenium_manager import SeleniumManager
+    try:
+        salida = SeleniumManager().binary_paths(["--browser", NAVEGADORES_MANAGER[navegador]])
+        return salida.get("driver_path") or None
+    except Exception as e:
+        log.warning(f"Selenium Manager no encontró el driver de {navegador}: {e}")
+        return None
+
+
+def _buscar_driver(navegador, refrescar=False):
+    """
+    Busca la ruta del driver sin usar la memoria del proceso
+
+    Returns:
+        tuple: (ruta o None, origen: "variable", "empaquetado", "cache", "path" o "selenium_manager")
+    """
+    binario = _nombre_binario(navegador)
+    variable = VARIABLES_DRIVER[navegador]
+    fijada = os.environ.get(variable)
+    if fijada:
+        if os.path.isfile(fijada):
+            return fijada, "variable"
+        log.warning(f"{variable} apunta a un fichero que no existe: {fijada}")
+
+    if not refrescar:
+        if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+            for carpeta in (sys._MEIPASS, os.path.dirname(sys.executable)):
+                ruta = os.path.join(carpeta, binario)
+                if os.path.isfile(ruta):
+                    return ruta, "empaquetado"
+
+        guardada = (_leer_cache().get(navegador) or {}).get("ruta")
+        if guardada and os.path.isfile(guardada):
+            return guardada, "cache"
+
+        en_path = shutil.which(binario)
+        if en_path:
+            return en_path, "path"
+
+    ruta = _ruta_selenium_manager(navegador)
+    if ruta:
+        _guardar_cache(navegador, ruta)
+    return ruta, "selenium_manager"
+
+
+def resolver_driver(navegador="edge", refrescar=False):
+    """
+    Ruta del driver del navegador, resuelta una sola vez por proceso
+
+    Args:
+        navegador (str): "edge" o "chrome"
+        refrescar (bool): Si True, se ignoran la caché, el PATH y el driver empaquetado
+                          y se pregunta de nuevo a Selenium Manager (driver desfasado)
+
+    Returns:
+        str: Ruta del ejecutable del driver, o None si no se encontró (Selenium lo
+             buscará entonces por su cuenta al arrancar el navegador)
+    """
+    with _lock:
+        if not refrescar and navegador in _rutas:
+            return _rutas[navegador]
+        inicio = time.perf_counter()
+        ruta, origen = _buscar_driver(navegador, refrescar)
+        _rutas[navegador] = ruta
+    log.debug(f"Driver de {navegador}: {ruta or 'no encontrado'} ({origen}, "
+              f"{time.perf_counter() - inicio:.2f} s)")
+    return ruta
+
+
+def olvidar_driver(navegador="edge"):
+    """Borra la ruta del driver de la memoria del proceso y de la caché en disco"""
+    with _lock:
+        _rutas.pop(navegador, None)
+    _guardar_cache(navegador, None)
+
+
+def driver_desfasado(error):
+    """Si el error al arrancar indica que el driver no corresponde a la versión del navegador"""
+    mensaje = str(error)
+    return "only supports" in mensaje or ("session not created" in mensaje and "version" in mensaje)
+
+
+def clases_navegador(navegador="edge"):
+    """
+    Clases de Selenium de un navegador, importadas al pedirlas
+
+    Returns:
+        tuple: (clase de opciones, clase de Service, clase del WebDriver)
+    """
+    if navegador == "chrome":
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.webdriver import WebDriver
+    else:
+        from selenium.webdriver.edge.options import Options
+        from selenium.webdriver.edge.service import Service
+        from selenium.webdriver.edge.webdriver import WebDriver
+    return Options, Service, WebDriver
+
+
+class Precalentamiento(threading.Thread):
+    """
+    Hilo que importa Selenium y resuelve el driver mientras el llamador hace otra cosa
+
+    Attributes:
+        rutas (dict): {navegador: ruta del driver} al terminar
+        segundos (float): Duración del precalentamiento
+    """
+
+    def __init__(self, navegadores=("edge",), resolver=True):
+        super().__init__(name="slir-precalentar", daemon=True)
+        self.navegadores = navegadores
+        self.resolver = resolver
+        self.rutas = {}
+        self.segundos = None
+
+    def run(self):
+        inicio = time.perf_counter()
+        try:
+            import selenium.webdriver.support.ui  # noqa: F401 (la importa esperas.esperar_hasta)
+            for navegador in self.navegadores:
+                clases_navegador(navegador)
+                if self.resolver:
+                    self.rutas[navegador] = resolver_driver(navegador)
+        except Exception as e:
+            log.warning(f"Error al precalentar el arranque del navegador: {e}")
+        self.segundos = time.perf_counter() - inicio
+        log.debug(f"Arranque precalentado en {self.segundos:.2f} s")
+
+    def esperar(self, timeout=None):
+        """Espera a que termine (como mucho timeout segundos) y devuelve las rutas resueltas"""
+        self.join(timeout)
+        return self.rutas
+
+
+def precalentar(navegadores=("edge",), resolver=True):
+    """
+    Empieza a precalentar el arranque en segundo plano
+
+    Args:
+        navegadores: Navegador ("edge" o "chrome") o lista de navegadores
+        resolver (bool): Si False, solo importa Selenium y no busca el driver
+
+    Returns:
+        Precalentamiento: Hilo ya arrancado
+    """
+    if isinstance(navegadores, str):
+        navegadores = (navegadores,)
+    precalentamiento = Precalentamiento(tuple(navegadores), resolver)
+    precalentamiento.start()
+    return precalentamiento
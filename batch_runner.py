@@ -0,0 +1,359 @@
+from datetime import datetime
+import json
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+
+from arranque import precalentar
+from bitacora import LOGS_DIR, configurar_logs, obtener_logger
+from captura_red import CapturaRed
+from driver_pool import DriverPool
+from esperas import histograma_esperas
+from extract_info import process_slir_code
+from instrumentacion import exportar_prometheus
+from perfiles import preparar_perfiles_workers
+from planificador import ColaPrioridad, LimitadorTasa, leer_prioridades, paginas_conocidas
+from politicas import Cortacircuitos, Politica
+from sesion_guardada import AlmacenSesion
+
+log = obtener_logger(__name__)
+
+
+def leer_codigos(origen):
+    """
+    Lee códigos SLIR desde un fichero (uno por línea) o desde una lista
+
+    Se ignoran líneas vacías, comentarios (#) y códigos repetidos.
+
+    Args:
+        origen: Ruta de fichero o iterable de códigos
+
+    Returns:
+        list: Códigos en el orden original, sin duplicados
+    """
+    if isinstance(origen, str):
+        with open(origen, encoding="utf-8-sig") as f:
+            lineas = f.readlines()
+    else:
+        lineas = origen
+
+    codigos = []
+    vistos = set()
+    for linea in lineas:
+        code = linea.strip()
+        if not code or code.startswith("#") or code in vistos:
+            continue
+        vistos.add(code)
+        codigos.append(code)
+    return codigos
+
+
+class Worker(threading.Thread):
+    """
+    Hilo que procesa códigos con su propio navegador y su propia copia del perfil
+
+    El navegador se arranca una vez (DriverPool de tamaño 1), en cuanto empieza el
+    hilo y mientras se ordenan los códigos, y se reutiliza para todos los códigos del
+    worker. Cada worker tiene una cola acotada: cuando está
+    llena no se le asignan más códigos.
+    """
+
+    def __init__(self, worker_id, user_data_dir, resultados, max_pendientes=2, headless=True,
+                 max_usos=50, cache=None, metricas_jsonl=None, captura_red=False, ligero=False,
+                 politica=None, sesion_guardada=None, formato="csv", id_salida=None):
+        super().__init__(name=f"slir-worker-{worker_id}", daemon=True)
+        self.worker_id = worker_id
+        self.user_data_dir = user_data_dir
+        self.resultados = resultados
+        self.cache = cache
+        self.metricas_jsonl = metricas_jsonl
+        self.politica = politica
+        self.formato = formato
+        self.id_salida = id_salida
+        # La captura guarda estado del código en curso: una por worker
+        self.captura = CapturaRed() if captura_red else None
+        self.cola = queue.Queue(maxsize=max_pendientes)
+        self.log_path = os.path.join(LOGS_DIR, f"edge_driver_worker_{worker_id}.log")
+        self.pool = DriverPool(tamano=1, max_usos=max_usos, headless=headless,
+                               user_data_dirs=[user_data_dir], log_paths=[self.log_path],
+                               capturar_red=captura_red, ligero=ligero,
+                               sesion_guardada=sesion_guardada)
+
+    def tiene_hueco(self):
+        return not self.cola.full()
+
+    def run(self):
+        with self.pool:
+            self.pool.precalentar()
+            self._procesar_cola()
+
+    def _procesar_cola(self):
+        while True:
+            tarea = self.cola.get()
+            if tarea is None:
+                break
+            code, intento = tarea
+
+            inicio = time.perf_counter()
+            try:
+                # En los reintentos se continúa el fichero que dejó a medias el intento anterior;
+                # con el id_salida del lote nunca el de otra ejecución
+                resultado = process_slir_code(code, pool=self.pool, cache=self.cache,
+                                              metricas_jsonl=self.metricas_jsonl, captura=self.captura,
+                                              politica=self.politica, reanudar=intento > 1,
+                                              formato=self.formato, id_salida=self.id_salida)
+            except Exception as e:
+                log.error(f"[worker {self.worker_id}] Error no controlado con {code}: {e}")
+                resultado = None
+            duracion = time.perf_counter() - inicio
+
+            self.resultados.put((self.worker_id, code, intento, resultado, duracion))
+
+
+def _resumen_resultado(code, intento, worker_id, resultado, duracion, latencia=None):
+    """
+    Se queda solo con los datos del resultado que interesan en el informe (sin las filas)
+
+    latencia son los segundos desde el inicio del lote hasta que el código terminó
+    """
+    resultado = resultado or {}
+    data = resultado.get("data") or {}
+    metricas = resultado.get("metricas") or {}
+    return {
+        "code": code,
+        "success": bool(resultado.get("success")),
+        "intentos": intento,
+        "worker": worker_id,
+        "segundos": round(duracion, 2),
+        "latencia": round(latencia, 2) if latencia is not None else None,
+        "csv_file": resultado.get("csv_file"),
+        "pages_processed": resultado.get("pages_processed"),
+        "total_rows": data.get("total_rows"),
+        "message": resultado.get("message"),
+        "error": resultado.get("error"),
+        "tiempos": resultado.get("tiempos"),
+        "sin_cambios": bool(resultado.get("sin_cambios")),
+        "comandos_webdriver": metricas.get("comandos_webdriver"),
+        "spans": metricas.get("spans"),
+    }
+
+
+def ejecutar_lote(codigos, num_workers=2, reintentos=2, max_pendientes=2, headless=True,
+                  ruta_informe=None, refrescar_perfiles=False, max_usos=50, cache=None,
+                  ruta_metricas_jsonl=None, ruta_prometheus=None, captura_red=False, ligero=False,
+                  politica=None, sesion_guardada=None, prioridades=None, limitador=None,
+                  formato="csv", id_salida=None):
+    """
+    Procesa una lista de códigos SLIR repartiéndolos entre varios navegadores
+
+    Cada worker usa una copia propia del perfil de Edge y nunca se ejecuta taskkill,
+    de modo que los navegadores pueden convivir.
+
+    Args:
+        codigos (list): Códigos SLIR a procesar
+        num_workers (int): Número de navegadores en paralelo
+        reintentos (int): Reintentos por código tras el primer fallo
+        max_pendientes (int): Códigos en cola por worker antes de dejar de asignarle más
+        headless (bool): Si True, los navegadores no son visibles
+        ruta_informe (str): Si se indica, guarda el informe final en JSON
+        refrescar_perfiles (bool): Si True, vuelve a copiar los perfiles de los workers
+        max_usos (int): Códigos por navegador antes de reciclarlo
+        cache (CacheSlir): Si se indica, se omiten los códigos sin cambios (refresco incremental)
+        ruta_metricas_jsonl (str): Si se indica, se añaden ahí los spans de cada código (JSON lines)
+        ruta_prometheus (str): Si se indica, se escriben ahí las métricas agregadas del lote
+                               en formato texto de Prometheus
+        captura_red (bool): Si True, las filas se toman de las respuestas JSON de la aplicación
+                            (ver captura_red.py) y solo se lee el DOM si no se captura nada
+        ligero (bool): Si True, cada worker usa un perfil mínimo (solo sesión) y el arranque
+                       ligero con bloqueo de recursos (ver iniciar_navegador)
+        politica (Politica): Reintentos y tiempos de espera compartidos por los workers; por
+                             defecto una Politica con un Cortacircuitos común al lote
+        sesion_guardada (AlmacenSesion): Sesión cifrada común a los workers: el primero que
+                                         hace login la guarda y los demás la reutilizan
+        prioridades (dict): {code: "urgente" | "normal" | "baja"}; los códigos se reparten por
+                            prioridad y, dentro de cada una, los de menos páginas según la
+                            caché primero (ver planificador.py)
+        limitador (LimitadorTasa): Límite de navegaciones y clics por host común a los workers;
+                                   solo se usa si no se indica politica (va dentro de ella)
+        formato: Formato de salida de cada código ("csv", "csv.gz", "parquet", "arrow") o una
+                 salida compartida por todo el lote (DatasetParquet o CsvConsolidado, ver sinks.py)
+        id_salida (str): Marca de los ficheros de salida del lote en lugar de la hora de cada
+                         código; si no se da, se usa la hora de inicio del lote. Los reintentos
+                         solo continúan los ficheros con esta marca
+
+    Returns:
+        dict: Informe con el resultado de cada código y totales por worker
+    """
+    inicio_lote = time.perf_counter()
+    os.makedirs(LOGS_DIR, exist_ok=True)
+
+    if not codigos:
+        # Sin códigos no se copia ningún perfil ni se arranca ningún navegador
+        log.info("[lote] No hay códigos que procesar")
+        informe = _construir_informe([], 0, 0, time.perf_counter() - inicio_lote)
+        informe["login"] = _resumen_login([], 0)
+        _guardar_informe(informe, ruta_informe)
+        return informe
+
+    num_workers = max(1, min(num_workers, len(codigos)))
+    id_salida = id_salida or time.strftime("lote%Y%m%d_%H%M%S")
+    perfiles = preparar_perfiles_workers(num_workers, refrescar=refrescar_perfiles, minimo=ligero)
+    # Un solo cortacircuitos para todo el lote: si el backend se degrada se frenan todos los workers
+    politica = politica or Politica(cortacircuitos=Cortacircuitos(), limitador=limitador)
+
+    resultados = queue.Queue()
+    workers = [Worker(i, perfiles[i], resultados, max_pendientes, headless, max_usos, cache,
+                      ruta_metricas_jsonl, captura_red, ligero, politica, sesion_guardada, formato,
+                      id_salida)
+               for i in range(num_workers)]
+    for worker in workers:
+        worker.start()
+
+    pendientes = ColaPrioridad(prioridades, paginas_conocidas(codigos, cache))
+    for code in codigos:
+        pendientes.append((code, 1))
+    en_curso = 0
+    total_reintentos = 0
+    informe_codigos = []
+
+    while pendientes or en_curso:
+        # Asignar códigos a los workers con hueco (el de menos cola primero)
+        while pendientes:
+            libres = [w for w in workers if w.tiene_hueco()]
+            if not libres:
+                break
+            worker = min(libres, key=lambda w: w.cola.qsize())
+            worker.cola.put_nowait(pendientes.popleft())
+            en_curso += 1
+
+        worker_id, code, intento, resultado, duracion = resultados.get()
+        en_curso -= 1
+        latencia = time.perf_counter() - inicio_lote
+
+        if resultado and resultado.get("success"):
+            log.debug(f"[lote] {code} procesado en {duracion:.1f} s (worker {worker_id})")
+            informe_codigos.append(_resumen_resultado(code, intento, worker_id, resultado, duracion,
+                                                      latencia))
+        elif intento <= reintentos:
+            error = (resultado or {}).get("error") or "error"
+            log.warning(f"[lote] {code} falló en el intento {intento} ({error}), se reintentará")
+            total_reintentos += 1
+            pendientes.append((code, intento + 1))
+        else:
+            log.warning(f"[lote] {code} falló definitivamente tras {intento} intentos")
+            informe_codigos.append(_resumen_resultado(code, intento, worker_id, resultado, duracion,
+                                                      latencia))
+
+    for worker in workers:
+        worker.cola.put(None)
+    for worker in workers:
+        worker.join()
+
+    duracion_total = time.perf_counter() - inicio_lote
+    informe = _construir_informe(informe_codigos, num_workers, total_reintentos, duracion_total)
+    for worker in workers:
+        informe["por_worker"][worker.worker_id]["navegador"] = worker.pool.metricas()
+    informe["login"] = _resumen_login(workers, informe["total"])
+    if politica.cortacircuitos is not None:
+        informe["cortacircuitos"] = politica.cortacircuitos.metricas()
+    if politica.limitador is not None:
+        informe["limite_tasa"] = politica.limitador.metricas()
+
+    if ruta_prometheus:
+        exportar_prometheus(ruta_prometheus)
+        log.info(f"Métricas del lote guardadas en: {ruta_prometheus}")
+
+    _guardar_informe(informe, ruta_informe)
+    return informe
+
+
+def _guardar_informe(informe, ruta_informe):
+    """Guarda el informe del lote en JSON si se indica ruta_informe"""
+    if ruta_informe:
+        with open(ruta_informe, "w", encoding="utf-8") as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+        log.info(f"Informe del lote guardado en: {ruta_informe}")
+
+
+def _resumen_login(workers, total_codigos):
+    """Coste del login en todo el lote, repartido entre los códigos procesados"""
+    metricas = [w.pool.metricas() for w in workers]
+    segundos = sum(m["tiempo_login_total"] for m in metricas)
+    return {
+        "segundos_totales": round(segundos, 2),
+        "logins_realizados": sum(m["logins_realizados"] for m in metricas),
+        "sesiones_reutilizadas": sum(m["sesiones_reutilizadas"] for m in metricas),
+        "segundos_por_codigo": round(segundos / total_codigos, 3) if total_codigos else 0,
+    }
+
+
+def _contar_errores(informe_codigos):
+    """Códigos fallidos por tipo de error (ver politicas.py)"""
+    errores = {}
+    for r in informe_codigos:
+        if not r["success"]:
+            tipo = r["error"] or "desconocido"
+            errores[tipo] = errores.get(tipo, 0) + 1
+    return errores
+
+
+def _construir_informe(informe_codigos, num_workers, total_reintentos, duracion_total):
+    """Calcula los totales del lote y por worker"""
+    por_worker = {
+        i: {"procesados": 0, "exitosos": 0, "fallidos": 0, "segundos": 0.0}
+        for i in range(num_workers)
+    }
+    for r in informe_codigos:
+        w = por_worker[r["worker"]]
+        w["procesados"] += 1
+        w["exitosos" if r["success"] else "fallidos"] += 1
+        w["segundos"] = round(w["segundos"] + r["segundos"], 2)
+
+    exitosos = sum(1 for r in informe_codigos if r["success"])
+    latencias = [r["latencia"] for r in informe_codigos if r.get("latencia") is not None]
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "total": len(informe_codigos),
+        "exitosos": exitosos,
+        "fallidos": len(informe_codigos) - exitosos,
+        "sin_cambios": sum(1 for r in informe_codigos if r["sin_cambios"]),
+        "comandos_webdriver": sum(r["comandos_webdriver"] or 0 for r in informe_codigos),
+        "reintentos": total_reintentos,
+        "errores": _contar_errores(informe_codigos),
+        "workers": num_workers,
+        "duracion_segundos": round(duracion_total, 2),
+        "codigos_por_minuto": round(len(informe_codigos) / duracion_total * 60, 2) if duracion_total else 0,
+        "latencia_mediana": round(statistics.median(latencias), 2) if latencias else None,
+        "por_worker": por_worker,
+        "esperas": histograma_esperas(),
+        "codigos": informe_codigos,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python batch_runner.py <fichero_codigos> [num_workers]")
+        print("     (una línea por código; opcionalmente con prioridad: SLIR1ST230476 urgente)")
+        sys.exit(1)
+
+    configurar_logs()
+    # Selenium y el driver se preparan mientras se leen los códigos
+    precalentamiento = precalentar()
+    codigos, prioridades = leer_prioridades(sys.argv[1])
+    precalentamiento.esperar()
+    num_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    print(f"Procesando {len(codigos)} códigos con {num_workers} workers...")
+
+    informe = ejecutar_lote(codigos, num_workers=num_workers, ruta_informe="informe_lote.json",
+                            ruta_metricas_jsonl=os.path.join(LOGS_DIR, "metricas.jsonl"),
+                            ruta_prometheus=os.path.join(LOGS_DIR, "metricas.prom"),
+                            sesion_guardada=AlmacenSesion(), prioridades=prioridades,
+                            limitador=LimitadorTasa())
+    print(f"\nExitosos: {informe['exitosos']} / {informe['total']} "
+          f"({informe['codigos_por_minuto']} códigos/minuto)")
+    print(f"Login: {informe['login']['logins_realizados']} realizados, "
+          f"{informe['login']['sesiones_reutilizadas']} sesiones reutilizadas, "
+          f"{informe['login']['segundos_totales']} s en total")
@@ -0,0 +1,648 @@
+"""
+Benchmarks de extracción contra páginas locales (sin acceso a str.apps.valeo.com)
+
+- tabla: compara los modos "dom" y "script" de extract_table_rows sobre tablas estáticas
+- motores: códigos por minuto del flujo Selenium (un código cada vez) frente al motor
+  CDP (varias pestañas de un mismo navegador) sobre el sitio local
+- memoria: memoria (tracemalloc) y tiempo de escritura CSV de las filas como
+  diccionarios frente a filas compactas (tuplas ligadas al esquema), sin navegador
+- arranque: arranque del navegador y tiempo hasta la primera fila con la configuración
+  actual frente al modo ligero (perfil mínimo, carga "eager" y recursos bloqueados)
+  sobre una página local con imágenes, fuentes y analítica
+- inicio: arranque en frío y en caliente de un proceso nuevo: importar slir, importar
+  la parte diferida de Selenium, resolver el driver (Selenium Manager con la caché de
+  drivers vacía frente a la ruta guardada) y arrancar el navegador
+- virtual: filas/s y comandos WebDriver al leer una página grande con scroll
+  virtual por tramos del visor frente a la misma página pintada entera en el DOM
+- mock: recorre el sitio local de mock_slir_site (paginador, spinner, login, latencia)
+  con get_total_pages, extract_table_rows, click_next_page y process_slir_code, mide
+  filas/s, páginas/s, comandos WebDriver y latencias p50/p95, y compara con la última
+  base guardada para detectar regresiones
+
+Uso:
+    python benchmark.py [edge|chrome] [tabla|mock|motores|memoria|arranque|inicio|virtual] [--guardar-base]
+"""
+from selenium import webdriver
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from captura_red import CapturaRed
+from driver_pool import DriverPool
+from escritor_csv import EscritorCsvIncremental
+from esquema_tabla import EsquemaTabla, FilasPagina
+from extract_info import (extract_table_rows, esperar_tabla, get_total_pages, click_next_page,
+                          extraer_filas_compactas, filas_desde_matriz, obtener_directorio_salida,
+                          process_slir_code)
+from instrumentacion import ContadorComandos
+from mock_slir_site import ServidorMock, generar_registros
+from motor_cdp import procesar_codigos_cdp
+import open_page
+from perfiles import copiar_perfil, copiar_perfil_minimo
+
+# Tamaños de tabla que se comparan en el benchmark de extracción
+FILAS_BENCHMARK = [10, 50, 100, 500, 1000]
+COLUMNAS_BENCHMARK = 10
+
+# Escenarios del sitio local: páginas con el máximo de filas por página, columnas,
+# latencia de cada respuesta del servidor y si hay que pasar por el botón de Login
+ESCENARIOS_MOCK = [
+    {"nombre": "pequeno", "paginas": 5, "filas_por_pagina": 25, "columnas": 8, "latencia": 0.0, "login": True},
+    {"nombre": "mediano", "paginas": 20, "filas_por_pagina": 50, "columnas": 15, "latencia": 0.05, "login": True},
+    {"nombre": "grande", "paginas": 40, "filas_por_pagina": 100, "columnas": 25, "latencia": 0.1, "login": False},
+]
+# Repeticiones de las medidas que no cambian de página
+REPETICIONES = 5
+# Proceso que mide el inicio en frío o en caliente (ver benchmark_inicio): imprime los
+# segundos de cada fase como JSON en la última línea
+SCRIPT_INICIO = """
+import json, sys, tempfile, time
+inicio = time.perf_counter()
+import slir
+t_importacion = time.perf_counter()
+import arranque
+arranque.clases_navegador(sys.argv[1])
+import selenium.webdriver.support.ui
+t_selenium = time.perf_counter()
+ruta = arranque.resolver_driver(sys.argv[1])
+t_driver = time.perf_counter()
+driver = None
+if sys.argv[2] == "1":
+    import open_page
+    driver = open_page.iniciar_navegador(cerrar_previo=False, mantener_abierto=False, headless=True,
+                                         user_data_dir=tempfile.mkdtemp(), navegador=sys.argv[1])
+t_navegador = time.perf_counter()
+if driver:
+    driver.quit()
+print(json.dumps({
+    "importacion": t_importacion - inicio,
+    "selenium": t_selenium - t_importacion,
+    "driver": t_driver - t_selenium,
+    "navegador": t_navegador - t_driver if driver else None,
+    "total": t_navegador - inicio,
+    "ruta_driver": ruta,
+}))
+"""
+
+# Empeoramiento relativo respecto a la base a partir del cual se avisa de una regresión
+TOLERANCIA_REGRESION = 0.25
+
+
+def generar_html_tabla(filas, columnas):
+    """Genera una página con una tabla del mismo tipo que la de SLIR (thead/tbody)"""
+    encabezados = "".join(f"<th>Columna {c}</th>" for c in range(columnas))
+    cuerpo = "".join(
+        "<tr>" + "".join(f"<td>F{f}C{c}</td>" for c in range(columnas)) + "</tr>"
+        for f in range(filas)
+    )
+    return (
+        "<html><body><table>"
+        f"<thead><tr>{encabezados}</tr></thead>"
+        f"<tbody>{cuerpo}</tbody>"
+        "</table></body></html>"
+    )
+
+
+def crear_driver_benchmark(navegador="edge"):
+    """Abre un navegador headless limpio (sin perfil de usuario) para los benchmarks"""
+    if navegador == "chrome":
+        options = webdriver.ChromeOptions()
+    else:
+        options = webdriver.EdgeOptions()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+
+    if navegador == "chrome":
+        return webdriver.Chrome(options=options)
+    return webdriver.Edge(options=options)
+
+
+def benchmark_extract_table_rows(driver, filas_lista=FILAS_BENCHMARK, columnas=COLUMNAS_BENCHMARK):
+    """
+    Compara los modos "dom" y "script" de extract_table_rows para distintos tamaños de tabla
+
+    Returns:
+        list: Un diccionario por (filas, modo) con comandos enviados y tiempo en segundos
+    """
+    resultados = []
+    contador = ContadorComandos(driver)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            for filas in filas_lista:
+                ruta = os.path.join(tmp, f"tabla_{filas}.html")
+                with open(ruta, "w", encoding="utf-8") as f:
+                    f.write(generar_html_tabla(filas, columnas))
+                driver.get(f"file:///{ruta.lstrip('/')}")
+
+                for modo in ("dom", "script"):
+                    contador.reiniciar()
+                    inicio = time.perf_counter()
+                    datos = extract_table_rows(driver, modo=modo)
+                    duracion = time.perf_counter() - inicio
+
+                    resultados.append({
+                        "filas": filas,
+                        "modo": modo,
+                        "filas_extraidas": len(datos),
+                        "comandos": contador.total,
+                        "segundos": duracion,
+                    })
+        finally:
+            contador.desenganchar()
+
+    return resultados
+
+
+def imprimir_resultados(resultados):
+    """Muestra los resultados del benchmark en forma de tabla"""
+    print(f"\n{'filas':>6} {'modo':>7} {'extraídas':>10} {'comandos':>9} {'segundos':>9}")
+    for r in resultados:
+        print(f"{r['filas']:>6} {r['modo']:>7} {r['filas_extraidas']:>10} "
+              f"{r['comandos']:>9} {r['segundos']:>9.3f}")
+
+
+def resumen_latencias(valores, comandos=None):
+    """p50, p95, media y máximo de una lista de duraciones (y comandos por llamada si se dan)"""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return {"n": 0}
+
+    def percentil(p):
+        return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+    resumen = {
+        "n": len(ordenados),
+        "p50": round(percentil(50), 4),
+        "p95": round(percentil(95), 4),
+        "media": round(sum(ordenados) / len(ordenados), 4),
+        "max": round(ordenados[-1], 4),
+    }
+    if comandos:
+        resumen["comandos"] = round(sum(comandos) / len(comandos), 1)
+    return resumen
+
+
+def _medir(contador, funcion, *args, **kwargs):
+    """Ejecuta una función y devuelve (resultado, segundos, comandos WebDriver)"""
+    contador.reiniciar()
+    inicio = time.perf_counter()
+    resultado = funcion(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio, contador.total
+
+
+def benchmark_escenario_mock(pool, servidor, code, escenario, repeticiones=REPETICIONES):
+    """
+    Mide un escenario del sitio local con una sesión del pool
+
+    Returns:
+        dict: Latencias y comandos de cada función y rendimiento de process_slir_code
+    """
+    resultado = {"escenario": escenario["nombre"]}
+
+    with pool.sesion() as sesion:
+        driver = sesion.driver
+        pool.navegar(sesion, code)
+        esperar_tabla(driver)
+        contador = ContadorComandos(driver)
+        try:
+            tiempos, comandos = [], []
+            for _ in range(repeticiones):
+                _, segundos, n = _medir(contador, get_total_pages, driver)
+                tiempos.append(segundos)
+                comandos.append(n)
+            resultado["get_total_pages"] = resumen_latencias(tiempos, comandos)
+
+            tiempos, comandos = [], []
+            for _ in range(repeticiones):
+                _, segundos, n = _medir(contador, extract_table_rows, driver)
+                tiempos.append(segundos)
+                comandos.append(n)
+            resultado["extract_table_rows"] = resumen_latencias(tiempos, comandos)
+
+            # click_next_page con las filas por página iniciales del sitio, hasta el final
+            tiempos, comandos = [], []
+            while True:
+                avanzo, segundos, n = _medir(contador, click_next_page, driver)
+                if not avanzo:
+                    break
+                tiempos.append(segundos)
+                comandos.append(n)
+            resultado["click_next_page"] = resumen_latencias(tiempos, comandos)
+        finally:
+            contador.desenganchar()
+
+    # Extracción completa: maximiza filas por página y recorre todas las páginas,
+    # leyendo la tabla del DOM y tomando las filas de las respuestas JSON capturadas
+    for clave, captura in (("process_slir_code", None), ("process_slir_code_red", CapturaRed())):
+        resultado[clave] = _medir_extraccion(pool, servidor, code, repeticiones, captura)
+    return resultado
+
+
+def _medir_extraccion(pool, servidor, code, repeticiones, captura=None):
+    """Rendimiento de process_slir_code completo sobre el sitio local"""
+    tiempos, comandos = [], []
+    filas = paginas = 0
+    for _ in range(max(1, repeticiones // 2)):
+        inicio = time.perf_counter()
+        datos = process_slir_code(code, pool=pool, captura=captura)
+        tiempos.append(time.perf_counter() - inicio)
+        if not datos or not datos.get("success"):
+            return {"error": "la extracción falló"}
+        comandos.append(datos["metricas"]["comandos_webdriver"])
+        filas += datos["data"]["total_rows"]
+        paginas += datos["pages_processed"]
+        if os.path.exists(datos["csv_file"]):
+            os.remove(datos["csv_file"])
+
+    total_segundos = sum(tiempos)
+    return {
+        **resumen_latencias(tiempos, comandos),
+        "filas_por_segundo": round(filas / total_segundos, 1),
+        "paginas_por_segundo": round(paginas / total_segundos, 2),
+        "filas_correctas": filas // len(tiempos) == len(servidor.registros[code]),
+    }
+
+
+def benchmark_sitio_mock(navegador="edge", escenarios=ESCENARIOS_MOCK, repeticiones=REPETICIONES):
+    """
+    Ejecuta los escenarios contra el sitio local en un navegador headless sin perfil de usuario
+
+    Returns:
+        list: Un diccionario de resultados por escenario
+    """
+    resultados = []
+    url_original = open_page.BASE_URL
+    with tempfile.TemporaryDirectory() as perfil:
+        for escenario in escenarios:
+            code = f"SLIRBENCH{escenario['nombre'].upper()}"
+            filas_por_pagina = escenario["filas_por_pagina"]
+            registros = generar_registros(escenario["paginas"] * filas_por_pagina, escenario["columnas"])
+            tamanos = sorted({10, filas_por_pagina})
+            servidor = ServidorMock({code: registros}, latencia=escenario["latencia"],
+                                    login=escenario["login"], tamanos_pagina=tamanos)
+            print(f"\nEscenario {escenario['nombre']}: {len(registros)} filas, "
+                  f"{escenario['columnas']} columnas, latencia {escenario['latencia']} s")
+            with servidor, DriverPool(tamano=1, headless=True, navegador=navegador, capturar_red=True,
+                                      user_data_dirs=[os.path.join(perfil, escenario["nombre"])]) as pool:
+                open_page.configurar_base_url(servidor.url_pagina)
+                try:
+                    resultados.append(benchmark_escenario_mock(pool, servidor, code, escenario, repeticiones))
+                finally:
+                    open_page.configurar_base_url(url_original)
+    return resultados
+
+
+def imprimir_resultados_mock(resultados):
+    """Muestra latencias, comandos y rendimiento de cada escenario"""
+    for r in resultados:
+        print(f"\n== {r['escenario']} ==")
+        print(f"{'función':<20} {'n':>4} {'p50 s':>8} {'p95 s':>8} {'comandos':>9}")
+        for funcion in ("get_total_pages", "extract_table_rows", "click_next_page", "process_slir_code",
+                        "process_slir_code_red"):
+            datos = r.get(funcion) or {}
+            if "error" in datos or not datos.get("n"):
+                print(f"{funcion:<20} {datos.get('error', 'sin datos')}")
+                continue
+            print(f"{funcion:<20} {datos['n']:>4} {datos['p50']:>8.3f} {datos['p95']:>8.3f} "
+                  f"{datos.get('comandos', 0):>9}")
+        for funcion, modo in (("process_slir_code", "DOM"), ("process_slir_code_red", "red")):
+            extraccion = r.get(funcion) or {}
+            if "filas_por_segundo" in extraccion:
+                print(f"Rendimiento ({modo}): {extraccion['filas_por_segundo']} filas/s, "
+                      f"{extraccion['paginas_por_segundo']} páginas/s")
+
+
+def benchmark_motores(navegador="edge", num_codigos=8, paginas=5, filas_por_pagina=25, columnas=10,
+                      latencia=0.1, max_pestanas=4):
+    """
+    Compara los códigos por minuto de process_slir_code (un navegador, un código cada vez)
+    con los del motor CDP (un navegador, varias pestañas) sobre el sitio local
+
+    Returns:
+        dict: {"selenium": {...}, "cdp": {...}} con segundos, códigos por minuto y exitosos
+    """
+    codigos = [f"SLIRMOTOR{i:03d}" for i in range(num_codigos)]
+    registros = generar_registros(paginas * filas_por_pagina, columnas)
+    resultados = {}
+    url_original = open_page.BASE_URL
+
+    def resumir(inicio, datos):
+        segundos = time.perf_counter() - inicio
+        for d in datos:
+            if d and d.get("csv_file") and os.path.exists(d["csv_file"]):
+                os.remove(d["csv_file"])
+        return {
+            "segundos": round(segundos, 2),
+            "codigos_por_minuto": round(len(codigos) / segundos * 60, 1),
+            "exitosos": sum(1 for d in datos if d and d.get("success")),
+        }
+
+    with tempfile.TemporaryDirectory() as perfil, \
+            ServidorMock({c: registros for c in codigos}, latencia=latencia, login=True,
+                         tamanos_pagina=sorted({10, filas_por_pagina})) as servidor:
+        open_page.configurar_base_url(servidor.url_pagina)
+        try:
+            with DriverPool(tamano=1, headless=True, navegador=navegador,
+                            user_data_dirs=[os.path.join(perfil, "selenium")]) as pool:
+                inicio = time.perf_counter()
+                resultados["selenium"] = resumir(inicio, [process_slir_code(c, pool=pool) for c in codigos])
+
+            inicio = time.perf_counter()
+            datos = procesar_codigos_cdp(codigos, max_pestanas=max_pestanas, navegador=navegador,
+                                         user_data_dir=os.path.join(perfil, "cdp"))
+            resultados["cdp"] = resumir(inicio, datos)
+        finally:
+            open_page.configurar_base_url(url_original)
+    return resultados
+
+
+def _medir_memoria(funcion):
+    """Ejecuta funcion y devuelve (resultado, bytes retenidos, pico de bytes, segundos)"""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        resultado = funcion()
+        segundos = time.perf_counter() - inicio
+        actual, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return resultado, actual, pico, segundos
+
+
+def benchmark_memoria(paginas=20, filas_por_pagina=500, columnas=COLUMNAS_BENCHMARK * 2):
+    """
+    Compara las filas como diccionarios (filas_desde_matriz) con las filas compactas
+    (FilasPagina) para un código de paginas × filas_por_pagina filas: memoria retenida
+    al conservar todas las páginas, pico, y tiempo de escritura en CSV
+
+    Returns:
+        dict: {"diccionarios": {...}, "compactas": {...}} con MB y segundos
+    """
+    headers = [f"Columna {j}" for j in range(columnas)]
+    # Las celdas se crean fuera de la medición: son las mismas cadenas en ambos casos
+    matrices = [[[f"P{p}F{i}C{j}" for j in range(columnas)] for i in range(filas_por_pagina)]
+                for p in range(paginas)]
+
+    def como_diccionarios():
+        return [filas_desde_matriz(headers, matriz) for matriz in matrices]
+
+    def como_compactas():
+        esquema = EsquemaTabla(headers)
+        return [FilasPagina.desde_matriz(esquema, matriz) for matriz in matrices]
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as carpeta:
+        for nombre, construir in (("diccionarios", como_diccionarios), ("compactas", como_compactas)):
+            paginas_filas, retenidos, pico, segundos_construccion = _medir_memoria(construir)
+
+            escritor = EscritorCsvIncremental(os.path.join(carpeta, f"{nombre}.csv"))
+
+            def escribir():
+                for numero, filas in enumerate(paginas_filas, start=1):
+                    escritor.escribir_pagina(numero, filas)
+
+            _, _, pico_escritura, segundos_escritura = _medir_memoria(escribir)
+            escritor.cerrar()
+            resultados[nombre] = {
+                "filas": sum(len(f) for f in paginas_filas),
+                "mb_retenidos": round(retenidos / 1e6, 2),
+                "mb_pico": round(pico / 1e6, 2),
+                "segundos_construccion": round(segundos_construccion, 3),
+                "mb_pico_escritura": round(pico_escritura / 1e6, 2),
+                "segundos_escritura": round(segundos_escritura, 3),
+            }
+    return resultados
+
+
+def benchmark_arranque(navegador="edge", repeticiones=3, origen=None, recursos=40, latencia=0.2):
+    """
+    Compara el arranque actual con el modo ligero: segundos hasta tener el navegador
+    y segundos desde la navegación hasta la primera fila de la tabla
+
+    Args:
+        origen (str): Perfil que se copia (completo o mínimo); sin él se usan perfiles vacíos
+        recursos (int): Imágenes y fuentes de relleno de la página local
+        latencia (float): Latencia de cada respuesta del servidor local
+
+    Returns:
+        dict: {"actual": {...}, "ligero": {...}} con latencias de arranque y de primera fila
+    """
+    code = "SLIRARRANQUE"
+    resultados = {}
+    with tempfile.TemporaryDirectory() as carpeta, \
+            ServidorMock({code: generar_registros(25, 10)}, latencia=latencia, recursos=recursos) as servidor:
+        for configuracion, ligero in (("actual", False), ("ligero", True)):
+            arranques, primeras_filas = [], []
+            for i in range(repeticiones):
+                perfil = os.path.join(carpeta, f"{configuracion}_{i}")
+                if origen and ligero:
+                    copiar_perfil_minimo(perfil, origen=origen)
+                elif origen:
+                    copiar_perfil(perfil, origen=origen)
+
+                inicio = time.perf_counter()
+                driver = open_page.iniciar_navegador(cerrar_previo=False, headless=True, user_data_dir=perfil,
+                                                     navegador=navegador, ligero=ligero)
+                arranques.append(time.perf_counter() - inicio)
+                try:
+                    inicio = time.perf_counter()
+                    driver.get(f"{servidor.url_pagina}?code={code}")
+                    esperar_tabla(driver)
+                    primeras_filas.append(time.perf_counter() - inicio)
+                finally:
+                    driver.quit()
+            resultados[configuracion] = {
+                "arranque": resumen_latencias(arranques),
+                "primera_fila": resumen_latencias(primeras_filas),
+            }
+    return resultados
+
+
+def _medir_inicio(navegador, ruta_cache, lanzar):
+    """Ejecuta SCRIPT_INICIO en un proceso nuevo con la caché de drivers indicada"""
+    entorno = dict(os.environ, SLIR_CACHE_DRIVERS=ruta_cache)
+    salida = subprocess.run([sys.executable, "-c", SCRIPT_INICIO, navegador, "1" if lanzar else "0"],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=entorno,
+                            capture_output=True, text=True, check=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def benchmark_inicio(navegador="edge", repeticiones=3, lanzar=True):
+    """
+    Compara el inicio en frío (caché de drivers vacía: pregunta a Selenium Manager) con
+    el inicio en caliente (ruta del driver ya guardada), cada medida en un proceso nuevo
+
+    Args:
+        lanzar (bool): Si False, no se arranca el navegador (solo importaciones y driver)
+
+    Returns:
+        dict: {"frio": {...}, "caliente": {...}} con la mediana (p50) en segundos de cada fase
+    """
+    resultados = {}
+    with tempfile.TemporaryDirectory() as carpeta:
+        for tipo in ("frio", "caliente"):
+            medidas = []
+            for i in range(repeticiones):
+                ruta_cache = os.path.join(carpeta, f"drivers_{i}.json")
+                if tipo == "frio" and os.path.exists(ruta_cache):
+                    os.remove(ruta_cache)
+                medidas.append(_medir_inicio(navegador, ruta_cache, lanzar))
+            resultados[tipo] = {
+                fase: resumen_latencias([m[fase] for m in medidas])["p50"]
+                for fase in ("importacion", "selenium", "driver", "navegador", "total")
+                if all(m[fase] is not None for m in medidas)
+            }
+            resultados[tipo]["ruta_driver"] = medidas[-1]["ruta_driver"]
+    return resultados
+
+
+def benchmark_tabla_virtual(navegador="edge", filas=5000, columnas=COLUMNAS_BENCHMARK, repeticiones=3):
+    """
+    Lee una página de filas × columnas con scroll virtual (por tramos del visor) y la
+    misma página pintada entera en el DOM (una sola lectura)
+
+    Returns:
+        dict: {"dom_completo": {...}, "virtual": {...}} con filas leídas,
+              comandos WebDriver, latencias y filas por segundo
+    """
+    code = "SLIRVIRTUAL"
+    registros = generar_registros(filas, columnas)
+    resultados = {}
+    driver = crear_driver_benchmark(navegador)
+    contador = ContadorComandos(driver)
+    try:
+        for nombre, virtual in (("dom_completo", False), ("virtual", True)):
+            with ServidorMock({code: registros}, tamanos_pagina=(filas,), virtual=virtual) as servidor:
+                driver.get(f"{servidor.url_pagina}?code={code}")
+                esperar_tabla(driver)
+                tiempos, comandos = [], []
+                for _ in range(repeticiones):
+                    contador.reiniciar()
+                    inicio = time.perf_counter()
+                    leidas = extraer_filas_compactas(driver, virtual=virtual)
+                    tiempos.append(time.perf_counter() - inicio)
+                    comandos.append(contador.total)
+                resultados[nombre] = {
+                    "filas": len(leidas),
+                    "completa": len(leidas) == filas,
+                    **resumen_latencias(tiempos, comandos),
+                    "filas_por_segundo": round(len(leidas) / (sum(tiempos) / len(tiempos)), 1),
+                }
+    finally:
+        contador.desenganchar()
+        driver.quit()
+    return resultados
+
+
+def ruta_base(navegador):
+    """Fichero con la base de comparación de cada navegador"""
+    return os.path.join(obtener_directorio_salida(), f"benchmark_base_{navegador}.json")
+
+
+def comparar_con_base(resultados, base, tolerancia=TOLERANCIA_REGRESION):
+    """
+    Compara p95 y comandos por llamada con una ejecución anterior
+
+    Args:
+        resultados (list): Resultados de benchmark_sitio_mock
+        base (list): Resultados guardados de una ejecución anterior
+        tolerancia (float): Empeoramiento relativo permitido (0.25 = 25 %)
+
+    Returns:
+        list: Textos con cada regresión encontrada (vacía si no hay ninguna)
+    """
+    anteriores = {r["escenario"]: r for r in base}
+    regresiones = []
+    for r in resultados:
+        anterior = anteriores.get(r["escenario"])
+        if not anterior:
+            continue
+        for funcion, datos in r.items():
+            previo = anterior.get(funcion)
+            if not isinstance(datos, dict) or not isinstance(previo, dict):
+                continue
+            for metrica in ("p95", "comandos"):
+                if metrica not in datos or not previo.get(metrica):
+                    continue
+                cambio = (datos[metrica] - previo[metrica]) / previo[metrica]
+                if cambio > tolerancia:
+                    regresiones.append(f"{r['escenario']}/{funcion}: {metrica} "
+                                       f"{previo[metrica]} -> {datos[metrica]} (+{cambio:.0%})")
+            if "filas_por_segundo" in datos and previo.get("filas_por_segundo"):
+                cambio = (previo["filas_por_segundo"] - datos["filas_por_segundo"]) / previo["filas_por_segundo"]
+                if cambio > tolerancia:
+                    regresiones.append(f"{r['escenario']}/{funcion}: filas_por_segundo "
+                                       f"{previo['filas_por_segundo']} -> {datos['filas_por_segundo']} "
+                                       f"(-{cambio:.0%})")
+    return regresiones
+
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    navegador = argumentos[0] if argumentos else "edge"
+    modo = argumentos[1] if len(argumentos) > 1 else "tabla"
+
+    if modo == "motores":
+        for motor, datos in benchmark_motores(navegador).items():
+            print(f"{motor:>9}: {datos['codigos_por_minuto']} códigos/minuto "
+                  f"({datos['exitosos']} exitosos en {datos['segundos']} s)")
+        sys.exit(0)
+
+    if modo == "memoria":
+        for representacion, datos in benchmark_memoria().items():
+            print(f"{representacion:>13}: {datos['filas']} filas, {datos['mb_retenidos']} MB retenidos "
+                  f"(pico {datos['mb_pico']} MB), escritura CSV {datos['segundos_escritura']} s "
+                  f"(pico {datos['mb_pico_escritura']} MB)")
+        sys.exit(0)
+
+    if modo == "arranque":
+        for configuracion, datos in benchmark_arranque(navegador).items():
+            print(f"{configuracion:>7}: arranque p50 {datos['arranque']['p50']} s, "
+                  f"primera fila p50 {datos['primera_fila']['p50']} s")
+        sys.exit(0)
+
+    if modo == "inicio":
+        for tipo, datos in benchmark_inicio(navegador, lanzar="--sin-navegador" not in sys.argv).items():
+            fases = ", ".join(f"{fase} {datos[fase]} s" for fase in
+                              ("importacion", "selenium", "driver", "navegador") if fase in datos)
+            print(f"{tipo:>8}: total p50 {datos['total']} s ({fases}); driver {datos['ruta_driver']}")
+        sys.exit(0)
+
+    if modo == "virtual":
+        for lectura, datos in benchmark_tabla_virtual(navegador).items():
+            print(f"{lectura:>12}: {datos['filas']} filas ({'completa' if datos['completa'] else 'INCOMPLETA'}), "
+                  f"{datos['filas_por_segundo']} filas/s, p50 {datos['p50']} s, {datos['comandos']} comandos")
+        sys.exit(0)
+
+    if modo == "mock":
+        resultados = benchmark_sitio_mock(navegador)
+        imprimir_resultados_mock(resultados)
+
+        ruta = ruta_base(navegador)
+        regresiones = []
+        if os.path.exists(ruta):
+            with open(ruta, encoding="utf-8") as f:
+                regresiones = comparar_con_base(resultados, json.load(f))
+            if regresiones:
+                print("\nRegresiones respecto a la base:")
+                for texto in regresiones:
+                    print(f"- {texto}")
+            else:
+                print("\nSin regresiones respecto a la base.")
+        if "--guardar-base" in sys.argv or not os.path.exists(ruta):
+            with open(ruta, "w", encoding="utf-8") as f:
+                json.dump(resultados, f, ensure_ascii=False, indent=2)
+            print(f"Base guardada en: {ruta}")
+        sys.exit(1 if regresiones else 0)
+
+    driver = crear_driver_benchmark(navegador)
+    try:
+        imprimir_resultados(benchmark_extract_table_rows(driver))
+    finally:
+        driver.quit()
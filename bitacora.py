@@ -0,0 +1,215 @@
+"""
+Registro (logging) de la extracción SLIR con niveles, ficheros rotativos y muestreo
+
+Todos los módulos escriben con obtener_logger(__name__) bajo el logger "slir" en
+lugar de print. configurar_logs (lo llaman los puntos de entrada) decide qué se ve:
+
+    silencioso  (por defecto) En consola solo avisos, errores y una línea de
+                resumen por código (logger "slir.resumen")
+    info        Además, los mensajes de progreso (códigos, sesiones, páginas detectadas)
+    debug       Todo, incluidos los mensajes por página y por clic
+
+En disco cada hilo (worker) escribe en su propio fichero rotativo de logs/, así que
+el espacio está acotado (max_bytes × (copias + 1) por worker) por muchos códigos que
+se procesen. El log de msedgedriver (una traza INFO por comando) solo se guarda
+completo en una fracción de los navegadores (MUESTREO_LOG_DRIVER); el resto solo
+registra errores graves.
+
+Uso:
+    log = obtener_logger(__name__)
+    log.info("...")
+
+    configurar_logs("silencioso")   # en el punto de entrada
+"""
+import logging
+import logging.handlers
+import os
+import random
+import re
+import threading
+
+# Carpeta de los logs (ficheros por worker y de msedgedriver)
+LOGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
+# Modo por defecto; SLIR_LOG_NIVEL permite cambiarlo sin tocar el código
+MODO_POR_DEFECTO = os.environ.get("SLIR_LOG_NIVEL", "silencioso")
+# Nivel de consola y de los ficheros en cada modo
+MODOS = {
+    "silencioso": (logging.WARNING, logging.INFO),
+    "info": (logging.INFO, logging.INFO),
+    "debug": (logging.DEBUG, logging.DEBUG),
+}
+# Tamaño de cada fichero por worker antes de rotar, y ficheros rotados que se conservan
+MAX_BYTES_LOG = 5 * 1024 * 1024
+COPIAS_LOG = 3
+# Fracción de navegadores que guardan el log completo de msedgedriver (SLIR_MUESTREO_LOG_DRIVER)
+MUESTREO_LOG_DRIVER = float(os.environ.get("SLIR_MUESTREO_LOG_DRIVER", "0.02"))
+# Tamaño a partir del cual el log de msedgedriver se rota al arrancar un navegador
+MAX_BYTES_LOG_DRIVER = 20 * 1024 * 1024
+
+_RAIZ = "slir"
+_configuracion = {"modo": None}
+_lock = threading.Lock()
+
+
+def obtener_logger(nombre):
+    """Logger de un módulo dentro de la jerarquía "slir" (p. ej. slir.extract_info)"""
+    return logging.getLogger(f"{_RAIZ}.{nombre}")
+
+
+class _FormatoConsola(logging.Formatter):
+    """Mensaje tal cual; los avisos y errores llevan delante su nivel"""
+
+    def format(self, record):
+        mensaje = super().format(record)
+        if record.levelno >= logging.WARNING:
+            return f"{record.levelname}: {mensaje}"
+        return mensaje
+
+
+class _FiltroConsola(logging.Filter):
+    """Deja pasar los registros del nivel de consola y siempre el resumen por código"""
+
+    def __init__(self, nivel):
+        super().__init__()
+        self.nivel = nivel
+
+    def filter(self, record):
+        return record.levelno >= self.nivel or record.name == f"{_RAIZ}.resumen"
+
+
+class ManejadorPorHilo(logging.Handler):
+    """
+    Manda cada registro al fichero rotativo de su hilo: logs/<hilo>.log
+
+    Los workers del lote (slir-worker-N), de la cola (slir-cola-N) y el hilo
+    principal (slir.log) tienen cada uno su fichero.
+    """
+
+    def __init__(self, directorio=LOGS_DIR, max_bytes=MAX_BYTES_LOG, copias=COPIAS_LOG):
+        super().__init__()
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.copias = copias
+        self._manejadores = {}
+        os.makedirs(directorio, exist_ok=True)
+
+    def _manejador(self, hilo):
+        nombre = "slir" if hilo == "MainThread" else re.sub(r"[^\w.-]", "_", hilo)
+        manejador = self._manejadores.get(nombre)
+        if manejador is None:
+            manejador = logging.handlers.RotatingFileHandler(
+                os.path.join(self.directorio, f"{nombre}.log"), maxBytes=self.max_bytes,
+                backupCount=self.copias, encoding="utf-8", delay=True)
+            manejador.setFormatter(self.formatter)
+            self._manejadores[nombre] = manejador
+        return manejador
+
+    def emit(self, record):
+        try:
+            self._manejador(record.threadName).emit(record)
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        for manejador in self._manejadores.values():
+            manejador.close()
+        self._manejadores = {}
+        super().close()
+
+
+def configurar_logs(modo=None, directorio=LOGS_DIR, ficheros=True):
+    """
+    Configura la consola y los ficheros por worker del logger "slir"
+
+    Se puede llamar varias veces (p. ej. para cambiar de modo); sustituye la configuración anterior.
+
+    Args:
+        modo (str): "silencioso", "info" o "debug"; por defecto SLIR_LOG_NIVEL o "silencioso"
+        directorio (str): Carpeta de los ficheros de log
+        ficheros (bool): Si False, solo se escribe en consola
+    """
+    modo = modo or MODO_POR_DEFECTO
+    if modo not in MODOS:
+        raise ValueError(f"Modo de log desconocido: {modo} (opciones: {', '.join(MODOS)})")
+    nivel_consola, nivel_ficheros = MODOS[modo]
+
+    with _lock:
+        raiz = logging.getLogger(_RAIZ)
+        for manejador in list(raiz.handlers):
+            raiz.removeHandler(manejador)
+            manejador.close()
+        raiz.setLevel(min(nivel_consola, nivel_ficheros))
+        # Los mensajes de "slir" no pasan al logger raíz de la aplicación que nos use
+        raiz.propagate = False
+
+        consola = logging.StreamHandler()
+        consola.setFormatter(_FormatoConsola("%(message)s"))
+        consola.addFilter(_FiltroConsola(nivel_consola))
+        raiz.addHandler(consola)
+
+        if ficheros:
+            por_hilo = ManejadorPorHilo(directorio)
+            por_hilo.setLevel(nivel_ficheros)
+            por_hilo.setFormatter(logging.Formatter(
+                "%(asctime)s %(levelname)s [%(threadName)s] %(name)s: %(message)s"))
+            raiz.addHandler(por_hilo)
+        _configuracion["modo"] = modo
+
+
+def modo_actual():
+    """Modo configurado con configurar_logs, o None si no se ha configurado"""
+    return _configuracion["modo"]
+
+
+def _rotar_si_grande(ruta, max_bytes=MAX_BYTES_LOG_DRIVER):
+    """Renombra el fichero a <ruta>.1 si supera max_bytes (se pierde el .1 anterior)"""
+    try:
+        if os.path.getsize(ruta) > max_bytes:
+            os.replace(ruta, ruta + ".1")
+    except OSError:
+        pass
+
+
+def opciones_log_driver(log_path, muestreo=None):
+    """
+    Decide cómo registra msedgedriver un navegador nuevo
+
+    Solo una fracción de los navegadores (o todos en modo debug) guardan el log
+    completo; el resto se arranca con --log-level=SEVERE. En ambos casos el fichero
+    se rota si ha crecido demasiado.
+
+    Args:
+        log_path (str): Fichero de log del navegador
+        muestreo (float): Fracción de navegadores con log completo; por defecto MUESTREO_LOG_DRIVER
+
+    Returns:
+        tuple: (log_path, argumentos para el Service de Selenium)
+    """
+    muestreo = MUESTREO_LOG_DRIVER if muestreo is None else muestreo
+    os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+    _rotar_si_grande(log_path)
+    if modo_actual() == "debug" or random.random() < muestreo:
+        obtener_logger(__name__).debug(f"Log completo de msedgedriver en {log_path}")
+        return log_path, []
+    return log_path, ["--log-level=SEVERE"]
+
+
+def registrar_resumen_codigo(code, resultado, segundos):
+    """
+    Escribe la línea de resumen de un código (lo único que se ve en modo silencioso)
+
+    Args:
+        code (str): Código SLIR
+        resultado (dict): Resultado de process_slir_code (o None)
+        segundos (float): Duración total del código
+    """
+    log = obtener_logger("resumen")
+    resultado = resultado or {}
+    if resultado.get("sin_cambios"):
+        log.info(f"{code}: sin cambios ({segundos:.1f} s)")
+    elif resultado.get("success"):
+        filas = (resultado.get("data") or {}).get("total_rows")
+        log.info(f"{code}: ok, {filas} filas, {resultado.get('pages_processed')} páginas, {segundos:.1f} s")
+    else:
+        motivo = resultado.get("error") or resultado.get("message") or "sin resultado"
+        log.info(f"{code}: FALLIDO ({motivo}), {segundos:.1f} s")
@@ -0,0 +1,164 @@
+from contextlib import closing
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from bitacora import obtener_logger
+from extract_info import obtener_directorio_salida
+
+log = obtener_logger(__name__)
+
+
+# Caducidad por defecto: pasado este tiempo se vuelve a extraer el código aunque no cambie
+TTL_POR_DEFECTO = 7 * 24 * 3600
+# Máximo de códigos guardados; al superarlo se eliminan los usados hace más tiempo
+MAX_CODIGOS_POR_DEFECTO = 100000
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS codigos (
+    code TEXT PRIMARY KEY,
+    total_paginas INTEGER,
+    total_filas INTEGER,
+    hash_primera TEXT,
+    fichero TEXT,
+    actualizado REAL,
+    ultimo_acceso REAL
+);
+CREATE TABLE IF NOT EXISTS paginas (
+    code TEXT,
+    pagina INTEGER,
+    hash TEXT,
+    filas INTEGER,
+    PRIMARY KEY (code, pagina)
+);
+CREATE INDEX IF NOT EXISTS idx_codigos_acceso ON codigos (ultimo_acceso);
+"""
+
+
+def hash_filas(filas):
+    """Huella estable del contenido de una página"""
+    if not isinstance(filas, list):
+        # Filas compactas (FilasPagina): la huella es la misma que la de sus diccionarios
+        filas = list(filas)
+    contenido = json.dumps(filas, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha1(contenido.encode("utf-8")).hexdigest()
+
+
+class CacheSlir:
+    """
+    Caché local (SQLite) de lo extraído por código SLIR para refrescos incrementales
+
+    Guarda el hash de cada página, el total de páginas y filas y el fichero generado.
+    En la siguiente ejecución, si la primera página y el número de páginas coinciden
+    y la entrada no ha caducado, el código se da por no modificado y no se vuelve a
+    recorrer. Se puede compartir entre hilos (cada operación abre su conexión).
+
+    Uso:
+        cache = CacheSlir()
+        process_slir_code(code, cache=cache)
+    """
+
+    def __init__(self, ruta=None, ttl=TTL_POR_DEFECTO, max_codigos=MAX_CODIGOS_POR_DEFECTO):
+        """
+        Args:
+            ruta (str): Fichero SQLite; por defecto output/slir_cache.sqlite3
+            ttl (float): Segundos tras los que una entrada caduca
+            max_codigos (int): Códigos como máximo antes de desalojar los menos usados
+        """
+        self.ruta = ruta or os.path.join(obtener_directorio_salida(), "slir_cache.sqlite3")
+        self.ttl = ttl
+        self.max_codigos = max_codigos
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.executescript(ESQUEMA)
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    hash_filas = staticmethod(hash_filas)
+
+    def obtener(self, code):
+        """Devuelve la entrada de un código (dict) o None"""
+        with closing(self._conectar()) as conexion:
+            conexion.row_factory = sqlite3.Row
+            fila = conexion.execute("SELECT * FROM codigos WHERE code = ?", (code,)).fetchone()
+            return dict(fila) if fila else None
+
+    def sin_cambios(self, code, total_paginas, hash_primera):
+        """
+        Comprueba si un código está en caché, vigente y con la misma primera página y número de páginas
+
+        Returns:
+            dict: Entrada de la caché si no hay cambios, o None si hay que extraerlo
+        """
+        if not total_paginas:
+            return None
+        entrada = self.obtener(code)
+        if not entrada:
+            return None
+        if time.time() - entrada["actualizado"] > self.ttl:
+            log.info(f"La caché de {code} ha caducado, se vuelve a extraer.")
+            return None
+        if entrada["total_paginas"] != total_paginas or entrada["hash_primera"] != hash_primera:
+            return None
+
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute("UPDATE codigos SET ultimo_acceso = ? WHERE code = ?", (time.time(), code))
+        return entrada
+
+    def hashes_paginas(self, code):
+        """Devuelve {pagina: hash} de la última extracción del código"""
+        with closing(self._conectar()) as conexion:
+            return dict(conexion.execute(
+                "SELECT pagina, hash FROM paginas WHERE code = ?", (code,)).fetchall())
+
+    def guardar(self, code, total_paginas, total_filas, hashes, filas_por_pagina, fichero):
+        """
+        Guarda el resultado de una extracción completa
+
+        Args:
+            code (str): Código SLIR
+            total_paginas (int): Páginas del código
+            total_filas (int): Filas extraídas
+            hashes (dict): {pagina: hash de sus filas}
+            filas_por_pagina (dict): {pagina: número de filas}
+            fichero (str): Fichero o dataset donde se escribieron los datos
+        """
+        ahora = time.time()
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute(
+                "INSERT OR REPLACE INTO codigos VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (code, total_paginas, total_filas, hashes.get(1), fichero, ahora, ahora))
+            conexion.execute("DELETE FROM paginas WHERE code = ?", (code,))
+            conexion.executemany(
+                "INSERT INTO paginas VALUES (?, ?, ?, ?)",
+                [(code, pagina, h, filas_por_pagina.get(pagina, 0)) for pagina, h in hashes.items()])
+        self.desalojar()
+
+    def invalidar(self, code):
+        """Elimina un código de la caché"""
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute("DELETE FROM codigos WHERE code = ?", (code,))
+            conexion.execute("DELETE FROM paginas WHERE code = ?", (code,))
+
+    def desalojar(self):
+        """
+        Elimina las entradas caducadas y, si se supera max_codigos, las usadas hace más tiempo
+
+        Returns:
+            int: Códigos eliminados
+        """
+        limite = time.time() - self.ttl
+        with closing(self._conectar()) as conexion, conexion:
+            eliminados = conexion.execute(
+                "DELETE FROM codigos WHERE actualizado < ?", (limite,)).rowcount
+            total = conexion.execute("SELECT COUNT(*) FROM codigos").fetchone()[0]
+            if total > self.max_codigos:
+                eliminados += conexion.execute(
+                    "DELETE FROM codigos WHERE code IN "
+                    "(SELECT code FROM codigos ORDER BY ultimo_acceso LIMIT ?)",
+                    (total - self.max_codigos,)).rowcount
+            conexion.execute("DELETE FROM paginas WHERE code NOT IN (SELECT code FROM codigos)")
+        return eliminados
@@ -0,0 +1,209 @@
+"""
+Captura de las respuestas JSON que rellenan la tabla mientras se navega con Selenium
+
+En lugar de esperar a que la tabla se pinte y leer su texto, las filas de cada página
+se toman de la respuesta XHR/fetch que la aplicación recibe del backend: se leen del
+registro de rendimiento del navegador (eventos Network) y el cuerpo se pide con
+Network.getResponseBody. Los valores conservan su tipo (números, booleanos, null).
+
+Los nombres de columna se deducen en la primera página comparando el JSON con la
+tabla pintada, así que el resultado tiene las mismas columnas que la extracción DOM.
+Si no se captura nada reconocible se vuelve a leer la tabla del DOM.
+
+Requiere arrancar el navegador con capturar_red=True (ver iniciar_navegador).
+
+Uso:
+    process_slir_code(code, captura=CapturaRed())
+"""
+import base64
+import json
+import os
+import re
+
+from api_extractor import filas_de_respuesta, registros_a_filas
+from bitacora import obtener_logger
+from extract_info import SCRIPT_SNAPSHOT_TABLA
+
+log = obtener_logger(__name__)
+
+
+# Expresión regular de las URL de datos de la tabla (comprobar en la pestaña Network de DevTools)
+PATRON_DATOS = os.environ.get("SLIR_PATRON_CAPTURA", r"/api/single-slir/")
+# Filas de la primera página que se comparan con la tabla para deducir las columnas
+FILAS_MUESTRA = 5
+
+
+def _valor_como_texto(valor):
+    """Texto con el que la tabla mostraría un valor del JSON"""
+    if valor is None:
+        return ""
+    if isinstance(valor, bool):
+        return "true" if valor else "false"
+    return str(valor).strip()
+
+
+def _coincide(valor, texto):
+    esperado = _valor_como_texto(valor)
+    texto = (texto or "").strip()
+    if esperado.lower() == texto.lower():
+        return True
+    # Números que la tabla muestra con otro formato (1.0 frente a 1)
+    try:
+        return float(esperado) == float(texto)
+    except ValueError:
+        return False
+
+
+def mapear_columnas(headers, matriz, registros, filas_muestra=FILAS_MUESTRA):
+    """
+    Deduce a qué clave del JSON corresponde cada columna de la tabla
+
+    Args:
+        headers (list): Encabezados de la tabla
+        matriz (list): Celdas de las filas pintadas
+        registros (list): Registros JSON de la misma página
+
+    Returns:
+        dict: {clave_json: encabezado} en el orden de la tabla, o None si alguna
+              columna no tiene una clave que coincida en todas las filas de muestra
+    """
+    if not headers or not registros or len(matriz) != len(registros):
+        return None
+
+    muestra = list(zip(matriz, registros))[:filas_muestra]
+    columnas = {}
+    for i, encabezado in enumerate(headers):
+        candidatas = [
+            clave for clave in registros[0]
+            if clave not in columnas
+            and all(isinstance(registro, dict) and i < len(celdas) and _coincide(registro.get(clave), celdas[i])
+                    for celdas, registro in muestra)
+        ]
+        if not candidatas:
+            return None
+        # Con varias claves posibles se prefiere la de nombre más parecido al encabezado
+        normalizado = re.sub(r"[^a-z0-9]", "", encabezado.lower())
+        candidatas.sort(key=lambda c: re.sub(r"[^a-z0-9]", "", c.lower()) != normalizado)
+        columnas[candidatas[0]] = encabezado
+    return columnas
+
+
+class CapturaRed:
+    """
+    Filas de cada página tomadas de la respuesta JSON capturada
+
+    Guarda estado del código en curso (columnas deducidas): usar una por hilo.
+    """
+
+    def __init__(self, patron=PATRON_DATOS, columnas=None, tipado=True):
+        """
+        Args:
+            patron (str): Expresión regular de las URL de datos
+            columnas (dict): {clave_json: encabezado} fijo; si no se da se deduce de la tabla
+            tipado (bool): Si True, conserva los tipos del JSON; si False, todo como texto
+        """
+        self.patron = re.compile(patron)
+        self.columnas_fijas = columnas
+        self.tipado = tipado
+        self.driver = None
+        self.columnas = columnas
+        self.activa = False
+        self._pendientes = {}
+        self.paginas_capturadas = 0
+        self.paginas_dom = 0
+
+    def iniciar(self, driver):
+        """Prepara la captura para un código nuevo en el driver indicado"""
+        self.driver = driver
+        self.columnas = self.columnas_fijas
+        self._pendientes = {}
+        self.paginas_capturadas = 0
+        self.paginas_dom = 0
+        self.activa = True
+
+    def _cuerpo(self, request_id):
+        try:
+            respuesta = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            # El navegador ya no guarda el cuerpo (p. ej. tras una navegación)
+            return None
+        cuerpo = respuesta.get("body", "")
+        if respuesta.get("base64Encoded"):
+            cuerpo = base64.b64decode(cuerpo).decode("utf-8")
+        try:
+            return json.loads(cuerpo)
+        except ValueError:
+            return None
+
+    def respuestas(self):
+        """
+        Lee del registro de rendimiento las respuestas de datos terminadas desde la última lectura
+
+        Returns:
+            list: Cuerpos JSON en orden de llegada
+        """
+        cuerpos = []
+        for entrada in self.driver.get_log("performance"):
+            try:
+                mensaje = json.loads(entrada["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            metodo = mensaje.get("method")
+            params = mensaje.get("params", {})
+
+            if metodo == "Network.responseReceived":
+                respuesta = params.get("response", {})
+                if self.patron.search(respuesta.get("url", "")) and "json" in respuesta.get("mimeType", ""):
+                    self._pendientes[params["requestId"]] = respuesta["url"]
+            elif metodo == "Network.loadingFinished" and params.get("requestId") in self._pendientes:
+                self._pendientes.pop(params["requestId"])
+                cuerpo = self._cuerpo(params["requestId"])
+                if cuerpo is not None:
+                    cuerpos.append(cuerpo)
+            elif metodo == "Network.loadingFailed":
+                self._pendientes.pop(params.get("requestId"), None)
+        return cuerpos
+
+    def extraer_pagina(self):
+        """
+        Filas de la página mostrada a partir de la última respuesta de datos recibida
+
+        Returns:
+            dict: {"table_data": filas} como extract_table_data, o None si no se capturó
+                  ninguna respuesta nueva (hay que leer la tabla del DOM)
+        """
+        if not self.activa:
+            self.paginas_dom += 1
+            return None
+
+        try:
+            cuerpos = self.respuestas()
+        except Exception as e:
+            log.warning(f"El navegador no tiene el registro de red activado; se lee la tabla del DOM: {e}")
+            self.activa = False
+            self.paginas_dom += 1
+            return None
+
+        registros = None
+        for cuerpo in reversed(cuerpos):
+            registros = filas_de_respuesta(cuerpo)
+            if registros:
+                break
+        if not registros:
+            self.paginas_dom += 1
+            return None
+
+        if self.columnas is None:
+            snapshot = self.driver.execute_script(SCRIPT_SNAPSHOT_TABLA)
+            self.columnas = mapear_columnas(snapshot.get("headers") or [], snapshot.get("rows") or [],
+                                            registros)
+            if self.columnas is None:
+                log.warning("Las respuestas capturadas no coinciden con la tabla; se lee la tabla del DOM.")
+                self.activa = False
+                self.paginas_dom += 1
+                return None
+
+        filas = registros_a_filas(registros, self.columnas, self.tipado)
+        self.paginas_capturadas += 1
+        log.debug(f"Datos de la tabla capturados de la red: {len(filas)} filas")
+        return {"table_data": filas}
@@ -0,0 +1,510 @@
+"""
+Cola de trabajo compartida para repartir códigos SLIR entre varias máquinas
+
+Cada máquina arranca sus workers con trabajar_cola: piden un código a la cola
+(reservar), lo procesan con process_slir_code y publican el resultado (completar o
+fallar). Mientras procesan, renuevan su reserva (lease) periódicamente; si una
+máquina cae, su reserva vence (tiempo de visibilidad) y otro worker recoge el
+código. Un código que falla max_intentos veces pasa a la cola de muertos (estado
+"muerta") para revisarlo a mano.
+
+Backends:
+    ColaSqlite   Fichero SQLite en un volumen compartido entre máquinas
+    ColaMemoria  Misma interfaz en memoria, para una sola máquina o pruebas
+
+Los ficheros de salida se nombran con el código y el id_salida de la cola en lugar
+de la hora, así que repetir un código (en otra máquina o tras un fallo) sobrescribe
+o reanuda el mismo fichero en vez de crear uno nuevo. SLIR_OUTPUT_DIR permite
+dejar la salida en el volumen compartido.
+
+Uso:
+    python cola_trabajo.py encolar codigos.txt [ruta_cola]
+    python cola_trabajo.py trabajar [num_workers] [ruta_cola]
+    python cola_trabajo.py estado [ruta_cola]
+    python cola_trabajo.py reactivar [ruta_cola]
+"""
+from contextlib import closing, contextmanager
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+from batch_runner import LOGS_DIR, leer_codigos
+from bitacora import configurar_logs, obtener_logger
+from driver_pool import DriverPool
+from extract_info import obtener_directorio_salida, process_slir_code
+from perfiles import preparar_perfiles_workers
+from politicas import Cortacircuitos, Politica
+
+log = obtener_logger(__name__)
+
+
+# Segundos que un código reservado queda oculto a los demás workers si no se renueva
+VISIBILIDAD = 15 * 60
+# Intentos antes de mandar un código a la cola de muertos
+MAX_INTENTOS = 3
+# Espera antes de volver a ofrecer un código que falló (se duplica en cada intento)
+ESPERA_REINTENTO = 30
+# Nombre de esta máquina en la cola y en las estadísticas
+HOST = os.environ.get("SLIR_HOST", socket.gethostname())
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS tareas (
+    code TEXT PRIMARY KEY,
+    estado TEXT NOT NULL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    lease TEXT,
+    host TEXT,
+    worker TEXT,
+    visible_desde REAL NOT NULL,
+    creada REAL NOT NULL,
+    inicio REAL,
+    fin REAL,
+    segundos REAL,
+    filas INTEGER,
+    resultado TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tareas_estado ON tareas (estado, visible_desde);
+CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT);
+"""
+
+
+class Tarea:
+    """Código reservado por un worker"""
+
+    def __init__(self, code, lease, intentos):
+        self.code = code
+        self.lease = lease
+        self.intentos = intentos
+
+
+class ColaTrabajo:
+    """
+    Interfaz común de las colas
+
+    Estados de una tarea: pendiente, en_curso, hecha y muerta. Una tarea en_curso
+    cuya reserva ha vencido se vuelve a entregar como si estuviera pendiente.
+
+    Attributes:
+        id_salida (str): Marca que se usa en los nombres de fichero en lugar de la hora
+    """
+
+    id_salida = None
+
+    def encolar(self, codigos):
+        """Añade códigos (los que ya estén en la cola se ignoran). Devuelve cuántos se añadieron"""
+        raise NotImplementedError
+
+    def reservar(self, host, worker, visibilidad=VISIBILIDAD):
+        """Entrega la siguiente tarea visible, o None si no hay ninguna"""
+        raise NotImplementedError
+
+    def renovar(self, tarea, visibilidad=VISIBILIDAD):
+        """Amplía la reserva. Devuelve False si ya no es de este worker"""
+        raise NotImplementedError
+
+    def completar(self, tarea, resultado):
+        """Marca la tarea como hecha. Devuelve False si la reserva ya no era de este worker"""
+        raise NotImplementedError
+
+    def fallar(self, tarea, error, resultado=None):
+        """Devuelve la tarea a la cola con espera, o a la cola de muertos si agotó los intentos"""
+        raise NotImplementedError
+
+    def reactivar_muertas(self):
+        """Vuelve a poner pendientes las tareas muertas. Devuelve cuántas"""
+        raise NotImplementedError
+
+    def tareas(self):
+        """Lista de todas las tareas como diccionarios"""
+        raise NotImplementedError
+
+    def quedan(self):
+        """Si queda algo pendiente o en curso (aunque no sea visible todavía)"""
+        return any(t["estado"] in ("pendiente", "en_curso") for t in self.tareas())
+
+    @contextmanager
+    def latido(self, tarea, visibilidad=VISIBILIDAD):
+        """Renueva la reserva en segundo plano mientras dura el bloque"""
+        parar = threading.Event()
+
+        def renovar():
+            while not parar.wait(visibilidad / 3):
+                if not self.renovar(tarea, visibilidad):
+                    log.warning(f"[cola] Se perdió la reserva de {tarea.code}")
+                    return
+
+        hilo = threading.Thread(target=renovar, name=f"latido-{tarea.code}", daemon=True)
+        hilo.start()
+        try:
+            yield
+        finally:
+            parar.set()
+            hilo.join()
+
+    def estadisticas(self):
+        """
+        Estado de la cola y rendimiento por máquina
+
+        Returns:
+            dict: {"estados": {estado: n}, "hosts": {host: {"codigos", "exitosos",
+                  "fallidos", "filas", "segundos", "codigos_por_minuto"}}}
+        """
+        estados = {"pendiente": 0, "en_curso": 0, "hecha": 0, "muerta": 0}
+        hosts = {}
+        for t in self.tareas():
+            estados[t["estado"]] = estados.get(t["estado"], 0) + 1
+            if t["estado"] not in ("hecha", "muerta") or not t["host"]:
+                continue
+            h = hosts.setdefault(t["host"], {"codigos": 0, "exitosos": 0, "fallidos": 0, "filas": 0,
+                                             "segundos": 0.0, "_inicio": t["inicio"], "_fin": t["fin"]})
+            h["codigos"] += 1
+            h["exitosos" if t["estado"] == "hecha" else "fallidos"] += 1
+            h["filas"] += t["filas"] or 0
+            h["segundos"] = round(h["segundos"] + (t["segundos"] or 0), 2)
+            h["_inicio"] = min(h["_inicio"] or t["inicio"], t["inicio"] or h["_inicio"])
+            h["_fin"] = max(h["_fin"] or 0, t["fin"] or 0)
+        for h in hosts.values():
+            # Códigos por minuto de reloj entre el primer inicio y el último fin de la máquina
+            ventana = (h.pop("_fin") or 0) - (h.pop("_inicio") or 0)
+            h["codigos_por_minuto"] = round(h["codigos"] / ventana * 60, 2) if ventana > 0 else 0
+        return {"estados": estados, "hosts": hosts}
+
+
+def _espera_reintento(intentos):
+    return ESPERA_REINTENTO * 2 ** max(0, intentos - 1)
+
+
+class ColaSqlite(ColaTrabajo):
+    """
+    Cola en un fichero SQLite que pueden compartir varias máquinas
+
+    Cada operación abre su conexión y las reservas se hacen en una transacción
+    BEGIN IMMEDIATE, así que dos workers nunca reciben el mismo código a la vez.
+    """
+
+    def __init__(self, ruta=None, max_intentos=MAX_INTENTOS, id_salida=None):
+        """
+        Args:
+            ruta (str): Fichero SQLite; por defecto output/slir_cola.sqlite3
+            max_intentos (int): Intentos antes de pasar un código a la cola de muertos
+            id_salida (str): Marca de los ficheros de salida; si no se da, la cola
+                             genera una al crearse y la comparten todas las máquinas
+        """
+        self.ruta = ruta or os.path.join(obtener_directorio_salida(), "slir_cola.sqlite3")
+        self.max_intentos = max_intentos
+        with closing(self._conectar()) as conexion, conexion:
+            # WAL no funciona en volúmenes de red: se usa el diario clásico
+            conexion.execute("PRAGMA journal_mode=DELETE")
+            conexion.executescript(ESQUEMA)
+            conexion.execute("INSERT OR IGNORE INTO meta VALUES ('id_salida', ?)",
+                             (id_salida or time.strftime("cola%Y%m%d_%H%M%S"),))
+            self.id_salida = conexion.execute(
+                "SELECT valor FROM meta WHERE clave = 'id_salida'").fetchone()[0]
+
+    def _conectar(self):
+        conexion = sqlite3.connect(self.ruta, timeout=60, isolation_level=None)
+        conexion.row_factory = sqlite3.Row
+        return conexion
+
+    @contextmanager
+    def _transaccion(self):
+        with closing(self._conectar()) as conexion:
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                yield conexion
+            except BaseException:
+                conexion.execute("ROLLBACK")
+                raise
+            conexion.execute("COMMIT")
+
+    def encolar(self, codigos):
+        ahora = time.time()
+        with self._transaccion() as conexion:
+            return conexion.executemany(
+                "INSERT OR IGNORE INTO tareas (code, estado, visible_desde, creada) "
+                "VALUES (?, 'pendiente', ?, ?)",
+                [(code, ahora, ahora) for code in codigos]).rowcount
+
+    def reservar(self, host, worker, visibilidad=VISIBILIDAD):
+        ahora = time.time()
+        with self._transaccion() as conexion:
+            while True:
+                fila = conexion.execute(
+                    "SELECT code, intentos FROM tareas "
+                    "WHERE estado IN ('pendiente', 'en_curso') AND visible_desde <= ? "
+                    "ORDER BY visible_desde LIMIT 1", (ahora,)).fetchone()
+                if fila is None:
+                    return None
+                if fila["intentos"] >= self.max_intentos:
+                    # Reserva vencida tras el último intento: nadie publicó el resultado
+                    conexion.execute(
+                        "UPDATE tareas SET estado = 'muerta', lease = NULL, "
+                        "error = COALESCE(error, 'Reserva vencida') WHERE code = ?", (fila["code"],))
+                    continue
+                lease = uuid.uuid4().hex
+                conexion.execute(
+                    "UPDATE tareas SET estado = 'en_curso', intentos = intentos + 1, lease = ?, "
+                    "host = ?, worker = ?, visible_desde = ?, inicio = ? WHERE code = ?",
+                    (lease, host, worker, ahora + visibilidad, ahora, fila["code"]))
+                return Tarea(fila["code"], lease, fila["intentos"] + 1)
+
+    def renovar(self, tarea, visibilidad=VISIBILIDAD):
+        with self._transaccion() as conexion:
+            return conexion.execute(
+                "UPDATE tareas SET visible_desde = ? WHERE code = ? AND lease = ? AND estado = 'en_curso'",
+                (time.time() + visibilidad, tarea.code, tarea.lease)).rowcount == 1
+
+    def completar(self, tarea, resultado):
+        ahora = time.time()
+        with self._transaccion() as conexion:
+            return conexion.execute(
+                "UPDATE tareas SET estado = 'hecha', lease = NULL, fin = ?, segundos = ? - inicio, "
+                "filas = ?, resultado = ?, error = NULL WHERE code = ? AND lease = ?",
+                (ahora, ahora, resultado.get("total_rows"), json.dumps(resultado, ensure_ascii=False),
+                 tarea.code, tarea.lease)).rowcount == 1
+
+    def fallar(self, tarea, error, resultado=None):
+        ahora = time.time()
+        muerta = tarea.intentos >= self.max_intentos
+        with self._transaccion() as conexion:
+            return conexion.execute(
+                "UPDATE tareas SET estado = ?, lease = NULL, visible_desde = ?, fin = ?, "
+                "segundos = ? - inicio, resultado = ?, error = ? WHERE code = ? AND lease = ?",
+                ("muerta" if muerta else "pendiente", ahora + _espera_reintento(tarea.intentos), ahora,
+                 ahora, json.dumps(resultado or {}, ensure_ascii=False), error,
+                 tarea.code, tarea.lease)).rowcount == 1
+
+    def reactivar_muertas(self):
+        with self._transaccion() as conexion:
+            return conexion.execute(
+                "UPDATE tareas SET estado = 'pendiente', intentos = 0, visible_desde = ? "
+                "WHERE estado = 'muerta'", (time.time(),)).rowcount
+
+    def tareas(self):
+        with closing(self._conectar()) as conexion:
+            return [dict(fila) for fila in conexion.execute(
+                "SELECT code, estado, intentos, host, worker, inicio, fin, segundos, filas, error "
+                "FROM tareas ORDER BY creada, code")]
+
+
+class ColaMemoria(ColaTrabajo):
+    """Cola en memoria con la misma interfaz que ColaSqlite (una sola máquina)"""
+
+    def __init__(self, max_intentos=MAX_INTENTOS, id_salida=None):
+        self.max_intentos = max_intentos
+        self.id_salida = id_salida or time.strftime("cola%Y%m%d_%H%M%S")
+        self._tareas = {}
+        self._lock = threading.Lock()
+
+    def encolar(self, codigos):
+        ahora = time.time()
+        añadidos = 0
+        with self._lock:
+            for code in codigos:
+                if code not in self._tareas:
+                    self._tareas[code] = {
+                        "code": code, "estado": "pendiente", "intentos": 0, "lease": None,
+                        "host": None, "worker": None, "visible_desde": ahora, "creada": ahora,
+                        "inicio": None, "fin": None, "segundos": None, "filas": None,
+                        "resultado": None, "error": None,
+                    }
+                    añadidos += 1
+        return añadidos
+
+    def reservar(self, host, worker, visibilidad=VISIBILIDAD):
+        ahora = time.time()
+        with self._lock:
+            visibles = sorted((t for t in self._tareas.values()
+                               if t["estado"] in ("pendiente", "en_curso") and t["visible_desde"] <= ahora),
+                              key=lambda t: t["visible_desde"])
+            for t in visibles:
+                if t["intentos"] >= self.max_intentos:
+                    t.update(estado="muerta", lease=None, error=t["error"] or "Reserva vencida")
+                    continue
+                lease = uuid.uuid4().hex
+                t.update(estado="en_curso", intentos=t["intentos"] + 1, lease=lease, host=host,
+                         worker=worker, visible_desde=ahora + visibilidad, inicio=ahora)
+                return Tarea(t["code"], lease, t["intentos"])
+        return None
+
+    def _propia(self, tarea):
+        t = self._tareas.get(tarea.code)
+        return t if t is not None and t["lease"] == tarea.lease else None
+
+    def renovar(self, tarea, visibilidad=VISIBILIDAD):
+        with self._lock:
+            t = self._propia(tarea)
+            if t is None or t["estado"] != "en_curso":
+                return False
+            t["visible_desde"] = time.time() + visibilidad
+            return True
+
+    def completar(self, tarea, resultado):
+        ahora = time.time()
+        with self._lock:
+            t = self._propia(tarea)
+            if t is None:
+                return False
+            t.update(estado="hecha", lease=None, fin=ahora, segundos=ahora - t["inicio"],
+                     filas=resultado.get("total_rows"), resultado=resultado, error=None)
+            return True
+
+    def fallar(self, tarea, error, resultado=None):
+        ahora = time.time()
+        with self._lock:
+            t = self._propia(tarea)
+            if t is None:
+                return False
+            t.update(estado="muerta" if tarea.intentos >= self.max_intentos else "pendiente",
+                     lease=None, visible_desde=ahora + _espera_reintento(tarea.intentos), fin=ahora,
+                     segundos=ahora - t["inicio"], resultado=resultado, error=error)
+            return True
+
+    def reactivar_muertas(self):
+        with self._lock:
+            muertas = [t for t in self._tareas.values() if t["estado"] == "muerta"]
+            for t in muertas:
+                t.update(estado="pendiente", intentos=0, visible_desde=time.time())
+            return len(muertas)
+
+    def tareas(self):
+        with self._lock:
+            return [{k: v for k, v in t.items() if k not in ("lease", "resultado")}
+                    for t in sorted(self._tareas.values(), key=lambda t: (t["creada"], t["code"]))]
+
+
+def _resumen(resultado, segundos):
+    """Lo que se publica en la cola de un resultado de process_slir_code"""
+    resultado = resultado or {}
+    data = resultado.get("data") or {}
+    return {
+        "success": bool(resultado.get("success")),
+        "csv_file": resultado.get("csv_file"),
+        "pages_processed": resultado.get("pages_processed"),
+        "total_rows": data.get("total_rows"),
+        "error": resultado.get("error"),
+        "message": resultado.get("message"),
+        "segundos": round(segundos, 2),
+    }
+
+
+class TrabajadorCola(threading.Thread):
+    """Hilo que pide códigos a la cola y los procesa con su propio navegador"""
+
+    def __init__(self, cola, worker_id, user_data_dir, host=HOST, headless=True, max_usos=50,
+                 visibilidad=VISIBILIDAD, cache=None, politica=None, sesion_guardada=None,
+                 parar_si_vacia=True, espera_vacia=5.0):
+        super().__init__(name=f"slir-cola-{worker_id}", daemon=True)
+        self.cola = cola
+        self.host = host
+        self.worker = f"{host}/{worker_id}"
+        self.visibilidad = visibilidad
+        self.cache = cache
+        self.politica = politica
+        self.parar_si_vacia = parar_si_vacia
+        self.espera_vacia = espera_vacia
+        self.procesados = 0
+        log_path = os.path.join(LOGS_DIR, f"edge_driver_cola_{worker_id}.log")
+        self.pool = DriverPool(tamano=1, max_usos=max_usos, headless=headless,
+                               user_data_dirs=[user_data_dir], log_paths=[log_path],
+                               sesion_guardada=sesion_guardada)
+
+    def run(self):
+        with self.pool:
+            while True:
+                tarea = self.cola.reservar(self.host, self.worker, self.visibilidad)
+                if tarea is None:
+                    if self.parar_si_vacia and not self.cola.quedan():
+                        return
+                    time.sleep(self.espera_vacia)
+                    continue
+                self._procesar(tarea)
+
+    def _procesar(self, tarea):
+        log.debug(f"[{self.worker}] {tarea.code} (intento {tarea.intentos})")
+        inicio = time.perf_counter()
+        try:
+            with self.cola.latido(tarea, self.visibilidad):
+                # Con id_salida el fichero es el mismo en cualquier máquina e intento
+                resultado = process_slir_code(tarea.code, pool=self.pool, cache=self.cache,
+                                              politica=self.politica, reanudar=tarea.intentos > 1,
+                                              id_salida=self.cola.id_salida)
+        except Exception as e:
+            log.error(f"[{self.worker}] Error no controlado con {tarea.code}: {e}")
+            resultado = None
+        resumen = _resumen(resultado, time.perf_counter() - inicio)
+        self.procesados += 1
+
+        if resumen["success"]:
+            if not self.cola.completar(tarea, resumen):
+                log.warning(f"[{self.worker}] {tarea.code} terminó, pero su reserva ya había vencido")
+        else:
+            error = resumen["error"] or resumen["message"] or "Sin resultado"
+            self.cola.fallar(tarea, error, resumen)
+
+
+def trabajar_cola(cola, num_workers=2, headless=True, host=HOST, visibilidad=VISIBILIDAD,
+                  cache=None, politica=None, sesion_guardada=None, parar_si_vacia=True):
+    """
+    Arranca num_workers en esta máquina contra una cola compartida y espera a que terminen
+
+    Args:
+        cola (ColaTrabajo): ColaSqlite compartida o ColaMemoria
+        num_workers (int): Navegadores en paralelo en esta máquina
+        host (str): Nombre de la máquina en la cola (por defecto SLIR_HOST o el hostname)
+        visibilidad (float): Segundos de cada reserva (se renueva mientras se procesa)
+        parar_si_vacia (bool): Si False, los workers siguen esperando códigos nuevos
+
+    Returns:
+        dict: Estadísticas de la cola al terminar (ver ColaTrabajo.estadisticas)
+    """
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    perfiles = preparar_perfiles_workers(num_workers)
+    politica = politica or Politica(cortacircuitos=Cortacircuitos())
+    trabajadores = [TrabajadorCola(cola, i, perfiles[i], host=host, headless=headless,
+                                   visibilidad=visibilidad, cache=cache, politica=politica,
+                                   sesion_guardada=sesion_guardada, parar_si_vacia=parar_si_vacia)
+                    for i in range(num_workers)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    return cola.estadisticas()
+
+
+def imprimir_estadisticas(estadisticas):
+    print("Estado de la cola: " + ", ".join(f"{k}={v}" for k, v in estadisticas["estados"].items()))
+    for host, datos in sorted(estadisticas["hosts"].items()):
+        print(f"- {host}: {datos['exitosos']} exitosos, {datos['fallidos']} fallidos, "
+              f"{datos['filas']} filas, {datos['codigos_por_minuto']} códigos/minuto")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("encolar", "trabajar", "estado", "reactivar"):
+        print("Uso: python cola_trabajo.py encolar <fichero_codigos> [ruta_cola]")
+        print("     python cola_trabajo.py trabajar [num_workers] [ruta_cola]")
+        print("     python cola_trabajo.py estado [ruta_cola]")
+        print("     python cola_trabajo.py reactivar [ruta_cola]")
+        sys.exit(1)
+
+    configurar_logs()
+    accion = sys.argv[1]
+    if accion == "encolar":
+        cola = ColaSqlite(sys.argv[3] if len(sys.argv) > 3 else None)
+        print(f"Códigos añadidos a la cola: {cola.encolar(leer_codigos(sys.argv[2]))}")
+    elif accion == "trabajar":
+        cola = ColaSqlite(sys.argv[3] if len(sys.argv) > 3 else None)
+        num_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+        print(f"Trabajando en {HOST} con {num_workers} workers (cola {cola.ruta})...")
+        imprimir_estadisticas(trabajar_cola(cola, num_workers=num_workers))
+    elif accion == "reactivar":
+        cola = ColaSqlite(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"Códigos muertos devueltos a la cola: {cola.reactivar_muertas()}")
+    else:
+        imprimir_estadisticas(ColaSqlite(sys.argv[2] if len(sys.argv) > 2 else None).estadisticas())
@@ -0,0 +1,284 @@
+from contextlib import contextmanager
+import queue
+import threading
+import time
+
+from bitacora import obtener_logger
+from esperas import esperar_tabla_o_login
+from instrumentacion import span
+import open_page
+from open_page import iniciar_navegador, completar_login, navegar_a_codigo
+from politicas import POLITICA_POR_DEFECTO
+
+log = obtener_logger(__name__)
+
+
+class SesionNavegador:
+    """Navegador ya arrancado y con la sesión iniciada, junto con sus tiempos y usos"""
+
+    def __init__(self, driver, indice, tiempo_arranque, tiempo_login, login=None):
+        self.driver = driver
+        self.indice = indice
+        self.tiempo_arranque = tiempo_arranque
+        self.tiempo_login = tiempo_login
+        # Cómo se consiguió la sesión: "reutilizada", "activa" o "login" (ver completar_login)
+        self.login = login
+        self.usos = 0
+
+
+class DriverPool:
+    """
+    Pool de navegadores Edge que se arrancan y hacen login una sola vez
+
+    Cada sesión se reutiliza para varios códigos navegando con driver.get, se
+    comprueba antes de entregarla y se recicla tras max_usos códigos.
+
+    Uso:
+        with DriverPool(tamano=2) as pool:
+            with pool.sesion() as sesion:
+                pool.navegar(sesion, "SLIR1ST230476")
+                ...
+    """
+
+    def __init__(self, tamano=1, max_usos=50, headless=True, user_data_dirs=None,
+                 log_paths=None, cerrar_previo=False, navegador="edge", capturar_red=False,
+                 ligero=False, sesion_guardada=None):
+        """
+        Args:
+            tamano (int): Número máximo de navegadores abiertos a la vez
+            max_usos (int): Códigos que procesa una sesión antes de reciclarla
+            headless (bool): Si True, los navegadores no son visibles
+            user_data_dirs (list): Carpeta de perfil para cada navegador (una por índice)
+            log_paths (list): Log de msedgedriver para cada navegador
+            cerrar_previo (bool): Si True, cierra Edge (taskkill) antes de arrancar el primero
+            navegador (str): "edge" o "chrome" (ver iniciar_navegador)
+            capturar_red (bool): Si True, los navegadores registran los eventos de red (ver captura_red.py)
+            ligero (bool): Si True, arranque ligero con bloqueo de recursos (ver iniciar_navegador)
+            sesion_guardada (AlmacenSesion): Sesión cifrada que se inyecta en cada navegador
+                                             nuevo para no repetir el login (ver sesion_guardada.py)
+        """
+        self.tamano = tamano
+        self.max_usos = max_usos
+        self.headless = headless
+        self.user_data_dirs = user_data_dirs or [None] * tamano
+        self.log_paths = log_paths or [None] * tamano
+        self.cerrar_previo = cerrar_previo
+        self.navegador = navegador
+        self.capturar_red = capturar_red
+        self.ligero = ligero
+        self.sesion_guardada = sesion_guardada
+
+        self._libres = queue.LifoQueue()
+        self._indices_libres = queue.Queue()
+        for i in range(tamano):
+            self._indices_libres.put(i)
+        self._sesiones = set()
+        self._lock = threading.Lock()
+
+        self.sesiones_creadas = 0
+        self.sesiones_recicladas = 0
+        self.tiempo_arranque_total = 0.0
+        self.tiempo_login_total = 0.0
+        self.logins_realizados = 0
+        self.sesiones_reutilizadas = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+
+    def _crear_sesion(self, indice):
+        """Arranca un navegador y hace login en la aplicación"""
+        inicio = time.perf_counter()
+        cerrar_previo = self.cerrar_previo and self.sesiones_creadas == 0
+        driver = iniciar_navegador(cerrar_previo=cerrar_previo, mantener_abierto=False,
+                                   headless=self.headless,
+                                   user_data_dir=self.user_data_dirs[indice],
+                                   log_path=self.log_paths[indice],
+                                   navegador=self.navegador,
+                                   capturar_red=self.capturar_red,
+                                   ligero=self.ligero)
+        if not driver:
+            raise RuntimeError("No se pudo arrancar el navegador del pool")
+        tiempo_arranque = time.perf_counter() - inicio
+
+        inicio_login = time.perf_counter()
+        estado_login = None
+        try:
+            with span("login"):
+                inyectada = self.sesion_guardada.inyectar(driver) if self.sesion_guardada is not None else False
+                driver.get(open_page.BASE_URL)
+                estado_login = completar_login(driver, self.sesion_guardada, inyectada)
+        except Exception as e:
+            log.warning(f"Error al manejar login, pero continuamos: {e}")
+        tiempo_login = time.perf_counter() - inicio_login
+
+        with self._lock:
+            self.sesiones_creadas += 1
+            self.tiempo_arranque_total += tiempo_arranque
+            self.tiempo_login_total += tiempo_login
+            if estado_login == "login":
+                self.logins_realizados += 1
+            elif estado_login == "reutilizada":
+                self.sesiones_reutilizadas += 1
+
+        sesion = SesionNavegador(driver, indice, tiempo_arranque, tiempo_login, estado_login)
+        self._sesiones.add(sesion)
+        log.info(f"Sesión {indice} lista (arranque {tiempo_arranque:.2f} s, login {tiempo_login:.2f} s, "
+              f"{estado_login or 'sin login'})")
+        return sesion
+
+    def _esta_sana(self, sesion):
+        """Comprueba que el navegador sigue respondiendo"""
+        try:
+            sesion.driver.execute_script("return document.readyState")
+            return True
+        except Exception:
+            return False
+
+    def _descartar(self, sesion):
+        """Cierra el navegador de una sesión y deja libre su índice"""
+        self._sesiones.discard(sesion)
+        try:
+            sesion.driver.quit()
+        except Exception:
+            pass
+        self._indices_libres.put(sesion.indice)
+
+    def obtener(self, timeout=None):
+        """
+        Entrega una sesión sana, arrancando un navegador nuevo si hay hueco
+
+        Args:
+            timeout (float): Segundos máximos de espera a que haya una sesión libre;
+                             si se agotan se lanza TimeoutError
+
+        Returns:
+            SesionNavegador
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                sesion = self._libres.get_nowait()
+            except queue.Empty:
+                sesion = None
+
+            if sesion:
+                if self._esta_sana(sesion):
+                    return sesion
+                log.warning(f"La sesión {sesion.indice} no responde, se descarta")
+                self._descartar(sesion)
+                continue
+
+            try:
+                indice = self._indices_libres.get_nowait()
+            except queue.Empty:
+                if limite is not None and time.monotonic() >= limite:
+                    raise TimeoutError("No hay sesiones libres en el pool")
+                # Esperar a que otra sesión se libere (o se descarte y deje hueco)
+                try:
+                    self._libres.put(self._libres.get(timeout=0.5))
+                except queue.Empty:
+                    pass
+                continue
+
+            try:
+                return self._crear_sesion(indice)
+            except Exception:
+                self._indices_libres.put(indice)
+                raise
+
+    def precalentar(self):
+        """
+        Arranca un navegador (con su login) antes de que llegue el primer código
+
+        Returns:
+            bool: True si quedó una sesión libre; si falla, el primer obtener() lo reintenta
+        """
+        try:
+            self._libres.put(self.obtener())
+            return True
+        except Exception as e:
+            log.warning(f"No se pudo precalentar el navegador del pool: {e}")
+            return False
+
+    def liberar(self, sesion, descartar=False):
+        """
+        Devuelve una sesión al pool, reciclándola si ha agotado sus usos o no responde
+
+        Args:
+            sesion (SesionNavegador): Sesión obtenida con obtener()
+            descartar (bool): Si True, cierra la sesión en lugar de reutilizarla
+        """
+        sesion.usos += 1
+        if descartar or sesion.usos >= self.max_usos or not self._esta_sana(sesion):
+            if sesion.usos >= self.max_usos:
+                log.info(f"Sesión {sesion.indice} reciclada tras {sesion.usos} usos")
+            with self._lock:
+                self.sesiones_recicladas += 1
+            self._descartar(sesion)
+        else:
+            self._libres.put(sesion)
+
+    @contextmanager
+    def sesion(self, timeout=None):
+        """Context manager que obtiene una sesión y la libera al terminar"""
+        sesion = self.obtener(timeout)
+        try:
+            yield sesion
+        except Exception:
+            self.liberar(sesion, descartar=True)
+            raise
+        else:
+            self.liberar(sesion)
+
+    def navegar(self, sesion, slir_code, politica=None):
+        """
+        Lleva la sesión al código indicado, repitiendo el login solo si la aplicación lo pide
+
+        Antes de decidir se espera a que aparezca la tabla o el botón de Login (como
+        open_page): el botón se pinta de forma asíncrona y, sin esperar, una sesión
+        caducada parecería iniciada.
+
+        Args:
+            politica (Politica): Política del tiempo de espera adaptativo de la tabla;
+                                 por defecto POLITICA_POR_DEFECTO
+
+        Returns:
+            float: Tiempo de navegación en segundos (equivalente a tiempo_carga)
+        """
+        tiempo_carga = navegar_a_codigo(sesion.driver, slir_code)
+        espera = (politica or POLITICA_POR_DEFECTO).timeout("tabla_cargada")
+        if esperar_tabla_o_login(sesion.driver, espera) == "login":
+            inicio_login = time.perf_counter()
+            with span("login", relogin=True):
+                estado_login = completar_login(sesion.driver, self.sesion_guardada)
+            tiempo_login = time.perf_counter() - inicio_login
+            with self._lock:
+                self.tiempo_login_total += tiempo_login
+                if estado_login == "login":
+                    self.logins_realizados += 1
+        return tiempo_carga
+
+    def metricas(self):
+        """Tiempos acumulados de arranque y login, separados del tiempo de carga de cada código"""
+        with self._lock:
+            return {
+                "sesiones_creadas": self.sesiones_creadas,
+                "sesiones_recicladas": self.sesiones_recicladas,
+                "tiempo_arranque_total": round(self.tiempo_arranque_total, 2),
+                "tiempo_login_total": round(self.tiempo_login_total, 2),
+                "logins_realizados": self.logins_realizados,
+                "sesiones_reutilizadas": self.sesiones_reutilizadas,
+            }
+
+    def cerrar(self):
+        """Cierra todos los navegadores del pool"""
+        for sesion in list(self._sesiones):
+            try:
+                sesion.driver.quit()
+            except Exception:
+                pass
+        self._sesiones.clear()
+        log.info("Navegadores del pool cerrados correctamente.")
@@ -0,0 +1,171 @@
+import csv
+import glob
+import json
+import os
+
+from bitacora import obtener_logger
+from esquema_tabla import FilasPagina
+
+log = obtener_logger(__name__)
+
+
+# Sufijo del fichero de progreso que acompaña a un CSV mientras se está escribiendo
+SUFIJO_PROGRESO = ".progreso.json"
+
+
+def columnas_de_filas(filas, columnas=None):
+    """Une las columnas de varias filas conservando el orden en que aparecen"""
+    columnas = list(columnas or [])
+    vistas = set(columnas)
+    # Las filas compactas ya saben sus columnas sin recorrer cada fila
+    claves_filas = [filas.columnas] if isinstance(filas, FilasPagina) else filas
+    for fila in claves_filas:
+        for clave in fila:
+            if clave not in vistas:
+                vistas.add(clave)
+                columnas.append(clave)
+    return columnas
+
+
+def buscar_csv_pendiente(output_dir, code, extension=".csv"):
+    """
+    Busca el CSV más reciente de un código que se quedó a medias
+
+    Args:
+        output_dir (str): Carpeta de salida
+        code (str): Código SLIR
+        extension (str): Extensión del fichero (".csv" o ".csv.gz")
+
+    Returns:
+        str: Ruta del CSV con fichero de progreso, o None si no hay ninguno
+    """
+    patron = os.path.join(output_dir, f"slir_{code}_*_data{extension}")
+    pendientes = [ruta for ruta in glob.glob(patron) if os.path.exists(ruta + SUFIJO_PROGRESO)]
+    return max(pendientes, key=os.path.getmtime) if pendientes else None
+
+
+class EscritorCsvIncremental:
+    """
+    Escribe un CSV página a página, volcando a disco tras cada una
+
+    Mientras el fichero está incompleto se mantiene junto a él un <csv>.progreso.json
+    con la última página escrita, las columnas y el tamaño del fichero, que permite
+    reanudar la extracción. Si una página trae columnas nuevas, el fichero se reescribe
+    con la cabecera ampliada (las filas anteriores quedan vacías en esas columnas).
+
+    Uso:
+        escritor = EscritorCsvIncremental(ruta, reanudar=True)
+        for numero, filas in paginas:
+            if numero > escritor.ultima_pagina:
+                escritor.escribir_pagina(numero, filas)
+        escritor.cerrar()
+    """
+
+    def __init__(self, csv_filename, reanudar=False):
+        """
+        Args:
+            csv_filename (str): Ruta del CSV
+            reanudar (bool): Si True y existe progreso previo, continúa tras la última página escrita
+        """
+        self.csv_filename = csv_filename
+        self.ruta_progreso = csv_filename + SUFIJO_PROGRESO
+        self.columnas = []
+        self.ultima_pagina = 0
+        self.total_filas = 0
+        self.rehechos = 0
+
+        if reanudar and os.path.exists(self.ruta_progreso) and os.path.exists(csv_filename):
+            with open(self.ruta_progreso, encoding="utf-8") as f:
+                progreso = json.load(f)
+            self.columnas = progreso["columnas"]
+            self.ultima_pagina = progreso["ultima_pagina"]
+            self.total_filas = progreso["filas"]
+            # Descartar lo que se escribiera después del último progreso guardado
+            with open(csv_filename, "r+b") as f:
+                f.truncate(progreso["bytes"])
+            log.info(f"Reanudando {csv_filename} tras la página {self.ultima_pagina} "
+                  f"({self.total_filas} filas ya escritas)")
+        elif os.path.exists(csv_filename):
+            os.remove(csv_filename)
+
+    def _abrir(self, ruta, modo):
+        """Abre el fichero en modo texto ("r", "w" o "a"); el BOM solo va al principio"""
+        encoding = "utf-8" if modo == "a" else "utf-8-sig"
+        return open(ruta, modo, newline="", encoding=encoding)
+
+    def _sincronizar(self):
+        """Fuerza el volcado del fichero a disco"""
+        with open(self.csv_filename, "ab") as f:
+            os.fsync(f.fileno())
+
+    def _reescribir_con_columnas(self, columnas):
+        """Reescribe el fichero con una cabecera ampliada"""
+        temporal = self.csv_filename + ".tmp"
+        with self._abrir(self.csv_filename, "r") as origen, \
+                self._abrir(temporal, "w") as destino:
+            writer = csv.DictWriter(destino, fieldnames=columnas, restval="")
+            writer.writeheader()
+            for fila in csv.DictReader(origen):
+                writer.writerow(fila)
+        os.replace(temporal, self.csv_filename)
+        self.rehechos += 1
+
+    def escribir_pagina(self, numero, filas):
+        """
+        Añade las filas de una página y las vuelca a disco
+
+        Args:
+            numero (int): Número de página (para el progreso)
+            filas (list): Filas como diccionarios, o FilasPagina (se escriben sus tuplas
+                          sin crear diccionarios si las columnas coinciden con las del fichero)
+        """
+        columnas = columnas_de_filas(filas, self.columnas)
+        nuevo = not os.path.exists(self.csv_filename)
+
+        if not nuevo and len(columnas) != len(self.columnas):
+            log.info(f"La página {numero} trae columnas nuevas: "
+                  f"{', '.join(columnas[len(self.columnas):])}. Se amplía la cabecera.")
+            self._reescribir_con_columnas(columnas)
+        self.columnas = columnas
+
+        with self._abrir(self.csv_filename, "w" if nuevo else "a") as csvfile:
+            if isinstance(filas, FilasPagina) and filas.compacta \
+                    and filas.columnas == self.columnas[:len(filas.columnas)]:
+                writer = csv.writer(csvfile)
+                if nuevo:
+                    writer.writerow(self.columnas)
+                ancho = len(self.columnas)
+                writer.writerows(fila + ("",) * (ancho - len(fila)) for fila in filas.valores)
+            else:
+                writer = csv.DictWriter(csvfile, fieldnames=self.columnas, restval="")
+                if nuevo:
+                    writer.writeheader()
+                writer.writerows(filas)
+        self._sincronizar()
+
+        self.ultima_pagina = numero
+        self.total_filas += len(filas)
+        self._guardar_progreso()
+
+    def _guardar_progreso(self):
+        progreso = {
+            "ultima_pagina": self.ultima_pagina,
+            "filas": self.total_filas,
+            "columnas": self.columnas,
+            "bytes": os.path.getsize(self.csv_filename),
+        }
+        temporal = self.ruta_progreso + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(progreso, f, ensure_ascii=False)
+        os.replace(temporal, self.ruta_progreso)
+
+    def cerrar(self, completo=True):
+        """
+        Termina la escritura
+
+        Args:
+            completo (bool): Si True, borra el progreso (el CSV ya no se puede reanudar);
+                             si False, lo conserva para continuar más tarde
+        """
+        if completo and os.path.exists(self.ruta_progreso):
+            os.remove(self.ruta_progreso)
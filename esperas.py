@@ -0,0 +1,318 @@
+from collections import deque
+from contextlib import contextmanager
+import random
+import threading
+import time
+
+from selenium.webdriver.common.by import By
+
+# Límites (en segundos) de los cubos del histograma de esperas
+CUBOS_HISTOGRAMA = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+# Selectores compartidos por las esperas
+SELECTOR_FILAS = "table tbody tr"
+XPATH_LOGIN = "//button[contains(@class, 'p-button') and normalize-space(.)='Login']"
+
+# Huella de la página de la tabla: botón activo del paginador, número de filas,
+# primera y última fila. Cambia en cuanto se pinta una página nueva.
+JS_HUELLA = """
+function huellaPagina() {
+    const activo = document.querySelector(
+        ".p-paginator .p-highlight, .p-paginator [aria-current='page']");
+    const filas = document.querySelectorAll('table tbody tr');
+    const texto = el => el ? el.innerText.trim() : '';
+    return [texto(activo), filas.length, texto(filas[0]), texto(filas[filas.length - 1])].join('|');
+}
+function spinnerVisible() {
+    return Array.from(document.querySelectorAll('.spinner-container, .p-progress-spinner'))
+        .some(el => el.getClientRects().length > 0);
+}
+"""
+
+SCRIPT_HUELLA = JS_HUELLA + "return huellaPagina();"
+
+# Espera asíncrona: un MutationObserver resuelve en cuanto la huella cambia y no hay
+# spinner visible. El sondeo cada 100 ms cubre cambios que no mutan el DOM (CSS).
+SCRIPT_ESPERAR_CAMBIO = JS_HUELLA + """
+const anterior = arguments[0];
+const limite = arguments[1] * 1000;
+const done = arguments[arguments.length - 1];
+let terminado = false, obs = null, timer = null, sondeo = null;
+function listo() {
+    if (spinnerVisible() || !document.querySelector('table tbody tr')) return null;
+    const h = huellaPagina();
+    return h !== anterior ? h : null;
+}
+function fin(h) {
+    if (terminado) return;
+    terminado = true;
+    if (obs) obs.disconnect();
+    clearTimeout(timer);
+    clearInterval(sondeo);
+    done(h);
+}
+const inicial = listo();
+if (inicial !== null) {
+    fin(inicial);
+} else {
+    obs = new MutationObserver(() => { const h = listo(); if (h !== null) fin(h); });
+    obs.observe(document.body, {childList: true, subtree: true, characterData: true, attributes: true});
+    sondeo = setInterval(() => { const h = listo(); if (h !== null) fin(h); }, 100);
+    timer = setTimeout(() => fin(null), limite);
+}
+"""
+
+# Esperas que terminaron antes del tiempo límite que se guardan por punto para los
+# tiempos de espera adaptativos (ver politicas.py)
+MUESTRAS_ADAPTATIVAS = 200
+# Muestras por punto de espera para los percentiles del histograma (muestreo de
+# reservorio: la memoria no crece con la duración del lote)
+MUESTRAS_HISTOGRAMA = 1000
+
+_tiempos = {}
+_completadas = {}
+_lock = threading.Lock()
+
+
+def _nuevo_acumulado():
+    return {"n": 0, "total": 0.0, "max": 0.0, "cubos": [0] * len(CUBOS_HISTOGRAMA), "muestras": []}
+
+
+def registrar_espera(punto, segundos, agotada=False):
+    """
+    Añade la duración de una espera al histograma de su punto de espera
+
+    Por punto se guardan contadores fijos (número, total, máximo y cubos) y como
+    mucho MUESTRAS_HISTOGRAMA muestras para los percentiles.
+
+    Args:
+        agotada (bool): Si la espera terminó por tiempo agotado; cuenta en el histograma
+                        pero no para adaptar los tiempos de espera
+    """
+    with _lock:
+        acumulado = _tiempos.get(punto)
+        if acumulado is None:
+            acumulado = _tiempos[punto] = _nuevo_acumulado()
+        acumulado["n"] += 1
+        acumulado["total"] += segundos
+        acumulado["max"] = max(acumulado["max"], segundos)
+        for i, limite in enumerate(CUBOS_HISTOGRAMA):
+            if segundos <= limite:
+                acumulado["cubos"][i] += 1
+        muestras = acumulado["muestras"]
+        if len(muestras) < MUESTRAS_HISTOGRAMA:
+            muestras.append(segundos)
+        else:
+            indice = random.randrange(acumulado["n"])
+            if indice < MUESTRAS_HISTOGRAMA:
+                muestras[indice] = segundos
+        if not agotada:
+            _completadas.setdefault(punto, deque(maxlen=MUESTRAS_ADAPTATIVAS)).append(segundos)
+
+
+@contextmanager
+def medir_espera(punto):
+    """
+    Context manager que registra cuánto dura el bloque en el punto de espera indicado
+
+    Devuelve un dict en el que se puede marcar {"agotada": True} si la espera no
+    consiguió lo que esperaba; una excepción dentro del bloque la marca sola.
+    """
+    inicio = time.perf_counter()
+    medicion = {"agotada": False}
+    try:
+        yield medicion
+    except BaseException:
+        medicion["agotada"] = True
+        raise
+    finally:
+        registrar_espera(punto, time.perf_counter() - inicio, medicion["agotada"])
+
+
+def _percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0.0
+    indice = min(len(valores_ordenados) - 1, int(round(p / 100 * (len(valores_ordenados) - 1))))
+    return valores_ordenados[indice]
+
+
+def percentil_espera(punto, p):
+    """
+    Percentil de las últimas esperas completadas (no agotadas) en un punto de espera
+
+    Returns:
+        tuple: (número de esperas consideradas, percentil en segundos)
+    """
+    with _lock:
+        valores = sorted(_completadas.get(punto, ()))
+    return len(valores), _percentil(valores, p)
+
+
+def histograma_esperas(reiniciar=False):
+    """
+    Devuelve el histograma de duraciones de cada punto de espera
+
+    n, total, max y los cubos son exactos; p50 y p95 salen de una muestra de como
+    mucho MUESTRAS_HISTOGRAMA esperas por punto.
+
+    Returns:
+        dict: {punto: {"n", "total", "p50", "p95", "max", "cubos": {"<=0.1": n, ...}}}
+    """
+    with _lock:
+        copia = {punto: dict(acumulado, cubos=list(acumulado["cubos"]), muestras=sorted(acumulado["muestras"]))
+                 for punto, acumulado in _tiempos.items()}
+        if reiniciar:
+            _tiempos.clear()
+            _completadas.clear()
+
+    resultado = {}
+    for punto, acumulado in copia.items():
+        cubos = {f"<={limite}": n for limite, n in zip(CUBOS_HISTOGRAMA, acumulado["cubos"])}
+        cubos["+Inf"] = acumulado["n"]
+        resultado[punto] = {
+            "n": acumulado["n"],
+            "total": round(acumulado["total"], 3),
+            "p50": round(_percentil(acumulado["muestras"], 50), 3),
+            "p95": round(_percentil(acumulado["muestras"], 95), 3),
+            "max": round(acumulado["max"], 3),
+            "cubos": cubos,
+        }
+    return resultado
+
+
+def imprimir_histograma():
+    """Muestra un resumen de las esperas registradas"""
+    for punto, datos in histograma_esperas().items():
+        print(f"- {punto}: n={datos['n']} total={datos['total']:.2f} s "
+              f"p50={datos['p50']:.3f} s p95={datos['p95']:.3f} s max={datos['max']:.3f} s")
+
+
+def esperar_hasta(driver, timeout, condicion, poll_frequency=0.1):
+    """
+    WebDriverWait(driver, timeout).until(condicion), importando Selenium al usarlo
+
+    support.ui arrastra toda la pila de WebDriver remoto (unos 0,2 s); importarlo aquí
+    y no al cargar el módulo abarata el arranque de los procesos cortos (ver arranque.py).
+    Igual que WebDriverWait, ignora NoSuchElementException mientras espera.
+
+    Returns:
+        El primer valor verdadero de condicion (lanza TimeoutException si no llega)
+    """
+    from selenium.webdriver.support.ui import WebDriverWait
+    return WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(condicion)
+
+
+def huella_pagina(driver):
+    """Devuelve la huella de la página de la tabla que se está mostrando"""
+    return driver.execute_script(SCRIPT_HUELLA)
+
+
+def esperar_cambio_pagina(driver, huella_anterior, timeout=5):
+    """
+    Espera a que se pinte una página distinta de la tabla
+
+    Termina en cuanto cambia la huella (paginador activo, filas) y no hay spinner,
+    sin esperas fijas.
+
+    Args:
+        driver: WebDriver de Selenium
+        huella_anterior (str): Huella tomada antes de cambiar de página
+        timeout (float): Segundos máximos de espera
+
+    Returns:
+        str: Nueva huella, o None si la página no cambió a tiempo
+    """
+    with medir_espera("cambio_pagina") as medicion:
+        driver.set_script_timeout(timeout + 2)
+        huella = driver.execute_async_script(SCRIPT_ESPERAR_CAMBIO, huella_anterior, timeout)
+        medicion["agotada"] = huella is None
+        return huella
+
+
+def _hay_elemento(driver, by, selector):
+    try:
+        return bool(driver.find_elements(by, selector))
+    except Exception:
+        return False
+
+
+def esperar_pagina_inicial(driver, timeout=10):
+    """
+    Espera a que la aplicación muestre la pantalla de login o la tabla
+
+    Sustituye a la pausa fija de 2 s antes de buscar el botón de login.
+
+    Returns:
+        bool: True si apareció alguno de los dos, False si se agotó el tiempo
+    """
+    with medir_espera("login_pantalla"):
+        try:
+            esperar_hasta(driver, timeout,
+                lambda d: d.execute_script("return document.readyState") != "loading" and (
+                    _hay_elemento(d, By.XPATH, XPATH_LOGIN)
+                    or _hay_elemento(d, By.CSS_SELECTOR, "button.p-button")
+                    or _hay_elemento(d, By.CSS_SELECTOR, SELECTOR_FILAS)
+                )
+            )
+            return True
+        except Exception:
+            return False
+
+
+def _tabla_o_login(driver):
+    if _hay_elemento(driver, By.XPATH, XPATH_LOGIN):
+        return "login"
+    if _hay_elemento(driver, By.CSS_SELECTOR, SELECTOR_FILAS):
+        return "tabla"
+    return None
+
+
+def esperar_tabla_o_login(driver, timeout=30):
+    """
+    Espera a que la página de un código muestre la tabla o el botón de Login
+
+    La aplicación pinta el botón de Login de forma asíncrona: justo después de
+    driver.get una sesión caducada todavía parece iniciada.
+
+    Returns:
+        str: "tabla" o "login" (lo que aparezca antes), o None si se agotó el tiempo
+    """
+    with medir_espera("login_pantalla") as medicion:
+        try:
+            return esperar_hasta(driver, timeout, _tabla_o_login)
+        except Exception:
+            medicion["agotada"] = True
+            return None
+
+
+def _login_terminado(driver, url_app):
+    if _hay_elemento(driver, By.CSS_SELECTOR, SELECTOR_FILAS):
+        return True
+    # Durante el login puede haber redirecciones al proveedor de identidad
+    if url_app and not driver.current_url.startswith(url_app):
+        return False
+    return (driver.execute_script("return document.readyState") != "loading"
+            and not _hay_elemento(driver, By.XPATH, XPATH_LOGIN))
+
+
+def esperar_login_completado(driver, timeout=15, url_app=None):
+    """
+    Espera a que aparezca la tabla o, de vuelta en la aplicación, desaparezca el botón de login
+
+    Sustituye a la pausa fija de 3 s tras hacer clic en Login.
+
+    Args:
+        driver: WebDriver de Selenium
+        timeout (float): Segundos máximos de espera
+        url_app (str): Prefijo de URL de la aplicación, para no dar por terminado el
+                       login mientras se está en la página del proveedor de identidad
+
+    Returns:
+        bool: True si el login terminó, False si se agotó el tiempo
+    """
+    with medir_espera("login_completado"):
+        try:
+            esperar_hasta(driver, timeout, lambda d: _login_terminado(d, url_app))
+            return True
+        except Exception:
+            return False
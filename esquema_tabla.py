@@ -0,0 +1,119 @@
+"""
+Esquema de columnas de la tabla SLIR y filas compactas ligadas a él
+
+Los encabezados se resuelven una vez por código (EsquemaTabla) y en las páginas
+siguientes solo se comprueba su firma. Cada fila se guarda como una tupla de
+valores en el orden del esquema (FilasPagina) en lugar de un diccionario que
+repite los nombres de columna; los diccionarios solo se crean si alguien itera
+las filas (los sinks CSV y columnares escriben directamente desde las tuplas).
+
+Uso:
+    esquema = EsquemaTabla(headers)
+    filas = FilasPagina.desde_matriz(esquema, matriz)
+    escritor.escribir_pagina(numero, filas)
+"""
+
+# Separador de la firma de encabezados (no aparece en textos visibles)
+SEPARADOR_FIRMA = "\x1f"
+
+
+def firma_encabezados(headers):
+    """Cadena que identifica una lista de encabezados"""
+    return SEPARADOR_FIRMA.join(headers)
+
+
+class EsquemaTabla:
+    """
+    Columnas de la tabla de un código: los encabezados visibles y, si alguna fila
+    tiene más celdas, column_<i> para las sobrantes (igual que extract_table_rows)
+    """
+
+    __slots__ = ("headers", "columnas", "firma", "unico")
+
+    def __init__(self, headers):
+        self.headers = list(headers)
+        self.columnas = list(self.headers)
+        self.firma = firma_encabezados(self.headers)
+        # Con encabezados repetidos un diccionario se queda con la última celda;
+        # esas tablas se escriben por el camino de diccionarios
+        self.unico = len(set(self.headers)) == len(self.headers)
+
+    def ampliar(self, num_celdas):
+        """Añade column_<i> hasta cubrir filas de num_celdas celdas"""
+        for i in range(len(self.columnas), num_celdas):
+            self.columnas.append(f"column_{i}")
+
+    def coincide(self, headers):
+        return firma_encabezados(headers) == self.firma
+
+
+class FilasPagina:
+    """
+    Filas de una página como tuplas ligadas a un EsquemaTabla
+
+    Se comporta como la lista de diccionarios de extract_table_rows (len, bool,
+    iteración, índice), pero los diccionarios se crean al vuelo.
+    """
+
+    __slots__ = ("esquema", "valores")
+
+    def __init__(self, esquema, valores):
+        self.esquema = esquema
+        self.valores = valores
+
+    @classmethod
+    def desde_matriz(cls, esquema, matriz):
+        """
+        Crea las filas a partir de las celdas de cada fila, omitiendo las que no tienen datos
+
+        Args:
+            esquema (EsquemaTabla): Se amplía si alguna fila tiene celdas de más
+            matriz (list): Lista de filas, cada una con la lista de textos de sus celdas
+        """
+        valores = [tuple(celdas) for celdas in matriz if any(celdas)]
+        if valores:
+            esquema.ampliar(max(len(fila) for fila in valores))
+        return cls(esquema, valores)
+
+    @property
+    def columnas(self):
+        """Columnas que usan las filas de la página, en el orden del esquema"""
+        ancho = max((len(fila) for fila in self.valores), default=0)
+        return self.esquema.columnas[:ancho]
+
+    @property
+    def compacta(self):
+        """Si los sinks pueden escribir directamente desde las tuplas"""
+        return self.esquema.unico
+
+    def _como_dict(self, fila):
+        return dict(zip(self.esquema.columnas, fila))
+
+    def __len__(self):
+        return len(self.valores)
+
+    def __iter__(self):
+        columnas = self.esquema.columnas
+        for fila in self.valores:
+            yield dict(zip(columnas, fila))
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self._como_dict(fila) for fila in self.valores[indice]]
+        return self._como_dict(self.valores[indice])
+
+    def por_columna(self):
+        """
+        Valores de la página agrupados por columna (para los sinks columnares)
+
+        Returns:
+            dict: {columna: lista de valores}; las celdas que faltan son None
+        """
+        columnas = self.columnas
+        ancho = len(columnas)
+        rellenas = (fila + (None,) * (ancho - len(fila)) for fila in self.valores)
+        return dict(zip(columnas, (list(valores) for valores in zip(*rellenas)))) if self.valores else {}
+
+    def como_dicts(self):
+        """Las filas como lista de diccionarios"""
+        return list(self)
@@ -1,61 +1,228 @@
 # Importar open_page que ahora acepta el código SLIR como parámetro
 from open_page import open_page
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from bitacora import configurar_logs, obtener_logger, registrar_resumen_codigo
+from esperas import esperar_cambio_pagina, esperar_hasta, huella_pagina, medir_espera, imprimir_histograma
+from paginacion import maximizar_filas_por_pagina, ir_a_pagina, es_ultima_pagina
+from escritor_csv import columnas_de_filas
+from esquema_tabla import EsquemaTabla, FilasPagina
+from tabla_virtual import SELECTOR_VISOR_VIRTUAL, es_tabla_virtual, extraer_filas_virtuales
+from sinks import crear_sink
+from instrumentacion import Instrumentacion, activar, exportar_jsonl, registro, span
+from politicas import (POLITICA_POR_DEFECTO, DatosIncompletos, ErrorExtraccion, ErrorPaginacion,
+                       ErrorPaginaVacia)
 import time
 import csv
+import math
 import os
+import re
 import sys
 # import json eliminado
 from datetime import datetime
 
+log = obtener_logger(__name__)
+
+
 # Función extract_html eliminada
         
-def extract_table_data(driver, wait_time=30):
+def esperar_tabla(driver, wait_time=None, politica=None):
+    """
+    Espera a que la tabla tenga filas (lanza TimeoutException si no aparecen)
+
+    Sin wait_time se usa el tiempo de espera adaptativo de la política (ver politicas.py),
+    o el de POLITICA_POR_DEFECTO si no se indica ninguna
+    """
+    wait_time = wait_time or (politica or POLITICA_POR_DEFECTO).timeout("tabla_cargada")
+    with medir_espera("tabla_cargada"):
+        esperar_hasta(driver, wait_time, lambda d: d.find_element(By.CSS_SELECTOR, "table tbody tr"))
+
+def extract_table_data(driver, wait_time=None, modo="script", politica=None):
     """
     Extrae datos de la tabla de la página SLIR después de que cargue dinámicamente
     
     Args:
         driver: Instancia del navegador Selenium
         wait_time: Tiempo máximo de espera para la carga de la tabla en segundos
+                   (por defecto el adaptativo, ver esperar_tabla)
+        modo: Forma de leer la tabla ("script" o "dom"), ver extract_table_rows
+        politica (Politica): Política de la que sale el tiempo de espera adaptativo
         
     Returns:
         dict: Diccionario con los datos extraídos de la tabla
     """
     try:
-        print("Esperando a que la tabla cargue...")
+        log.debug("Esperando a que la tabla cargue...")
         
         # Esperar a que la tabla aparezca en la página
-        WebDriverWait(driver, wait_time).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "table tbody tr"))
-        )
+        esperar_tabla(driver, wait_time, politica)
         
         # Extraer los datos de la tabla usando un método simplificado
-        table_data = extract_table_rows(driver)
+        table_data = extract_table_rows(driver, modo=modo)
         
         result = {
             "table_data": table_data
         }
         
-        print(f"Datos de la tabla conseguidos: {len(table_data)} filas")
+        log.debug(f"Datos de la tabla conseguidos: {len(table_data)} filas")
         return result
         
     except TimeoutException as e:
-        print(f"Timeout esperando a que la tabla cargue: {e}")
+        log.warning(f"Timeout esperando a que la tabla cargue: {e}")
         return None
     except NoSuchElementException as e:
-        print(f"No se encontró el elemento en la página: {e}")
+        log.warning(f"No se encontró el elemento en la página: {e}")
         return None
     except Exception as e:
-        print(f"Error al extraer datos de la tabla: {e}")
+        log.warning(f"Error al extraer datos de la tabla: {e}")
         return None
 
 
 
-def extract_table_rows(driver):
-    """Extrae todas las filas de la tabla principal usando el selector 'table tbody tr'"""
+# Script que devuelve encabezados y celdas de la tabla en una sola llamada.
+# Replica lo que hace Selenium con .text: los elementos no visibles devuelven ''.
+SCRIPT_SNAPSHOT_TABLA = """
+const texto = el => (el.getClientRects().length ? el.innerText : '').trim();
+const headers = Array.from(document.querySelectorAll("th, [role='columnheader']"))
+    .map(texto)
+    .filter(t => t);
+const rows = Array.from(document.querySelectorAll('table tbody tr'))
+    .map(tr => Array.from(tr.querySelectorAll("td, [role='cell']")).map(texto));
+return {headers: headers, rows: rows};
+"""
+
+
+# Igual que SCRIPT_SNAPSHOT_TABLA, pero los encabezados solo se devuelven si su firma
+# no coincide con la del esquema ya conocido (arguments[0]); virtual indica si la tabla
+# tiene un visor de scroll virtual (ver tabla_virtual.py)
+SCRIPT_FILAS_TABLA = """
+const texto = el => (el.getClientRects().length ? el.innerText : '').trim();
+const headers = Array.from(document.querySelectorAll("th, [role='columnheader']"))
+    .map(texto)
+    .filter(t => t);
+const rows = Array.from(document.querySelectorAll('table tbody tr'))
+    .map(tr => Array.from(tr.querySelectorAll("td, [role='cell']")).map(texto));
+return {headers: headers.join('\\u001f') === arguments[0] ? null : headers, rows: rows,
+        virtual: !!document.querySelector(""" + repr(SELECTOR_VISOR_VIRTUAL) + """)};
+"""
+
+
+def filas_desde_matriz(headers, matriz):
+    """
+    Convierte una matriz de celdas en la lista de diccionarios que genera extract_table_rows
+    
+    Args:
+        headers (list): Encabezados no vacíos de la tabla
+        matriz (list): Lista de filas, cada una con la lista de textos de sus celdas
+        
+    Returns:
+        list: Filas como diccionarios, omitiendo las que no tienen datos
+    """
+    table_data = []
+    for celdas in matriz:
+        row_data = {}
+        for i, valor in enumerate(celdas):
+            if i < len(headers):
+                row_data[headers[i]] = valor
+            else:
+                row_data[f"column_{i}"] = valor
+        
+        if any(row_data.values()):
+            table_data.append(row_data)
+    return table_data
+
+
+def extract_table_rows_script(driver):
+    """
+    Extrae las filas de la tabla con una única llamada a execute_script
+    
+    A diferencia del recorrido DOM, que hace un comando WebDriver por fila y por celda,
+    aquí el navegador devuelve toda la tabla como una matriz JSON.
+    
+    Args:
+        driver: WebDriver de Selenium
+        
+    Returns:
+        list: Filas como diccionarios (mismo formato que extract_table_rows)
+    """
+    snapshot = driver.execute_script(SCRIPT_SNAPSHOT_TABLA)
+    headers = snapshot.get("headers") or []
+    matriz = snapshot.get("rows") or []
+    
+    if not matriz:
+        log.debug("No se encontraron filas en la tabla.")
+        return []
+    
+    log.debug(f"Encontradas {len(matriz)} filas en la tabla.")
+    return filas_desde_matriz(headers, matriz)
+
+
+def extraer_filas_compactas(driver, esquema=None, virtual=None):
+    """
+    Extrae las filas de la tabla como tuplas ligadas al esquema de columnas del código
+    
+    Los encabezados solo se leen (y se vuelve a crear el esquema) si no hay esquema
+    o su firma ya no coincide con la de la tabla.
+    
+    Args:
+        driver: WebDriver de Selenium
+        esquema (EsquemaTabla): Esquema resuelto en una página anterior del mismo código
+        virtual (bool): True lee la tabla por tramos desplazando su visor (scroll virtual o
+                        muchas filas por página, ver tabla_virtual.py); False la lee de una
+                        vez; None (por defecto) lee por tramos solo si detecta scroll virtual
+        
+    Returns:
+        FilasPagina: Filas de la página (su .esquema es el vigente); si la lectura con
+                     JavaScript falla, la lista de diccionarios del recorrido DOM
+    """
+    try:
+        if virtual:
+            return _leer_por_tramos(driver, esquema)
+        snapshot = driver.execute_script(SCRIPT_FILAS_TABLA, esquema.firma if esquema else None)
+        if virtual is None and es_tabla_virtual(snapshot):
+            return _leer_por_tramos(driver, esquema)
+    except Exception as e:
+        log.warning(f"No se pudo leer la tabla con JavaScript, usando el recorrido DOM: {e}")
+        return extract_table_rows(driver, modo="dom")
+    
+    if snapshot.get("headers") is not None:
+        if esquema is not None:
+            log.info("Los encabezados de la tabla han cambiado; se vuelve a resolver el esquema.")
+        esquema = EsquemaTabla(snapshot["headers"])
+    matriz = snapshot.get("rows") or []
+    if not matriz:
+        log.debug("No se encontraron filas en la tabla.")
+    else:
+        log.debug(f"Encontradas {len(matriz)} filas en la tabla.")
+    return FilasPagina.desde_matriz(esquema, matriz)
+
+
+def _leer_por_tramos(driver, esquema):
+    """Lee la tabla desplazando su visor por tramos (ver tabla_virtual.py)"""
+    metricas = {}
+    with span("tabla_virtual") as registro:
+        filas = extraer_filas_virtuales(driver, esquema, metricas=metricas)
+        registro.update(metricas)
+    log.debug(f"Encontradas {len(filas)} filas en la tabla ({metricas['ventanas']} tramos del visor, "
+          f"{metricas['duplicadas']} repetidas descartadas).")
+    return filas
+
+
+def extract_table_rows(driver, modo="script"):
+    """
+    Extrae todas las filas de la tabla principal usando el selector 'table tbody tr'
+    
+    Args:
+        driver: WebDriver de Selenium
+        modo (str): "script" lee toda la tabla en una llamada (por defecto);
+                    "dom" recorre filas y celdas con un comando WebDriver por celda
+    """
+    if modo == "script":
+        try:
+            return extract_table_rows_script(driver)
+        except Exception as e:
+            log.warning(f"No se pudo leer la tabla con JavaScript, usando el recorrido DOM: {e}")
+    
     table_data = []
     
     try:
@@ -63,10 +230,10 @@ def extract_table_rows(driver):
         rows = driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
         
         if not rows or len(rows) == 0:
-            print("No se encontraron filas en la tabla.")
+            log.debug("No se encontraron filas en la tabla.")
             return table_data
         
-        print(f"Encontradas {len(rows)} filas en la tabla.")
+        log.debug(f"Encontradas {len(rows)} filas en la tabla.")
         
         # Obtener encabezados de columna si están disponibles
         headers = []
@@ -102,154 +269,456 @@ def extract_table_rows(driver):
                 table_data.append(row_data)
     
     except Exception as e:
-        print(f"Error al extraer filas de la tabla: {e}")
+        log.warning(f"Error al extraer filas de la tabla: {e}")
     
     return table_data
 
-def process_slir_code(code):
+def obtener_directorio_salida():
+    """Devuelve (y crea si hace falta) la carpeta output junto al script o al ejecutable"""
+    # SLIR_OUTPUT_DIR permite escribir en otra carpeta (p. ej. un volumen compartido)
+    if os.environ.get("SLIR_OUTPUT_DIR"):
+        output_dir = os.environ["SLIR_OUTPUT_DIR"]
+    # Detectar si estamos en un entorno PyInstaller
+    elif getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+        # Estamos en el ejecutable - usar rutas relativas al ejecutable
+        base_path = os.path.dirname(sys.executable)
+        output_dir = os.path.join(base_path, "output")
+    else:
+        # Estamos en el script normal
+        output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
+        
+    os.makedirs(output_dir, exist_ok=True)
+    return output_dir
+
+def extraer_pagina(driver, numero, politica=POLITICA_POR_DEFECTO, captura=None, estado=None,
+                   virtual=None):
+    """
+    Filas de la página mostrada, con los reintentos de la política
+    
+    Args:
+        driver: WebDriver de Selenium
+        numero (int): Página mostrada
+        politica (Politica): Reintentos y tiempos de espera (ver politicas.py)
+        captura (CapturaRed): Si se indica, primero se prueba con la respuesta JSON capturada
+        estado (dict): Estado del recorrido; guarda en "esquema" el esquema de columnas
+                       del código para no volver a leer los encabezados en cada página
+        virtual (bool): Lectura por tramos del visor (ver extraer_filas_compactas)
+        
+    Returns:
+        FilasPagina: Filas de la página (o lista de diccionarios si vienen de la red)
+        
+    Raises:
+        ErrorExtraccion: Si no se consiguen filas tras los reintentos
+    """
+    def intento_pagina(intento):
+        if captura is not None and intento == 1:
+            page_data = captura.extraer_pagina()
+            if page_data is not None:
+                return page_data["table_data"]
+        esperar_tabla(driver, politica.timeout("tabla_cargada", intento))
+        filas = extraer_filas_compactas(driver, estado.get("esquema") if estado is not None else None,
+                                        virtual=virtual)
+        if estado is not None and isinstance(filas, FilasPagina):
+            estado["esquema"] = filas.esquema
+        # La primera página puede estar vacía; una intermedia sin filas es una carga fallida
+        if numero > 1 and not filas:
+            raise ErrorPaginaVacia(f"La página {numero} no tiene filas", numero)
+        log.debug(f"Datos de la tabla conseguidos: {len(filas)} filas")
+        return filas
+    
+    return politica.ejecutar(intento_pagina, f"Extracción de la página {numero}", pagina=numero)
+
+
+def navegar_a_pagina(driver, numero, politica=POLITICA_POR_DEFECTO):
+    """
+    Lleva la tabla a la página indicada con los reintentos de la política
+    
+    Returns:
+        int: Transiciones del último intento (ver ir_a_pagina)
+        
+    Raises:
+        ErrorExtraccion: Si no se llega a la página tras los reintentos
+    """
+    def intento_navegacion(intento):
+        # ir_a_pagina parte de la página activa, así que repetirlo no retrocede
+        politica.limitar("clic")
+        pasos = ir_a_pagina(driver, numero, wait_time=politica.timeout("cambio_pagina", intento))
+        if pasos is None:
+            raise ErrorPaginacion(f"No se pudo llegar a la página {numero}", numero)
+        return pasos
+    
+    return politica.ejecutar(intento_navegacion, f"Navegación a la página {numero}", pagina=numero)
+
+
+def iterar_paginas(driver, estado, desde_pagina=1, captura=None, politica=POLITICA_POR_DEFECTO,
+                   virtual=None):
+    """
+    Recorre las páginas de la tabla y devuelve las filas de cada una según se extraen
+    
+    Args:
+        driver: WebDriver de Selenium con la tabla cargada en la página 1
+        estado (dict): Se actualiza con current_page, page_transitions y last_page_verified
+        desde_pagina (int): Primera página a extraer (para reanudar); se salta a ella directamente
+        captura (CapturaRed): Si se indica, las filas se toman de la respuesta JSON de cada
+                              página y solo se lee la tabla del DOM cuando no se capturó nada
+        politica (Politica): Reintentos y tiempos de espera de cada página y cada cambio de página
+        virtual (bool): Lectura por tramos del visor (ver extraer_filas_compactas)
+        
+    Yields:
+        tuple: (número de página, lista de filas)
+        
+    Raises:
+        ErrorExtraccion: Si una página o un cambio de página fallan tras los reintentos;
+                         el recorrido no termina nunca en silencio antes de la última página
+    """
+    estado.update({"current_page": 1, "page_transitions": 0, "last_page_verified": False})
+    
+    if desde_pagina > 1:
+        log.debug(f"Saltando a la página {desde_pagina} para reanudar...")
+        try:
+            with span("espera_pagina", pagina=desde_pagina):
+                pasos = navegar_a_pagina(driver, desde_pagina, politica)
+        except ErrorPaginacion:
+            # Si ya no hay más páginas, lo escrito estaba completo
+            if es_ultima_pagina(driver):
+                estado["last_page_verified"] = True
+                return
+            raise
+        estado["page_transitions"] += pasos
+        estado["current_page"] = desde_pagina
+    
+    while True:
+        current_page = estado["current_page"]
+        log.debug(f"Extrayendo datos de la tabla dinámica (página {current_page})...")
+        with span("extraccion_pagina", pagina=current_page):
+            filas = extraer_pagina(driver, current_page, politica, captura, estado, virtual)
+        
+        yield current_page, filas
+        
+        # Procesar páginas adicionales hasta que el paginador confirme la última
+        ultima = es_ultima_pagina(driver)
+        if ultima:
+            estado["last_page_verified"] = True
+            log.debug(f"Última página verificada en el paginador: {current_page}")
+            return
+        if ultima is None:
+            raise DatosIncompletos("No se pudo leer el paginador para verificar la última página",
+                                   current_page)
+        
+        # Ir directamente a la página siguiente con su botón del paginador
+        log.debug(f"Intentando navegar a la página {current_page + 1}...")
+        with span("espera_pagina", pagina=current_page + 1):
+            pasos = navegar_a_pagina(driver, current_page + 1, politica)
+        
+        estado["page_transitions"] += pasos
+        estado["current_page"] = current_page + 1
+
+def process_slir_code(code, headless=True, cerrar_previo=True, user_data_dir=None,
+                      log_path=None, cerrar_navegador=False, pool=None, maximizar_filas=True,
+                      reanudar=False, conservar_filas=False, formato="csv", cache=None,
+                      metricas_jsonl=None, captura=None, ligero=False, politica=None,
+                      sesion_guardada=None, id_salida=None, virtual=None):
     """
     Procesa un código SLIR específico
     
     Args:
         code (str): Código SLIR para procesar (ejemplo: SLIR1ST230476)
+        headless (bool): Si True, ejecuta Edge sin interfaz gráfica
+        cerrar_previo (bool): Si True, cierra las instancias de Edge abiertas antes de empezar
+        user_data_dir (str): Carpeta de perfil de Edge (ver open_page)
+        log_path (str): Fichero de log de msedgedriver (ver open_page)
+        cerrar_navegador (bool): Si True, cierra el navegador al terminar
+        pool (DriverPool): Si se indica, usa un navegador del pool (ya arrancado y con login)
+                           en lugar de abrir uno nuevo; se devuelve al pool al terminar
+        maximizar_filas (bool): Si True, sube antes las filas por página al máximo del paginador
+        reanudar (bool): Si True, continúa el último CSV incompleto del código tras su última página
+        conservar_filas (bool): Si True, devuelve también las filas en data["table_data"];
+                                por defecto solo se escriben en el sink, página a página
+        formato: Formato de salida ("csv", "csv.gz", "parquet", "arrow") o un
+                 DatasetParquet compartido entre códigos (ver sinks.py)
+        cache (CacheSlir): Si se indica, el código no se vuelve a recorrer cuando su primera
+                           página y su número de páginas coinciden con la caché vigente
+        metricas_jsonl (str): Si se indica, añade a ese fichero los spans del código
+                              (una línea JSON por span y un resumen; ver instrumentacion.py)
+        captura (CapturaRed): Si se indica, las filas se toman de las respuestas JSON de la
+                              aplicación en lugar del DOM (ver captura_red.py). Con pool, el
+                              pool debe crearse con capturar_red=True
+        ligero (bool): Si True y no hay pool, arranca el navegador en modo ligero (ver iniciar_navegador)
+        politica (Politica): Reintentos, tiempos de espera y cortacircuitos (ver politicas.py);
+                             por defecto POLITICA_POR_DEFECTO
+        sesion_guardada (AlmacenSesion): Sin pool, sesión cifrada que se inyecta para no
+                                         repetir el login (ver sesion_guardada.py); con
+                                         pool se indica al crear el pool
+        id_salida (str): Si se indica, sustituye a la hora en el nombre del fichero de salida,
+                         de modo que repetir el código produce el mismo fichero (ver cola_trabajo.py)
+        virtual (bool): Lectura de cada página por tramos del visor de la tabla: None la
+                        activa solo si se detecta scroll virtual (ver tabla_virtual.py)
         
     Returns:
-        dict: Datos extraídos o None si falla
+        dict: Datos extraídos o None si falla. Incluye "tiempos" con tiempo_carga,
+              tiempo_arranque y tiempo_login en segundos,
+              y "metricas" con el resumen de spans y comandos WebDriver.
+              Si una página falla tras los reintentos, success es False, "error" indica
+              el tipo de fallo y lo escrito queda pendiente de reanudar (nunca se da
+              por completo un fichero truncado)
     """
-    # La función open_page ahora recibe directamente el código SLIR como parámetro
+    instr = Instrumentacion(code)
+    resultado = None
+    inicio = time.perf_counter()
     try:
-        # Abrir la página con el código proporcionado en modo headless
-        driver, tiempo_carga = open_page(code, headless=True)
+        with activar(instr):
+            resultado = _process_slir_code(
+                code, headless=headless, cerrar_previo=cerrar_previo, user_data_dir=user_data_dir,
+                log_path=log_path, cerrar_navegador=cerrar_navegador, pool=pool,
+                maximizar_filas=maximizar_filas, reanudar=reanudar, conservar_filas=conservar_filas,
+                formato=formato, cache=cache, captura=captura, ligero=ligero, politica=politica,
+                sesion_guardada=sesion_guardada, id_salida=id_salida, virtual=virtual)
+        if resultado is not None:
+            resultado["metricas"] = instr.resumen()
+        return resultado
+    finally:
+        registro.registrar(instr, bool(resultado and resultado.get("success")))
+        registrar_resumen_codigo(code, resultado, time.perf_counter() - inicio)
+        if metricas_jsonl:
+            try:
+                exportar_jsonl(instr, metricas_jsonl)
+            except OSError as e:
+                log.warning(f"No se pudieron guardar las métricas de {code}: {e}")
+
+
+def _process_slir_code(code, headless=True, cerrar_previo=True, user_data_dir=None,
+                       log_path=None, cerrar_navegador=False, pool=None, maximizar_filas=True,
+                       reanudar=False, conservar_filas=False, formato="csv", cache=None,
+                       captura=None, ligero=False, politica=None, sesion_guardada=None,
+                       id_salida=None, virtual=None):
+    """Cuerpo de process_slir_code, que lo ejecuta con la instrumentación activa"""
+    politica = politica or POLITICA_POR_DEFECTO
+    sesion = None
+    tiempos = {}
+    try:
+        politica.limitar("navegacion")
+        if pool:
+            # Reutilizar un navegador del pool: solo se paga la navegación
+            sesion = pool.obtener()
+            driver = sesion.driver
+            primer_uso = sesion.usos == 0
+            tiempos = {
+                "tiempo_carga": pool.navegar(sesion, code, politica),
+                "tiempo_arranque": sesion.tiempo_arranque if primer_uso else 0.0,
+                "tiempo_login": sesion.tiempo_login if primer_uso else 0.0,
+            }
+        else:
+            # La función open_page ahora recibe directamente el código SLIR como parámetro
+            # Abrir la página con el código proporcionado en modo headless
+            driver, tiempo_carga = open_page(code, cerrar_previo=cerrar_previo, headless=headless,
+                                             user_data_dir=user_data_dir, log_path=log_path,
+                                             metricas=tiempos, capturar_red=captura is not None,
+                                             ligero=ligero, sesion_guardada=sesion_guardada)
         
         if not driver:
-            print(f"No se pudo abrir la página para el código: {code}")
+            log.warning(f"No se pudo abrir la página para el código: {code}")
             return None
         
-        # Detectar si estamos en un entorno PyInstaller
-        if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
-            # Estamos en el ejecutable - usar rutas relativas al ejecutable
-            base_path = os.path.dirname(sys.executable)
-            output_dir = os.path.join(base_path, "output")
-        else:
-            # Estamos en el script normal
-            output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
-            
-        os.makedirs(output_dir, exist_ok=True)
+        output_dir = obtener_directorio_salida()
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        # Ya no guardamos el HTML
-        html_filename = None
+        
+        # Con más filas por página hacen falta menos cambios de página
+        filas_por_pagina = None
+        if maximizar_filas:
+            try:
+                esperar_tabla(driver, politica=politica)
+                with span("filas_por_pagina"):
+                    filas_por_pagina = maximizar_filas_por_pagina(driver, politica=politica)
+            except TimeoutException:
+                log.warning("La tabla no cargó a tiempo; no se cambian las filas por página.")
         
         # Detectar el número total de páginas
-        total_pages = get_total_pages(driver)
+        with span("deteccion_paginas"):
+            total_pages = get_total_pages(driver, politica=politica)
         if total_pages:
-            print(f"Número total de páginas detectado: {total_pages}")
+            log.debug(f"Número total de páginas detectado: {total_pages}")
         else:
-            print("No se pudo detectar el número total de páginas, se procesarán todas las disponibles")
-            
-        # Extraer datos de la tabla dinámica de la primera página
-        print("Extrayendo datos de la tabla dinámica (página 1)...")
-        all_table_data = extract_table_data(driver)
-        
-        if not all_table_data:
-            print(f"No se pudieron extraer datos de la tabla para el código: {code}")
+            log.warning("No se pudo detectar el número total de páginas, se procesarán todas las disponibles")
+        
+        # Reanudar el fichero que se quedó a medias o empezar uno nuevo
+        escritor = crear_sink(formato, output_dir, code, timestamp, reanudar=reanudar, id_salida=id_salida)
+        csv_filename = escritor.destino
+        
+        # Cada página se escribe en el sink en cuanto se extrae
+        estado = {}
+        all_rows = [] if conservar_filas else None
+        hashes = {}
+        filas_pagina = {}
+        en_cache = None
+        error = None
+        if captura is not None:
+            captura.iniciar(driver)
+        try:
+            for numero, filas in iterar_paginas(driver, estado, desde_pagina=escritor.ultima_pagina + 1,
+                                                captura=captura, politica=politica, virtual=virtual):
+                if cache is not None:
+                    hashes[numero] = cache.hash_filas(filas)
+                    filas_pagina[numero] = len(filas)
+                    # Con la primera página y el número de páginas se sabe si el código cambió
+                    if numero == 1:
+                        en_cache = cache.sin_cambios(code, total_pages, hashes[1])
+                        if en_cache:
+                            break
+                with span("escritura", pagina=numero, filas=len(filas)):
+                    escritor.escribir_pagina(numero, filas)
+                if conservar_filas:
+                    all_rows.extend(filas)
+                log.debug(f"Se añadieron {len(filas)} filas de la página {numero}. Total: {escritor.total_filas}")
+        except ErrorExtraccion as e:
+            error = e
+            log.warning(f"Extracción de {code} interrumpida en la página {e.pagina or estado.get('current_page')}: {e}")
+        
+        if error is None and not estado.get("last_page_verified") and not en_cache:
+            error = DatosIncompletos("No se verificó la última página", estado.get("current_page"))
+        
+        if error is not None and not politica.permitir_incompletos and escritor.ultima_pagina > 0:
+            # Lo escrito se conserva para reanudar, pero el código no se da por extraído
+            escritor.cerrar(completo=False)
             return {
                 "code": code,
+                "csv_file": csv_filename,
                 "extraction_time": timestamp,
                 "success": False,
-                "message": "No se pudieron extraer datos de la tabla"
+                "error": type(error).__name__,
+                "message": str(error),
+                "pages_processed": escritor.ultima_pagina,
+                "page_transitions": estado.get("page_transitions", 0),
+                "reanudable": escritor.admite_reanudar,
+                "tiempos": tiempos
             }
         
-        # Solo necesitamos los datos de la tabla
-        all_rows = all_table_data.get("table_data", [])
-        
-        # Procesar páginas adicionales si existen
-        current_page = 1
-        max_page = total_pages if total_pages else float('inf')  # Infinito si no se conoce el total
+        if en_cache:
+            escritor.cerrar(completo=False)
+            log.info(f"El código {code} no ha cambiado desde la última extracción; se omite.")
+            return {
+                "code": code,
+                "csv_file": en_cache["fichero"],
+                "extraction_time": timestamp,
+                "pages_processed": 1,
+                "page_transitions": 0,
+                "data": {
+                    "pages_processed": 1,
+                    "total_pages": en_cache["total_paginas"],
+                    "total_rows": en_cache["total_filas"],
+                },
+                "tiempos": tiempos,
+                "sin_cambios": True,
+                "success": True
+            }
         
-        while current_page < max_page:
-            # Intentar hacer clic en el botón "Next Page"
-            print(f"\nIntentando navegar a la página {current_page + 1}...")
-            next_page_success = click_next_page(driver)
-            
-            if not next_page_success:
-                print("No hay más páginas disponibles.")
-                break
-                
-            # Si el clic fue exitoso, extraer datos de la nueva página
-            current_page += 1
-            print(f"Extrayendo datos de la tabla dinámica (página {current_page})...")
-            
-            # Extraer los datos de la nueva página
-            page_data = extract_table_data(driver)
-            
-            if page_data and "table_data" in page_data and page_data["table_data"]:
-                # Añadir las filas de esta página a la lista principal
-                new_rows = page_data["table_data"]
-                all_rows.extend(new_rows)
-                print(f"Se añadieron {len(new_rows)} filas de la página {current_page}. Total: {len(all_rows)}")
-            else:
-                print(f"No se encontraron datos en la página {current_page}.")
-                break
+        if escritor.ultima_pagina == 0:
+            escritor.cerrar(completo=False)
+            log.warning(f"No se pudieron extraer datos de la tabla para el código: {code}")
+            return {
+                "code": code,
+                "extraction_time": timestamp,
+                "success": False,
+                "error": type(error).__name__ if error else None,
+                "message": str(error) if error else "No se pudieron extraer datos de la tabla",
+                "tiempos": tiempos
+            }
         
-        # Actualizar el diccionario con todos los datos combinados
+        # Si no se verificó la última página se conserva el progreso para poder reanudar
+        current_page = escritor.ultima_pagina
+        page_transitions = estado["page_transitions"]
+        last_page_verified = estado["last_page_verified"]
+        with span("cierre_salida"):
+            escritor.cerrar(completo=last_page_verified)
+        
+        if last_page_verified:
+            total_pages = current_page
+            # Solo se guarda en caché una extracción completa hecha de principio a fin
+            if cache is not None and len(hashes) == current_page:
+                cache.guardar(code, total_pages, escritor.total_filas, hashes, filas_pagina, csv_filename)
         combined_data = {
-            "table_data": all_rows,
             "pages_processed": current_page,
             "total_pages": total_pages if total_pages else current_page,
-            "total_rows": len(all_rows)
+            "total_rows": escritor.total_filas,
+            "rows_per_page": filas_por_pagina,
+            "page_transitions": page_transitions,
+            "last_page_verified": last_page_verified
         }
-        
-        # Guardar datos combinados en formato CSV
-        csv_filename = os.path.join(output_dir, f"slir_{code}_{timestamp}_data.csv")
-        save_to_csv(combined_data, csv_filename)
-        
-        print(f"Datos combinados guardados en CSV: {csv_filename}")
+        if captura is not None:
+            combined_data["paginas_capturadas"] = captura.paginas_capturadas
+            combined_data["paginas_dom"] = captura.paginas_dom
+        if conservar_filas:
+            combined_data["table_data"] = all_rows
+        log.debug(f"Transiciones de página: {page_transitions}")
+        log.debug(f"Datos combinados guardados en: {csv_filename}")
         
         return {
             "code": code,
             "csv_file": csv_filename,
+            "formato": formato if isinstance(formato, str) else "dataset",
             "extraction_time": timestamp,
             "pages_processed": current_page,
+            "page_transitions": page_transitions,
             "data": combined_data,
+            "tiempos": tiempos,
             "success": True
         }
     
     except Exception as e:
-        print(f"Error en process_slir_code: {e}")
+        log.error(f"Error en process_slir_code: {e}")
         return None
     
     finally:
-        # No cerramos el driver automáticamente para permitir revisar la página
-        print("Dejamos el navegador abierto.")
-        # Descomentar las siguientes líneas cuando se quiera volver a cerrar automáticamente
-        # if 'driver' in locals() and driver:
-        #     try:
-        #         driver.quit()
-        #         print("Navegador cerrado correctamente.")
-        #     except:
-        #         pass
-
-def get_total_pages(driver, wait_time=5):
+        if sesion:
+            # El pool comprueba el navegador y decide si reutilizarlo o reciclarlo
+            pool.liberar(sesion)
+        elif cerrar_navegador and 'driver' in locals() and driver:
+            try:
+                driver.quit()
+                log.info("Navegador cerrado correctamente.")
+            except Exception:
+                pass
+        else:
+            # No cerramos el driver automáticamente para permitir revisar la página
+            log.info("Dejamos el navegador abierto.")
+
+def total_paginas_desde_texto(texto):
+    """
+    Interpreta el texto del paginador ("Page 1 of 40", "Showing 1 to 10 of 395 entries")
+    
+    Returns:
+        int: Número total de páginas, o None si el texto no lo indica
+    """
+    numbers = [int(n) for n in re.findall(r"\d+", texto or "")]
+    if len(numbers) == 2:
+        return numbers[1]
+    if len(numbers) >= 3 and numbers[1] >= numbers[0]:
+        return math.ceil(numbers[2] / (numbers[1] - numbers[0] + 1))
+    return None
+
+def get_total_pages(driver, wait_time=None, politica=None):
     """
     Obtiene el número total de páginas disponibles al cargar la página
     
     Args:
         driver: WebDriver de Selenium
-        wait_time: Tiempo máximo de espera en segundos
+        wait_time: Tiempo máximo de espera en segundos (por defecto el adaptativo)
+        politica (Politica): Política del tiempo adaptativo; por defecto POLITICA_POR_DEFECTO
         
     Returns:
         int: Número total de páginas o None si no se puede determinar
     """
+    wait_time = wait_time or (politica or POLITICA_POR_DEFECTO).timeout("paginador")
     try:
-        print("Detectando número total de páginas...")
+        log.debug("Detectando número total de páginas...")
         
         # Esperar a que el paginador cargue
-        WebDriverWait(driver, wait_time).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "span.p-paginator-pages, .p-paginator"))
-        )
+        with medir_espera("paginador"):
+            esperar_hasta(driver, wait_time,
+                          lambda d: d.find_element(By.CSS_SELECTOR, "span.p-paginator-pages, .p-paginator"))
         
         # Método 1: Buscar botones de página con aria-label
+        # (el paginador solo muestra unos pocos, así que puede quedarse corto)
         page_buttons = driver.find_elements(By.CSS_SELECTOR, "button[aria-label]")
         page_numbers = []
         
@@ -258,79 +727,79 @@ def get_total_pages(driver, wait_time=5):
             if aria_label and aria_label.isdigit():
                 page_numbers.append(int(aria_label))
         
+        # Método 2: Texto del paginador ("Page 1 of 40", "Showing 1 to 10 of 395 entries")
+        for report in driver.find_elements(By.CSS_SELECTOR, ".p-paginator-current"):
+            total = total_paginas_desde_texto(report.text)
+            if total:
+                page_numbers.append(total)
+        
         if page_numbers:
             total = max(page_numbers)
-            print(f"Total de páginas detectado: {total}")
+            log.debug(f"Total de páginas detectado: {total}")
             return total
             
-       
+        return None
         
     except Exception as e:
-        print(f"Error al detectar el número de páginas: {e}")
+        log.warning(f"Error al detectar el número de páginas: {e}")
         return None
 
-def click_next_page(driver, wait_time=5):
+def click_next_page(driver, wait_time=None, politica=None):
     """
     Hace clic en el botón 'Next Page' para avanzar a la siguiente página de resultados
-    utilizando JavaScript (más confiable para este caso)
+    utilizando JavaScript (más confiable para este caso) y espera a que la tabla
+    muestre la nueva página
     
     Args:
         driver: WebDriver de Selenium
-        wait_time: Tiempo máximo de espera en segundos
+        wait_time: Tiempo máximo de espera en segundos (por defecto el adaptativo)
+        politica (Politica): Política del tiempo adaptativo; por defecto POLITICA_POR_DEFECTO
         
     Returns:
-        bool: True si el clic fue exitoso, False en caso contrario
+        bool: True si se llegó a la página siguiente, False en caso contrario
     """
+    wait_time = wait_time or (politica or POLITICA_POR_DEFECTO).timeout("cambio_pagina")
     try:
-        print("Buscando el botón 'Next Page'...")
+        log.debug("Buscando el botón 'Next Page'...")
         
         # Verificar primero si el botón está deshabilitado (última página)
         disabled_buttons = driver.find_elements(By.CSS_SELECTOR, 
             "button.p-paginator-next.p-disabled, button.p-paginator-next[disabled]")
         
         if disabled_buttons and len(disabled_buttons) > 0:
-            print("El botón 'Next Page' está deshabilitado. No se puede avanzar más.")
+            log.debug("El botón 'Next Page' está deshabilitado. No se puede avanzar más.")
             return False
             
         # Buscar el botón Next Page
-        next_button = WebDriverWait(driver, wait_time).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "button.p-paginator-next"))
-        )
+        next_button = esperar_hasta(driver, wait_time,
+                                    lambda d: d.find_element(By.CSS_SELECTOR, "button.p-paginator-next"),
+                                    poll_frequency=0.5)
         
         # Comprobar explícitamente si está deshabilitado
         is_disabled = next_button.get_attribute("disabled") == "true" or "p-disabled" in next_button.get_attribute("class")
         if is_disabled:
-            print("El botón 'Next Page' está deshabilitado. No se puede avanzar más.")
+            log.debug("El botón 'Next Page' está deshabilitado. No se puede avanzar más.")
             return False
         
-        # Hacer scroll hasta el botón para asegurarnos de que es visible
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_button)
-        time.sleep(0.5)
+        # Huella de la página actual para detectar cuándo se pinta la siguiente
+        huella_anterior = huella_pagina(driver)
         
-        # Hacer clic usando JavaScript (más confiable)
-        print("Haciendo clic en el botón 'Next Page'")
-        driver.execute_script("arguments[0].click();", next_button)
+        # Hacer scroll hasta el botón y clic usando JavaScript (más confiable)
+        log.debug("Haciendo clic en el botón 'Next Page'")
+        driver.execute_script(
+            "arguments[0].scrollIntoView({block: 'center'}); arguments[0].click();", next_button)
         
-        # Esperar a que la página se actualice
-        try:
-            # Esperar a que aparezca el spinner si existe
-            spinner_selector = ".spinner-container, .p-progress-spinner"
-            WebDriverWait(driver, 2).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, spinner_selector))
-            )
-            # Esperar a que desaparezca
-            WebDriverWait(driver, wait_time).until(
-                EC.invisibility_of_element_located((By.CSS_SELECTOR, spinner_selector))
-            )
-        except TimeoutException:
-            # Si no hay spinner, esperamos un momento
-            time.sleep(1)
-        
-        print("✓ Clic realizado con JavaScript")
+        # Esperar a que la página se actualice: termina en cuanto cambian las filas
+        # o el botón activo del paginador y no hay spinner
+        if esperar_cambio_pagina(driver, huella_anterior, wait_time) is None:
+            log.warning(f"La tabla no cambió de página en {wait_time} segundos.")
+            return False
+        
+        log.debug("✓ Clic realizado con JavaScript")
         return True
         
     except Exception as e:
-        print(f"Error al hacer clic en el botón Next Page: {e}")
+        log.warning(f"Error al hacer clic en el botón Next Page: {e}")
         return False
 
 def save_to_csv(table_data, csv_filename):
@@ -340,34 +809,41 @@ def save_to_csv(table_data, csv_filename):
     Args:
         table_data (dict): Diccionario con los datos de la tabla
         csv_filename (str): Ruta del archivo CSV a crear
+
+    Returns:
+        bool: True si se escribió el CSV, False si no había filas o falló la escritura
     """
     try:
         # Comprobar si tenemos datos de tabla
         if not table_data or 'table_data' not in table_data or not table_data['table_data']:
-            print("No hay datos de tabla para guardar en CSV")
-            return
+            log.warning("No hay datos de tabla para guardar en CSV")
+            return False
         
         rows = table_data['table_data']
         
-        # Si hay al menos una fila, extraer las claves como encabezados
+        # Si hay al menos una fila, extraer las claves de todas las filas como encabezados
         if rows:
-            headers = rows[0].keys()
+            headers = columnas_de_filas(rows)
             
             with open(csv_filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=headers)
+                writer = csv.DictWriter(csvfile, fieldnames=headers, restval='')
                 writer.writeheader()
                 writer.writerows(rows)
                 
-            print(f"CSV creado exitosamente con {len(rows)} filas")
+            log.info(f"CSV creado exitosamente con {len(rows)} filas")
+            return True
         else:
-            print("No se encontraron filas para guardar en CSV")
+            log.warning("No se encontraron filas para guardar en CSV")
+            return False
             
     except Exception as e:
-        print(f"Error al guardar CSV: {e}")
+        log.warning(f"Error al guardar CSV: {e}")
+        return False
 
 if __name__ == "__main__":
-    # Código de prueba para un solo SLIR
-    test_code = "SLIR1ST230476"
+    # Código de prueba para un solo SLIR (para varios códigos, ver slir.py)
+    test_code = sys.argv[1] if len(sys.argv) > 1 else "SLIR1ST230476"
+    configurar_logs()
     print(f"Procesando código SLIR de prueba: {test_code}")
     
     # Al ejecutar directamente este script, usamos el modo headless (sin navegador visible)
@@ -378,5 +854,8 @@ if __name__ == "__main__":
         print(f"- CSV guardado en: {result['csv_file']}")
         print(f"- Filas extraídas: {result['data']['total_rows']}")
         print(f"- Páginas procesadas: {result['pages_processed']}")
+        print(f"- Comandos WebDriver: {result['metricas']['comandos_webdriver']}")
+        print("- Tiempos de espera:")
+        imprimir_histograma()
     else:
         print(f"No se pudo procesar el código: {test_code}")
@@ -0,0 +1,240 @@
+"""
+Instrumentación estructurada de la extracción SLIR
+
+Cada código se mide con una Instrumentacion activa en su hilo (o tarea de asyncio): los tramos (spans)
+de arranque del navegador, navegación, login, detección de páginas, espera y
+extracción de cada página y escritura de la salida, y el número de comandos
+WebDriver enviados. Se exporta como JSON lines (un span por línea y un resumen
+por código) y, agregado para todos los códigos, en formato texto de Prometheus.
+
+Uso:
+    instr = Instrumentacion(code)
+    with activar(instr):
+        with span("navegacion"):
+            ...
+    exportar_jsonl(instr, "logs/metricas.jsonl")
+    exportar_prometheus("logs/metricas.prom")
+"""
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+import json
+import os
+import threading
+import time
+
+# Instrumentación activa: una ContextVar aísla tanto hilos como tareas de asyncio
+_actual = ContextVar("instrumentacion", default=None)
+_lock_ficheros = threading.Lock()
+
+
+class Instrumentacion:
+    """Spans y contador de comandos WebDriver de un código SLIR"""
+
+    def __init__(self, code):
+        self.code = code
+        self.inicio = time.time()
+        self._inicio_perf = time.perf_counter()
+        self.duracion = None
+        self.spans = []
+        self.comandos = 0
+        self.comandos_por_tipo = {}
+        self._pila = []
+
+    def contar_comando(self, driver_command):
+        self.comandos += 1
+        self.comandos_por_tipo[driver_command] = self.comandos_por_tipo.get(driver_command, 0) + 1
+
+    @contextmanager
+    def span(self, nombre, **atributos):
+        """Mide un tramo; los tramos anidados guardan el nombre de su padre"""
+        padre = self._pila[-1] if self._pila else None
+        registro = {"span": nombre, "padre": padre, "inicio": round(time.time(), 3), **atributos}
+        comandos_antes = self.comandos
+        inicio = time.perf_counter()
+        self._pila.append(nombre)
+        estado = "ok"
+        try:
+            yield registro
+        except BaseException:
+            estado = "error"
+            raise
+        finally:
+            self._pila.pop()
+            registro["duracion"] = round(time.perf_counter() - inicio, 4)
+            registro["comandos"] = self.comandos - comandos_antes
+            registro["estado"] = estado
+            self.spans.append(registro)
+
+    def terminar(self):
+        self.duracion = time.perf_counter() - self._inicio_perf
+
+    def resumen(self):
+        """Totales por tipo de span y de comandos del código"""
+        por_span = {}
+        for registro in self.spans:
+            datos = por_span.setdefault(registro["span"], {"n": 0, "segundos": 0.0, "comandos": 0})
+            datos["n"] += 1
+            datos["segundos"] = round(datos["segundos"] + registro["duracion"], 4)
+            datos["comandos"] += registro["comandos"]
+
+        duracion = self.duracion if self.duracion is not None else time.perf_counter() - self._inicio_perf
+        return {
+            "code": self.code,
+            "duracion": round(duracion, 3),
+            "comandos_webdriver": self.comandos,
+            "comandos_por_tipo": dict(self.comandos_por_tipo),
+            "spans": por_span,
+        }
+
+
+class RegistroMetricas:
+    """Agregado de todos los códigos medidos en el proceso (para Prometheus)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.codigos = {"ok": 0, "error": 0}
+            self.span_segundos = {}
+            self.span_cuenta = {}
+            self.comandos = {}
+            self.segundos_codigo = 0.0
+
+    def registrar(self, instr, exito):
+        resumen = instr.resumen()
+        with self._lock:
+            self.codigos["ok" if exito else "error"] += 1
+            self.segundos_codigo += resumen["duracion"]
+            for nombre, datos in resumen["spans"].items():
+                self.span_segundos[nombre] = self.span_segundos.get(nombre, 0.0) + datos["segundos"]
+                self.span_cuenta[nombre] = self.span_cuenta.get(nombre, 0) + datos["n"]
+            for comando, n in resumen["comandos_por_tipo"].items():
+                self.comandos[comando] = self.comandos.get(comando, 0) + n
+
+    def texto_prometheus(self):
+        with self._lock:
+            lineas = [
+                "# HELP slir_codes_total Códigos SLIR procesados por estado",
+                "# TYPE slir_codes_total counter",
+            ]
+            lineas += [f'slir_codes_total{{status="{k}"}} {v}' for k, v in self.codigos.items()]
+            lineas += [
+                "# HELP slir_code_seconds_total Tiempo total dedicado a códigos SLIR",
+                "# TYPE slir_code_seconds_total counter",
+                f"slir_code_seconds_total {self.segundos_codigo:.3f}",
+                "# HELP slir_span_seconds Tiempo por tramo de la extracción",
+                "# TYPE slir_span_seconds summary",
+            ]
+            for nombre in sorted(self.span_segundos):
+                lineas.append(f'slir_span_seconds_sum{{span="{nombre}"}} {self.span_segundos[nombre]:.4f}')
+                lineas.append(f'slir_span_seconds_count{{span="{nombre}"}} {self.span_cuenta[nombre]}')
+            lineas += [
+                "# HELP slir_webdriver_commands_total Comandos WebDriver enviados",
+                "# TYPE slir_webdriver_commands_total counter",
+            ]
+            lineas += [f'slir_webdriver_commands_total{{command="{c}"}} {n}'
+                       for c, n in sorted(self.comandos.items())]
+        return "\n".join(lineas) + "\n"
+
+
+# Registro global del proceso
+registro = RegistroMetricas()
+
+
+@contextmanager
+def activar(instr):
+    """Hace que instr sea la instrumentación activa del hilo (o tarea) mientras dura el bloque"""
+    token = _actual.set(instr)
+    try:
+        yield instr
+    finally:
+        _actual.reset(token)
+        instr.terminar()
+
+
+def actual():
+    """Instrumentación activa en el hilo (o tarea), o None"""
+    return _actual.get()
+
+
+def span(nombre, **atributos):
+    """Span en la instrumentación activa; si no hay ninguna no mide nada"""
+    instr = actual()
+    if instr is None:
+        return nullcontext()
+    return instr.span(nombre, **atributos)
+
+
+def instrumentar_driver(driver):
+    """
+    Engancha driver.execute (por donde pasan todos los comandos de Selenium) para
+    contarlos en la instrumentación activa del hilo. Se hace una sola vez por driver.
+    """
+    if getattr(driver, "_slir_instrumentado", False):
+        return driver
+    execute_original = driver.execute
+
+    def execute(driver_command, params=None):
+        instr = actual()
+        if instr is not None:
+            instr.contar_comando(driver_command)
+        return execute_original(driver_command, params)
+
+    driver.execute = execute
+    driver._slir_instrumentado = True
+    return driver
+
+
+class ContadorComandos:
+    """
+    Cuenta los comandos WebDriver de un driver sin depender de la instrumentación activa
+
+    Se engancha a driver.execute, por donde pasan todas las llamadas de Selenium.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.total = 0
+        self.por_comando = {}
+        self._execute_original = driver.execute
+        driver.execute = self._execute
+
+    def _execute(self, driver_command, params=None):
+        self.total += 1
+        self.por_comando[driver_command] = self.por_comando.get(driver_command, 0) + 1
+        return self._execute_original(driver_command, params)
+
+    def reiniciar(self):
+        self.total = 0
+        self.por_comando = {}
+
+    def desenganchar(self):
+        self.driver.execute = self._execute_original
+
+
+def exportar_jsonl(instr, ruta):
+    """Añade al fichero los spans del código (uno por línea) y su resumen"""
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    lineas = [json.dumps({"tipo": "span", "code": instr.code, **s}, ensure_ascii=False, default=str)
+              for s in instr.spans]
+    lineas.append(json.dumps({"tipo": "resumen", **instr.resumen()}, ensure_ascii=False))
+    with _lock_ficheros:
+        with open(ruta, "a", encoding="utf-8") as f:
+            f.write("\n".join(lineas) + "\n")
+
+
+def exportar_prometheus(ruta, registro_metricas=None):
+    """Escribe el agregado en formato texto de Prometheus (reemplazo atómico del fichero)"""
+    registro_metricas = registro_metricas or registro
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    temporal = ruta + ".tmp"
+    with _lock_ficheros:
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(registro_metricas.texto_prometheus())
+        os.replace(temporal, ruta)
@@ -0,0 +1,417 @@
+"""
+Servidor local que imita SLIR para probar y medir sin str.apps.valeo.com
+
+Sirve respuestas JSON grabadas (un fichero <code>.json por código) paginadas en
+/api/single-slir/<code>?page=N&size=M, y en /slir/single-slir?code=<code> una página
+parecida a la de PrimeNG (tabla, paginador con filas por página, spinner y, si se
+pide, botón de Login) que carga cada página desde esa API.
+
+Uso:
+    python mock_slir_site.py <carpeta_grabaciones> [puerto]
+    python mock_slir_site.py --sintetico <filas> <columnas> [puerto]
+
+y apuntar el extractor a SLIR_API_URL=http://127.0.0.1:<puerto>/api/single-slir/{code}
+o a SLIR_BASE_URL=http://127.0.0.1:<puerto>/slir/single-slir
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import glob
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+from api_extractor import filas_de_respuesta
+
+RUTA_API = "/api/single-slir/"
+RUTA_PAGINA = "/slir/single-slir"
+# Imágenes, fuentes y analítica de relleno (lo que el arranque ligero bloquea)
+RUTA_RECURSOS = "/recursos/"
+# PNG de 1x1 píxel
+PNG_VACIO = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082")
+TIPOS_RECURSO = {".png": "image/png", ".woff2": "font/woff2", ".js": "application/javascript"}
+# Cookie que deja el botón de Login de la página de pruebas
+COOKIE_SESION = "slir_mock_sesion"
+
+# Página de la tabla. Los marcadores __X__ se sustituyen al servirla.
+PLANTILLA_PAGINA = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>SLIR (local)</title>
+__RECURSOS_CABECERA__
+<style>
+.p-progress-spinner { position: fixed; top: 0; left: 0; padding: 4px; background: #eee; }
+.p-paginator button { min-width: 2em; }
+.p-highlight { font-weight: bold; }
+.p-dropdown-items { position: absolute; background: #fff; border: 1px solid #999; list-style: none; }
+</style></head>
+<body>
+<div id="app"></div>
+__RECURSOS_CUERPO__
+<script>
+const CONFIG = __CONFIG__;
+const estado = {pagina: 1, tamano: CONFIG.tamano_inicial, total: 0, columnas: [], filas: []};
+
+function el(etiqueta, atributos, hijos) {
+    const e = document.createElement(etiqueta);
+    Object.entries(atributos || {}).forEach(([k, v]) => {
+        if (k === 'texto') e.textContent = v; else e.setAttribute(k, v);
+    });
+    (hijos || []).forEach(h => e.appendChild(h));
+    return e;
+}
+
+function conSesion() {
+    return !CONFIG.login || document.cookie.indexOf(CONFIG.cookie + '=1') !== -1;
+}
+
+function pintarLogin() {
+    const boton = el('button', {'class': 'p-button p-button-secondary p-component', texto: 'Login'});
+    boton.addEventListener('click', () => {
+        document.cookie = CONFIG.cookie + '=1; path=/';
+        document.getElementById('app').innerHTML = '';
+        setTimeout(() => cargar(1), CONFIG.retardo_login * 1000);
+    });
+    document.getElementById('app').appendChild(boton);
+}
+
+function spinner(visible) {
+    let s = document.querySelector('.p-progress-spinner');
+    if (visible && !s) document.body.appendChild(el('div', {'class': 'p-progress-spinner', texto: 'Cargando...'}));
+    if (!visible && s) s.remove();
+}
+
+function cargar(pagina) {
+    spinner(true);
+    const url = CONFIG.api + encodeURIComponent(CONFIG.code) + '?page=' + (pagina - 1 + CONFIG.primera_pagina) + '&size=' + estado.tamano;
+    fetch(url).then(r => r.json()).then(datos => {
+        estado.pagina = pagina;
+        estado.total = datos.totalElements;
+        estado.filas = datos.content || [];
+        if (estado.filas.length) {
+            estado.columnas = Object.keys(estado.filas[0]);
+        }
+        spinner(false);
+        pintar();
+    });
+}
+
+function totalPaginas() {
+    return Math.max(1, Math.ceil(estado.total / estado.tamano));
+}
+
+function pintarTabla() {
+    const cabecera = el('tr', {}, estado.columnas.map(c => el('th', {role: 'columnheader', texto: c})));
+    const filas = estado.filas.map(f => el('tr', {}, estado.columnas.map(
+        c => el('td', {role: 'cell', texto: f[c] === null || f[c] === undefined ? '' : String(f[c])}))));
+    return el('table', {'class': 'p-datatable-table'}, [el('thead', {}, [cabecera]), el('tbody', {}, filas)]);
+}
+
+// Scroll virtual como el de PrimeNG: solo se pintan las filas que caben en el visor
+// (más un margen); cada fila lleva su aria-rowindex
+function pintarTablaVirtual() {
+    const v = CONFIG.virtual;
+    const visor = el('div', {'class': 'p-scroller', style: 'height: ' + v.alto_visor + 'px; overflow-y: auto;'});
+    const contenido = el('div', {style: 'position: relative; height: ' + (estado.filas.length * v.alto_fila + v.alto_fila) + 'px;'});
+    visor.appendChild(contenido);
+    const base = (estado.pagina - 1) * estado.tamano;
+    const pintarVentana = () => {
+        const primera = Math.max(0, Math.floor(visor.scrollTop / v.alto_fila) - v.margen);
+        const ultima = Math.min(estado.filas.length, Math.ceil((visor.scrollTop + v.alto_visor) / v.alto_fila) + v.margen);
+        const cabecera = el('tr', {}, estado.columnas.map(c => el('th', {role: 'columnheader', texto: c})));
+        const filas = estado.filas.slice(primera, ultima).map((f, i) => el('tr', {
+            'aria-rowindex': String(base + primera + i + 1), style: 'height: ' + v.alto_fila + 'px;'},
+            estado.columnas.map(c => el('td', {role: 'cell', texto: f[c] === null || f[c] === undefined ? '' : String(f[c])}))));
+        const tabla = el('table', {'class': 'p-datatable-table', style: 'position: absolute; top: ' + (primera * v.alto_fila) + 'px;'},
+            [el('thead', {}, [cabecera]), el('tbody', {}, filas)]);
+        contenido.innerHTML = '';
+        contenido.appendChild(tabla);
+    };
+    visor.addEventListener('scroll', () => requestAnimationFrame(pintarVentana));
+    pintarVentana();
+    return visor;
+}
+
+function boton(clase, texto, pagina, deshabilitado) {
+    const b = el('button', {'class': clase, type: 'button'});
+    if (texto) b.textContent = texto;
+    if (deshabilitado) { b.disabled = true; b.classList.add('p-disabled'); }
+    b.addEventListener('click', () => { if (!b.disabled) cargar(pagina); });
+    return b;
+}
+
+function pintarPaginador() {
+    const total = totalPaginas();
+    const inicio = Math.max(1, Math.min(estado.pagina - 2, total - CONFIG.botones_visibles + 1));
+    const fin = Math.min(total, inicio + CONFIG.botones_visibles - 1);
+    const botones = [];
+    for (let n = inicio; n <= fin; n++) {
+        const b = boton('p-paginator-page' + (n === estado.pagina ? ' p-highlight' : ''), String(n), n, false);
+        b.setAttribute('aria-label', String(n));
+        if (n === estado.pagina) b.setAttribute('aria-current', 'page');
+        botones.push(b);
+    }
+    const desplegable = el('div', {'class': 'p-dropdown'}, [
+        el('span', {'class': 'p-dropdown-label', texto: String(estado.tamano)})]);
+    desplegable.addEventListener('click', () => {
+        const abierto = document.querySelector('.p-dropdown-items');
+        if (abierto) { abierto.remove(); return; }
+        document.body.appendChild(el('ul', {'class': 'p-dropdown-items', role: 'listbox'}, CONFIG.tamanos.map(t => {
+            const li = el('li', {'class': 'p-dropdown-item', role: 'option', texto: String(t)});
+            li.addEventListener('click', () => {
+                document.querySelector('.p-dropdown-items').remove();
+                estado.tamano = t;
+                cargar(1);
+            });
+            return li;
+        })));
+    });
+    return el('div', {'class': 'p-paginator'}, [
+        boton('p-paginator-first', '<<', 1, estado.pagina === 1),
+        boton('p-paginator-prev', '<', estado.pagina - 1, estado.pagina === 1),
+        el('span', {'class': 'p-paginator-pages'}, botones),
+        boton('p-paginator-next', '>', estado.pagina + 1, estado.pagina >= total),
+        boton('p-paginator-last', '>>', total, estado.pagina >= total),
+        el('span', {'class': 'p-paginator-current', texto: 'Página ' + estado.pagina + ' de ' + total}),
+        desplegable,
+    ]);
+}
+
+function pintar() {
+    const app = document.getElementById('app');
+    app.innerHTML = '';
+    app.appendChild(CONFIG.virtual ? pintarTablaVirtual() : pintarTabla());
+    app.appendChild(pintarPaginador());
+}
+
+if (conSesion()) cargar(1); else pintarLogin();
+</script>
+</body></html>
+"""
+
+
+def generar_registros(filas, columnas, prefijo="F"):
+    """
+    Genera registros sintéticos para el sitio de pruebas
+
+    Args:
+        filas (int): Número de registros
+        columnas (int): Columnas de cada registro ("Columna 0", "Columna 1", ...)
+        prefijo (str): Prefijo de los valores (F<fila>C<columna>)
+
+    Returns:
+        list: Registros como diccionarios
+    """
+    nombres = [f"Columna {c}" for c in range(columnas)]
+    return [{nombre: f"{prefijo}{f}C{c}" for c, nombre in enumerate(nombres)} for f in range(filas)]
+
+
+def cargar_grabaciones(carpeta):
+    """
+    Carga las respuestas grabadas de una carpeta
+
+    Cada fichero <code>.json puede contener la lista de registros o una respuesta
+    completa del backend (objeto con content/data/...).
+
+    Returns:
+        dict: {code: lista de registros}
+    """
+    registros = {}
+    for ruta in glob.glob(os.path.join(carpeta, "*.json")):
+        code = os.path.splitext(os.path.basename(ruta))[0]
+        with open(ruta, encoding="utf-8") as f:
+            registros[code] = filas_de_respuesta(json.load(f))
+    return registros
+
+
+class ServidorMock:
+    """
+    Servidor HTTP en un hilo de fondo con los registros de cada código
+
+    Uso:
+        with ServidorMock({"SLIR1": registros}) as servidor:
+            cliente = ClienteApiSlir(url_api=servidor.url_api)
+            # o con el navegador:
+            configurar_base_url(servidor.url_pagina)
+    """
+
+    def __init__(self, registros_por_codigo, puerto=0, latencia=0.0, token=None, login=False,
+                 tamanos_pagina=(10, 25, 50), tamano_inicial=None, botones_visibles=5,
+                 retardo_login=0.0, recursos=0, virtual=False, alto_fila=24, alto_visor=480,
+                 primera_pagina=0):
+        """
+        Args:
+            registros_por_codigo (dict): {code: lista de registros}
+            puerto (int): Puerto de escucha (0 = uno libre)
+            latencia (float): Segundos de espera antes de cada respuesta (el spinner
+                              de la página se ve durante ese tiempo)
+            token (str): Si se indica, exige "Authorization: Bearer <token>"
+            login (bool): Si True, la página muestra el botón de Login hasta que se pulsa
+            tamanos_pagina (tuple): Opciones del desplegable de filas por página
+            tamano_inicial (int): Filas por página al cargar; por defecto la primera opción
+            botones_visibles (int): Botones de página que muestra el paginador
+            retardo_login (float): Segundos que tarda la página en cargar tras pulsar Login
+            recursos (int): Imágenes y fuentes de relleno que carga la página (más un script
+                            de analítica); cada una sufre también la latencia
+            virtual (bool): Si True, la tabla usa scroll virtual (solo están en el DOM
+                            las filas visibles en un visor de alto_visor píxeles)
+            alto_fila (int): Alto de cada fila con scroll virtual, en píxeles
+            alto_visor (int): Alto del visor con scroll virtual, en píxeles
+            primera_pagina (int): Índice de la primera página en la API (0 o 1)
+        """
+        self.registros = registros_por_codigo
+        self.latencia = latencia
+        self.token = token
+        self.login = login
+        self.tamanos_pagina = list(tamanos_pagina)
+        self.tamano_inicial = tamano_inicial or self.tamanos_pagina[0]
+        self.botones_visibles = botones_visibles
+        self.retardo_login = retardo_login
+        self.recursos = recursos
+        self.virtual = {"alto_fila": alto_fila, "alto_visor": alto_visor, "margen": 3} if virtual else None
+        self.primera_pagina = primera_pagina
+        self.peticiones = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", puerto), self._crear_handler())
+        self.puerto = self.httpd.server_address[1]
+        self._hilo = None
+
+    @property
+    def url_base(self):
+        return f"http://127.0.0.1:{self.puerto}"
+
+    @property
+    def url_api(self):
+        return f"{self.url_base}{RUTA_API}{{code}}"
+
+    @property
+    def url_pagina(self):
+        return f"{self.url_base}{RUTA_PAGINA}"
+
+    def html_pagina(self, code):
+        """Página de la tabla de un código, configurada con las opciones del servidor"""
+        config = {
+            "code": code,
+            "api": RUTA_API,
+            "login": self.login,
+            "cookie": COOKIE_SESION,
+            "tamanos": self.tamanos_pagina,
+            "tamano_inicial": self.tamano_inicial,
+            "botones_visibles": self.botones_visibles,
+            "retardo_login": self.retardo_login,
+            "virtual": self.virtual,
+            "primera_pagina": self.primera_pagina,
+        }
+        cabecera = cuerpo = ""
+        if self.recursos:
+            cabecera = "".join(
+                f'<link rel="preload" as="font" type="font/woff2" crossorigin href="{RUTA_RECURSOS}fuente_{i}.woff2">'
+                for i in range(max(1, self.recursos // 4)))
+            cabecera += f'<script async src="{RUTA_RECURSOS}analytics.js"></script>'
+            cuerpo = "".join(f'<img src="{RUTA_RECURSOS}imagen_{i}.png" width="1" height="1">'
+                             for i in range(self.recursos))
+        # "</" se escapa para que un código no pueda cerrar la etiqueta <script>
+        return (PLANTILLA_PAGINA
+                .replace("__RECURSOS_CABECERA__", cabecera)
+                .replace("__RECURSOS_CUERPO__", cuerpo)
+                .replace("__CONFIG__", json.dumps(config).replace("</", "<\\/")))
+
+    def _crear_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, formato, *args):
+                pass
+
+            def _responder(self, estado, cuerpo, tipo="application/json"):
+                datos = cuerpo if isinstance(cuerpo, bytes) else cuerpo.encode("utf-8")
+                self.send_response(estado)
+                self.send_header("Content-Type", tipo if isinstance(cuerpo, bytes) else f"{tipo}; charset=utf-8")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def do_GET(self):
+                with servidor._lock:
+                    servidor.peticiones += 1
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+
+                url = urlparse(self.path)
+                if url.path.startswith(RUTA_API):
+                    self._api(url)
+                elif url.path == RUTA_PAGINA:
+                    code = parse_qs(url.query).get("code", [""])[0]
+                    self._responder(200, servidor.html_pagina(code), tipo="text/html")
+                elif url.path.startswith(RUTA_RECURSOS):
+                    extension = os.path.splitext(url.path)[1]
+                    cuerpo = PNG_VACIO if extension == ".png" else b"\0" * 2048
+                    if extension == ".js":
+                        cuerpo = b"window.analiticaCargada = true;"
+                    self._responder(200, cuerpo, tipo=TIPOS_RECURSO.get(extension, "application/octet-stream"))
+                else:
+                    self._responder(404, json.dumps({"error": "no encontrado"}))
+
+            def _api(self, url):
+                if servidor.token and self.headers.get("Authorization") != f"Bearer {servidor.token}":
+                    self._responder(401, json.dumps({"error": "no autorizado"}))
+                    return
+
+                code = url.path[len(RUTA_API):]
+                if code not in servidor.registros:
+                    self._responder(404, json.dumps({"error": f"código {code} desconocido"}))
+                    return
+
+                params = parse_qs(url.query)
+                pagina = int(params.get("page", [str(servidor.primera_pagina)])[0])
+                tamano = int(params.get("size", ["10"])[0])
+                registros = servidor.registros[code]
+                inicio = (pagina - servidor.primera_pagina) * tamano
+
+                self._responder(200, json.dumps({
+                    "content": registros[inicio:inicio + tamano] if inicio >= 0 else [],
+                    "number": pagina,
+                    "size": tamano,
+                    "totalElements": len(registros),
+                    "totalPages": max(1, math.ceil(len(registros) / tamano)),
+                }))
+
+        return Handler
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.detener()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python mock_slir_site.py <carpeta_grabaciones> [puerto]")
+        print("     python mock_slir_site.py --sintetico <filas> <columnas> [puerto]")
+        sys.exit(1)
+
+    if sys.argv[1] == "--sintetico":
+        grabaciones = {"SLIRMOCK": generar_registros(int(sys.argv[2]), int(sys.argv[3]))}
+        puerto = int(sys.argv[4]) if len(sys.argv) > 4 else 8765
+    else:
+        grabaciones = cargar_grabaciones(sys.argv[1])
+        puerto = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    servidor = ServidorMock(grabaciones, puerto=puerto, login=True)
+    print(f"Sirviendo {len(grabaciones)} códigos en {servidor.url_base}{RUTA_API}<code>")
+    print(f"Página de la tabla: {servidor.url_pagina}?code=<code>")
+    try:
+        servidor.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
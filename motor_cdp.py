@@ -0,0 +1,705 @@
+"""
+Motor asíncrono de extracción: muchas pestañas de un mismo navegador a la vez por CDP
+
+El flujo de Selenium ocupa un navegador entero con un solo código y espera a cada
+comando. Aquí el navegador se arranca y hace login una vez (DriverPool) y después se
+controla directamente por Chrome DevTools Protocol desde asyncio: cada código se
+abre en su propia pestaña y todas navegan, esperan y se leen a la vez. La tabla se
+lee con los mismos scripts de la página que el modo Selenium y el resultado de cada
+código tiene el mismo formato que el de process_slir_code.
+
+Uso:
+    resultados = procesar_codigos_cdp(["SLIR1ST230476", ...], max_pestanas=8)
+
+    python motor_cdp.py <fichero_codigos> [max_pestanas]
+"""
+import asyncio
+import itertools
+import json
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+import websocket
+
+import open_page
+from driver_pool import DriverPool
+from esperas import JS_HUELLA, SCRIPT_ESPERAR_CAMBIO
+from extract_info import (SCRIPT_SNAPSHOT_TABLA, filas_desde_matriz, obtener_directorio_salida,
+                          total_paginas_desde_texto)
+from instrumentacion import Instrumentacion, activar, actual, exportar_jsonl, registro, span
+from paginacion import (LECTURAS_PAGINADOR, PAUSA_LECTURA_PAGINADOR, SCRIPT_BOTON_HACIA_PAGINA,
+                        SCRIPT_ESTADO_PAGINADOR, SELECTOR_DESPLEGABLE_FILAS, SELECTOR_OPCIONES_FILAS,
+                        limite_transiciones, ultima_pagina_segun)
+from politicas import (POLITICA_POR_DEFECTO, DatosIncompletos, ErrorCdp, ErrorExtraccion,
+                       ErrorPaginacion, ErrorPaginaVacia)
+from sinks import crear_sink
+from bitacora import configurar_logs, obtener_logger, registrar_resumen_codigo
+
+log = obtener_logger(__name__)
+
+
+# Pestañas abiertas a la vez por defecto
+MAX_PESTANAS = 8
+# Segundos máximos de espera de un comando CDP
+TIMEOUT_COMANDO = 30
+
+# Espera a que la pestaña muestre filas (sin spinner) o el botón de Login.
+# Devuelve "tabla", "login" o null si se agota el tiempo.
+SCRIPT_ESPERAR_TABLA_O_LOGIN = JS_HUELLA + """
+const limite = arguments[0] * 1000;
+const done = arguments[arguments.length - 1];
+const inicio = Date.now();
+function estado() {
+    if (document.querySelector('table tbody tr') && !spinnerVisible()) return 'tabla';
+    const login = Array.from(document.querySelectorAll('button.p-button'))
+        .some(b => b.innerText.trim() === 'Login');
+    return login ? 'login' : null;
+}
+(function comprobar() {
+    const e = estado();
+    if (e !== null) { done(e); return; }
+    if (Date.now() - inicio > limite) { done(null); return; }
+    setTimeout(comprobar, 50);
+})();
+"""
+
+# Pulsa el botón de Login de la aplicación
+SCRIPT_PULSAR_LOGIN = """
+const boton = Array.from(document.querySelectorAll('button.p-button'))
+    .find(b => b.innerText.trim() === 'Login');
+if (!boton) return false;
+boton.click();
+return true;
+"""
+
+# Pulsa el botón que acerca a la página pedida (ver paginacion.ir_a_pagina) y
+# devuelve la huella de la página anterior al clic, o null si no hay botón
+SCRIPT_PULSAR_HACIA_PAGINA = JS_HUELLA + """
+const boton = (function() {""" + SCRIPT_BOTON_HACIA_PAGINA + """
+}).apply(null, arguments);
+if (!boton) return null;
+const huella = huellaPagina();
+boton.scrollIntoView({block: 'center'});
+boton.click();
+return huella;
+"""
+
+# Sube el desplegable de filas por página a su máximo (ver paginacion.maximizar_filas_por_pagina).
+# Devuelve {maximo, cambiado, huella} o null si no hay desplegable u opciones numéricas. Si
+# la tabla cabe en una página no se cambia nada y maximo es el valor actual.
+SCRIPT_MAXIMIZAR_FILAS = JS_HUELLA + """
+const limite = arguments[0] * 1000;
+const done = arguments[arguments.length - 1];
+const desplegable = document.querySelector(__DESPLEGABLE__);
+if (!desplegable) { done(null); return; }
+const actual = desplegable.innerText.trim();
+const huella = huellaPagina();
+const siguiente = document.querySelector('.p-paginator button.p-paginator-next');
+if (!siguiente || siguiente.disabled || siguiente.classList.contains('p-disabled')) {
+    done({maximo: /^\\d+$/.test(actual) ? Number(actual) : null, cambiado: false, huella: huella});
+    return;
+}
+desplegable.click();
+const inicio = Date.now();
+(function buscar() {
+    const opciones = Array.from(document.querySelectorAll(__OPCIONES__))
+        .map(o => [Number(o.innerText.trim()), o])
+        .filter(([n]) => Number.isInteger(n) && n > 0)
+        .sort((a, b) => b[0] - a[0]);
+    if (!opciones.length) {
+        if (Date.now() - inicio > limite) { done(null); return; }
+        setTimeout(buscar, 50);
+        return;
+    }
+    const [maximo, opcion] = opciones[0];
+    if (String(maximo) === actual) {
+        desplegable.click();
+        done({maximo: maximo, cambiado: false, huella: huella});
+        return;
+    }
+    opcion.click();
+    done({maximo: maximo, cambiado: true, huella: huella});
+})();
+""".replace("__DESPLEGABLE__", json.dumps(SELECTOR_DESPLEGABLE_FILAS)).replace(
+    "__OPCIONES__", json.dumps(SELECTOR_OPCIONES_FILAS))
+
+
+def url_depuracion(driver):
+    """
+    Devuelve la URL del WebSocket de DevTools del navegador que controla el driver
+
+    Returns:
+        str: ws://... del navegador (no de una pestaña)
+    """
+    capacidades = driver.capabilities
+    opciones = capacidades.get("ms:edgeOptions") or capacidades.get("goog:chromeOptions") or {}
+    direccion = opciones.get("debuggerAddress")
+    if not direccion:
+        raise ErrorCdp("El navegador no expone la dirección de DevTools (debuggerAddress)")
+    with urllib.request.urlopen(f"http://{direccion}/json/version", timeout=10) as respuesta:
+        return json.load(respuesta)["webSocketDebuggerUrl"]
+
+
+def _expresion(script, args):
+    """Convierte un script de execute_script (con return y arguments) en una expresión"""
+    return f"(function() {{{script}\n}}).apply(null, {json.dumps(list(args))})"
+
+
+def _expresion_async(script, args):
+    """Igual que _expresion para scripts de execute_async_script (último argumento = done)"""
+    return (f"new Promise(resolve => (function() {{{script}\n}})"
+            f".apply(null, {json.dumps(list(args))}.concat([resolve])))")
+
+
+class ConexionCdp:
+    """
+    Conexión WebSocket con DevTools usable desde asyncio
+
+    websocket-client (dependencia de Selenium) es síncrono: un hilo lee los mensajes
+    y los entrega al bucle de eventos, que resuelve la respuesta de cada comando por
+    su id. Las sesiones de las pestañas van por la misma conexión (modo "flatten").
+    """
+
+    def __init__(self, url_ws, timeout=TIMEOUT_COMANDO):
+        self.url_ws = url_ws
+        self.timeout = timeout
+        self._ws = None
+        self._loop = None
+        self._hilo = None
+        self._ids = itertools.count(1)
+        self._pendientes = {}
+        self._eventos = {}
+        self._lock_envio = threading.Lock()
+
+    async def abrir(self):
+        self._loop = asyncio.get_running_loop()
+        self._ws = await asyncio.to_thread(
+            websocket.create_connection, self.url_ws, suppress_origin=True, enable_multithread=True)
+        self._hilo = threading.Thread(target=self._leer, name="cdp-lector", daemon=True)
+        self._hilo.start()
+        return self
+
+    def _leer(self):
+        while True:
+            try:
+                datos = self._ws.recv()
+            except Exception as e:
+                self._entregar(self._fallar_pendientes, e)
+                return
+            if datos:
+                self._entregar(self._despachar, json.loads(datos))
+
+    def _entregar(self, funcion, argumento):
+        try:
+            self._loop.call_soon_threadsafe(funcion, argumento)
+        except RuntimeError:
+            # El bucle de eventos ya terminó
+            pass
+
+    def _despachar(self, mensaje):
+        if "id" in mensaje:
+            futuro = self._pendientes.pop(mensaje["id"], None)
+            if futuro is None or futuro.done():
+                return
+            if "error" in mensaje:
+                futuro.set_exception(ErrorCdp(mensaje["error"].get("message", str(mensaje["error"]))))
+            else:
+                futuro.set_result(mensaje.get("result", {}))
+            return
+
+        clave = (mensaje.get("sessionId"), mensaje.get("method"))
+        for futuro in self._eventos.pop(clave, []):
+            if not futuro.done():
+                futuro.set_result(mensaje.get("params", {}))
+
+    def _fallar_pendientes(self, error):
+        for futuro in list(self._pendientes.values()):
+            if not futuro.done():
+                futuro.set_exception(ErrorCdp(f"Conexión con DevTools cerrada: {error}"))
+        self._pendientes.clear()
+
+    def esperar_evento(self, metodo, session_id=None):
+        """Futuro que se resuelve con el siguiente evento indicado (registrar antes de provocarlo)"""
+        futuro = self._loop.create_future()
+        self._eventos.setdefault((session_id, metodo), []).append(futuro)
+        return futuro
+
+    async def enviar(self, metodo, params=None, session_id=None, timeout=None):
+        """
+        Envía un comando CDP y espera su respuesta
+
+        Returns:
+            dict: Campo "result" de la respuesta
+        """
+        instr = actual()
+        if instr is not None:
+            instr.contar_comando(metodo)
+
+        id_mensaje = next(self._ids)
+        futuro = self._loop.create_future()
+        self._pendientes[id_mensaje] = futuro
+        mensaje = {"id": id_mensaje, "method": metodo, "params": params or {}}
+        if session_id:
+            mensaje["sessionId"] = session_id
+        try:
+            with self._lock_envio:
+                self._ws.send(json.dumps(mensaje))
+        except websocket.WebSocketException as e:
+            self._pendientes.pop(id_mensaje, None)
+            raise ErrorCdp(f"Conexión con DevTools cerrada: {e}") from e
+        try:
+            return await asyncio.wait_for(futuro, timeout or self.timeout)
+        finally:
+            self._pendientes.pop(id_mensaje, None)
+
+    def cerrar(self):
+        if self._ws:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+
+
+class PestanaCdp:
+    """Pestaña del navegador controlada con una sesión CDP propia"""
+
+    def __init__(self, conexion, target_id, session_id):
+        self.conexion = conexion
+        self.target_id = target_id
+        self.session_id = session_id
+
+    @classmethod
+    async def abrir(cls, conexion):
+        target = await conexion.enviar("Target.createTarget", {"url": "about:blank"})
+        sesion = await conexion.enviar("Target.attachToTarget",
+                                       {"targetId": target["targetId"], "flatten": True})
+        pestana = cls(conexion, target["targetId"], sesion["sessionId"])
+        await pestana.enviar("Page.enable")
+        # Las pestañas en segundo plano no deben ralentizar sus temporizadores
+        await pestana.enviar("Emulation.setFocusEmulationEnabled", {"enabled": True})
+        return pestana
+
+    async def enviar(self, metodo, params=None, timeout=None):
+        return await self.conexion.enviar(metodo, params, self.session_id, timeout)
+
+    async def navegar(self, url, timeout=30):
+        carga = self.conexion.esperar_evento("Page.loadEventFired", self.session_id)
+        respuesta = await self.enviar("Page.navigate", {"url": url})
+        if respuesta.get("errorText"):
+            carga.cancel()
+            raise ErrorCdp(f"No se pudo abrir {url}: {respuesta['errorText']}")
+        await asyncio.wait_for(carga, timeout)
+
+    async def evaluar(self, expresion, timeout=None):
+        respuesta = await self.enviar("Runtime.evaluate", {
+            "expression": expresion,
+            "returnByValue": True,
+            "awaitPromise": True,
+        }, timeout)
+        if "exceptionDetails" in respuesta:
+            detalle = respuesta["exceptionDetails"]
+            texto = (detalle.get("exception") or {}).get("description") or detalle.get("text")
+            raise ErrorCdp(f"Error en el script de la página: {texto}")
+        return respuesta.get("result", {}).get("value")
+
+    async def script(self, script, *args):
+        """Equivalente a driver.execute_script"""
+        return await self.evaluar(_expresion(script, args))
+
+    async def script_async(self, script, *args, timeout=None):
+        """Equivalente a driver.execute_async_script"""
+        return await self.evaluar(_expresion_async(script, args), timeout)
+
+    async def cerrar(self):
+        try:
+            await self.conexion.enviar("Target.closeTarget", {"targetId": self.target_id}, timeout=5)
+        except Exception:
+            pass
+
+
+class MotorCdp:
+    """
+    Extrae varios códigos a la vez, cada uno en una pestaña del mismo navegador
+
+    Uso:
+        motor = MotorCdp(driver, max_pestanas=8)
+        await motor.conectar()
+        resultados = await asyncio.gather(*(motor.procesar_codigo(c) for c in codigos))
+        await motor.cerrar()
+    """
+
+    def __init__(self, driver, max_pestanas=MAX_PESTANAS, wait_time=30, timeout_pagina=5, politica=None):
+        """
+        Args:
+            driver: WebDriver ya arrancado y con la sesión iniciada (p. ej. de DriverPool)
+            max_pestanas (int): Códigos en curso a la vez (una pestaña por código)
+            wait_time (float): Segundos máximos de espera a que la tabla cargue
+            timeout_pagina (float): Segundos máximos de espera por cambio de página (sin
+                                    política; con ella se usa su tiempo adaptativo)
+            politica (Politica): Reintentos, tiempos de espera y cortacircuitos de cada página
+                                 y cambio de página, como en process_slir_code
+        """
+        self.driver = driver
+        self.max_pestanas = max_pestanas
+        self.wait_time = wait_time
+        self.timeout_pagina = timeout_pagina
+        self.politica = politica or POLITICA_POR_DEFECTO
+        self.conexion = None
+        self._semaforo = None
+
+    async def conectar(self):
+        url_ws = await asyncio.to_thread(url_depuracion, self.driver)
+        self.conexion = await ConexionCdp(url_ws).abrir()
+        self._semaforo = asyncio.Semaphore(self.max_pestanas)
+        return self
+
+    async def cerrar(self):
+        if self.conexion:
+            self.conexion.cerrar()
+
+    async def _esperar_tabla(self, pestana):
+        """Espera la tabla y, si la aplicación pide login, lo hace. Devuelve True si hay tabla."""
+        estado = await pestana.script_async(SCRIPT_ESPERAR_TABLA_O_LOGIN, self.wait_time,
+                                            timeout=self.wait_time + 5)
+        if estado != "login":
+            return estado == "tabla"
+
+        log.info("Pantalla de login detectada en la pestaña; iniciando sesión...")
+        await pestana.script(SCRIPT_PULSAR_LOGIN)
+        limite = time.monotonic() + self.wait_time
+        while time.monotonic() < limite:
+            try:
+                estado = await pestana.script_async(SCRIPT_ESPERAR_TABLA_O_LOGIN, 1, timeout=10)
+            except ErrorCdp:
+                # Redirecciones del proveedor de identidad: el contexto de la página cambia
+                estado = None
+            if estado == "tabla":
+                return True
+            await asyncio.sleep(0.2)
+        return False
+
+    async def _maximizar_filas(self, pestana):
+        datos = await pestana.script_async(SCRIPT_MAXIMIZAR_FILAS, self.timeout_pagina,
+                                           timeout=self.timeout_pagina + 5)
+        if not datos:
+            return None
+        if datos["cambiado"]:
+            log.debug(f"Cambiando filas por página a {datos['maximo']}...")
+            await pestana.script_async(SCRIPT_ESPERAR_CAMBIO, datos["huella"], self.timeout_pagina,
+                                       timeout=self.timeout_pagina + 5)
+        return datos["maximo"]
+
+    async def _total_paginas(self, pestana):
+        estado = await pestana.script(SCRIPT_ESTADO_PAGINADOR)
+        if not estado:
+            return None
+        numeros = list(estado.get("visibles") or [])
+        total = total_paginas_desde_texto(estado.get("texto"))
+        if total:
+            numeros.append(total)
+        return max(numeros) if numeros else None
+
+    async def _ir_a_pagina(self, pestana, numero, max_transiciones=None, timeout=None):
+        """Igual que paginacion.ir_a_pagina; devuelve las transiciones o None"""
+        timeout = timeout or self.timeout_pagina
+        transiciones = 0
+        while max_transiciones is None or transiciones < max_transiciones:
+            estado = await pestana.script(SCRIPT_ESTADO_PAGINADOR)
+            if max_transiciones is None:
+                max_transiciones = limite_transiciones(numero, (estado or {}).get("actual"))
+            if estado and estado.get("actual") == numero:
+                return transiciones
+
+            huella = await pestana.script(SCRIPT_PULSAR_HACIA_PAGINA, numero)
+            if huella is None:
+                log.warning(f"No hay ningún botón para avanzar hacia la página {numero}.")
+                return None
+            nueva = await pestana.script_async(SCRIPT_ESPERAR_CAMBIO, huella, timeout, timeout=timeout + 5)
+            if nueva is None:
+                log.warning(f"La tabla no cambió de página en {timeout} segundos.")
+                return None
+            transiciones += 1
+
+            if not estado or estado.get("actual") is None:
+                return transiciones
+
+        log.warning(f"No se llegó a la página {numero} tras {max_transiciones} transiciones.")
+        return None
+
+    async def _es_ultima_pagina(self, pestana):
+        """Igual que paginacion.es_ultima_pagina: True, False o None si no se ve el paginador"""
+        for lectura in range(LECTURAS_PAGINADOR):
+            ultima = ultima_pagina_segun(await pestana.script(SCRIPT_ESTADO_PAGINADOR))
+            if ultima is not None:
+                return ultima
+            if lectura < LECTURAS_PAGINADOR - 1:
+                await asyncio.sleep(PAUSA_LECTURA_PAGINADOR)
+        log.warning("No se encuentra el paginador; no se puede verificar si es la última página.")
+        return None
+
+    async def _extraer_pagina(self, pestana, numero):
+        """
+        Filas de la página mostrada, con los reintentos de la política (ver extract_info.extraer_pagina)
+
+        Raises:
+            ErrorExtraccion: Si no se consiguen filas tras los reintentos
+        """
+        async def intento_pagina(intento):
+            if intento > 1:
+                espera = self.politica.timeout("tabla_cargada", intento)
+                await pestana.script_async(SCRIPT_ESPERAR_TABLA_O_LOGIN, espera, timeout=espera + 5)
+            snapshot = await pestana.script(SCRIPT_SNAPSHOT_TABLA) or {}
+            filas = filas_desde_matriz(snapshot.get("headers") or [], snapshot.get("rows") or [])
+            # La primera página puede estar vacía; una intermedia sin filas es una carga fallida
+            if numero > 1 and not filas:
+                raise ErrorPaginaVacia(f"La página {numero} no tiene filas", numero)
+            return filas
+
+        return await self.politica.ejecutar_async(intento_pagina, f"Extracción de la página {numero}",
+                                                  pagina=numero)
+
+    async def _navegar_a_pagina(self, pestana, numero):
+        """
+        Lleva la pestaña a la página indicada con los reintentos de la política
+
+        Raises:
+            ErrorExtraccion: Si no se llega a la página tras los reintentos
+        """
+        async def intento_navegacion(intento):
+            await asyncio.to_thread(self.politica.limitar, "clic")
+            pasos = await self._ir_a_pagina(pestana, numero,
+                                            timeout=self.politica.timeout("cambio_pagina", intento))
+            if pasos is None:
+                raise ErrorPaginacion(f"No se pudo llegar a la página {numero}", numero)
+            return pasos
+
+        return await self.politica.ejecutar_async(intento_navegacion, f"Navegación a la página {numero}",
+                                                  pagina=numero)
+
+    async def procesar_codigo(self, code, formato="csv", maximizar_filas=True, conservar_filas=False,
+                              metricas_jsonl=None):
+        """
+        Procesa un código en una pestaña propia (espera turno si ya hay max_pestanas abiertas)
+
+        Returns:
+            dict: Mismo formato que process_slir_code, o None si falla
+        """
+        async with self._semaforo:
+            instr = Instrumentacion(code)
+            resultado = None
+            inicio = time.perf_counter()
+            try:
+                with activar(instr):
+                    resultado = await self._procesar_codigo(code, formato, maximizar_filas, conservar_filas)
+                if resultado is not None:
+                    resultado["metricas"] = instr.resumen()
+                return resultado
+            finally:
+                registro.registrar(instr, bool(resultado and resultado.get("success")))
+                registrar_resumen_codigo(code, resultado, time.perf_counter() - inicio)
+                if metricas_jsonl:
+                    try:
+                        exportar_jsonl(instr, metricas_jsonl)
+                    except OSError as e:
+                        log.warning(f"No se pudieron guardar las métricas de {code}: {e}")
+
+    async def _procesar_codigo(self, code, formato, maximizar_filas, conservar_filas):
+        pestana = None
+        try:
+            with span("pestana"):
+                pestana = await PestanaCdp.abrir(self.conexion)
+
+            await asyncio.to_thread(self.politica.limitar, "navegacion")
+            inicio = time.perf_counter()
+            with span("navegacion"):
+                await pestana.navegar(f"{open_page.BASE_URL}?code={code}", self.wait_time)
+            tiempo_carga = time.perf_counter() - inicio
+
+            with span("tabla_cargada"):
+                hay_tabla = await self._esperar_tabla(pestana)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            tiempos = {"tiempo_carga": tiempo_carga, "tiempo_arranque": 0.0, "tiempo_login": 0.0}
+            if not hay_tabla:
+                log.warning(f"No se pudieron extraer datos de la tabla para el código: {code}")
+                return {
+                    "code": code,
+                    "extraction_time": timestamp,
+                    "success": False,
+                    "message": "No se pudieron extraer datos de la tabla",
+                    "tiempos": tiempos
+                }
+
+            filas_por_pagina = None
+            if maximizar_filas:
+                with span("filas_por_pagina"):
+                    filas_por_pagina = await self._maximizar_filas(pestana)
+            with span("deteccion_paginas"):
+                total_pages = await self._total_paginas(pestana)
+
+            escritor = crear_sink(formato, obtener_directorio_salida(), code, timestamp)
+            all_rows = [] if conservar_filas else None
+            numero = 1
+            page_transitions = 0
+            last_page_verified = False
+            error = None
+            try:
+                while True:
+                    with span("extraccion_pagina", pagina=numero):
+                        filas = await self._extraer_pagina(pestana, numero)
+
+                    with span("escritura", pagina=numero, filas=len(filas)):
+                        await asyncio.to_thread(escritor.escribir_pagina, numero, filas)
+                    if conservar_filas:
+                        all_rows.extend(filas)
+
+                    ultima = await self._es_ultima_pagina(pestana)
+                    if ultima is None:
+                        raise DatosIncompletos("No se pudo leer el paginador para verificar la última página",
+                                               numero)
+                    if ultima:
+                        last_page_verified = True
+                        break
+                    with span("espera_pagina", pagina=numero + 1):
+                        pasos = await self._navegar_a_pagina(pestana, numero + 1)
+                    page_transitions += pasos
+                    numero += 1
+            except ErrorExtraccion as e:
+                error = e
+                log.warning(f"Extracción de {code} interrumpida en la página {e.pagina or numero}: {e}")
+
+            if error is None and not last_page_verified:
+                error = DatosIncompletos("No se verificó la última página", numero)
+
+            if error is not None and (escritor.ultima_pagina == 0 or not self.politica.permitir_incompletos):
+                # Igual que process_slir_code: lo escrito queda pendiente de reanudar y el
+                # código no se da por extraído
+                escritor.cerrar(completo=False)
+                return {
+                    "code": code,
+                    "csv_file": escritor.destino if escritor.ultima_pagina else None,
+                    "extraction_time": timestamp,
+                    "success": False,
+                    "error": type(error).__name__,
+                    "message": str(error),
+                    "pages_processed": escritor.ultima_pagina,
+                    "page_transitions": page_transitions,
+                    "reanudable": escritor.admite_reanudar,
+                    "tiempos": tiempos
+                }
+
+            with span("cierre_salida"):
+                escritor.cerrar(completo=last_page_verified)
+            if escritor.ultima_pagina == 0:
+                return {
+                    "code": code,
+                    "extraction_time": timestamp,
+                    "success": False,
+                    "message": "No se pudieron extraer datos de la tabla",
+                    "tiempos": tiempos
+                }
+
+            current_page = escritor.ultima_pagina
+            if last_page_verified:
+                total_pages = current_page
+            combined_data = {
+                "pages_processed": current_page,
+                "total_pages": total_pages if total_pages else current_page,
+                "total_rows": escritor.total_filas,
+                "rows_per_page": filas_por_pagina,
+                "page_transitions": page_transitions,
+                "last_page_verified": last_page_verified
+            }
+            if conservar_filas:
+                combined_data["table_data"] = all_rows
+            log.debug(f"{code}: {escritor.total_filas} filas en {current_page} páginas -> {escritor.destino}")
+
+            return {
+                "code": code,
+                "csv_file": escritor.destino,
+                "formato": formato if isinstance(formato, str) else "dataset",
+                "extraction_time": timestamp,
+                "pages_processed": current_page,
+                "page_transitions": page_transitions,
+                "data": combined_data,
+                "tiempos": tiempos,
+                "success": True
+            }
+
+        except Exception as e:
+            log.error(f"Error en el motor CDP con {code}: {e}")
+            return None
+
+        finally:
+            if pestana:
+                await pestana.cerrar()
+
+
+async def extraer_codigos(codigos, driver, max_pestanas=MAX_PESTANAS, formato="csv",
+                          maximizar_filas=True, metricas_jsonl=None, politica=None):
+    """
+    Extrae todos los códigos con un único navegador ya preparado
+
+    Returns:
+        list: Resultados en el mismo orden que codigos (formato de process_slir_code)
+    """
+    motor = MotorCdp(driver, max_pestanas=max_pestanas, politica=politica)
+    await motor.conectar()
+    try:
+        return await asyncio.gather(*(
+            motor.procesar_codigo(code, formato=formato, maximizar_filas=maximizar_filas,
+                                  metricas_jsonl=metricas_jsonl)
+            for code in codigos
+        ))
+    finally:
+        await motor.cerrar()
+
+
+def procesar_codigos_cdp(codigos, max_pestanas=MAX_PESTANAS, headless=True, navegador="edge",
+                         user_data_dir=None, log_path=None, formato="csv", maximizar_filas=True,
+                         metricas_jsonl=None, sesion_guardada=None, politica=None):
+    """
+    Arranca un navegador (con login), extrae todos los códigos en pestañas paralelas y lo cierra
+
+    Args:
+        codigos (list): Códigos SLIR
+        max_pestanas (int): Pestañas abiertas a la vez
+        headless, navegador, user_data_dir, log_path: ver iniciar_navegador
+        formato: Formato de salida o DatasetParquet (ver sinks.py)
+        maximizar_filas (bool): Si True, sube las filas por página al máximo en cada pestaña
+        metricas_jsonl (str): Si se indica, se añaden ahí los spans de cada código
+        sesion_guardada (AlmacenSesion): Sesión cifrada para no repetir el login (ver sesion_guardada.py)
+        politica (Politica): Reintentos y tiempos de espera de cada pestaña (ver politicas.py)
+
+    Returns:
+        list: Resultados en el mismo orden que codigos (formato de process_slir_code)
+    """
+    with DriverPool(tamano=1, headless=headless, navegador=navegador,
+                    user_data_dirs=[user_data_dir], log_paths=[log_path],
+                    sesion_guardada=sesion_guardada) as pool:
+        with pool.sesion() as sesion:
+            return asyncio.run(extraer_codigos(codigos, sesion.driver, max_pestanas, formato,
+                                               maximizar_filas, metricas_jsonl, politica))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python motor_cdp.py <fichero_codigos> [max_pestanas]")
+        sys.exit(1)
+
+    from batch_runner import leer_codigos
+
+    configurar_logs()
+    codigos = leer_codigos(sys.argv[1])
+    max_pestanas = int(sys.argv[2]) if len(sys.argv) > 2 else MAX_PESTANAS
+    print(f"Procesando {len(codigos)} códigos en {max_pestanas} pestañas...")
+
+    inicio = time.perf_counter()
+    resultados = procesar_codigos_cdp(codigos, max_pestanas=max_pestanas)
+    duracion = time.perf_counter() - inicio
+
+    exitosos = sum(1 for r in resultados if r and r.get("success"))
+    print(f"\nExitosos: {exitosos} / {len(codigos)} "
+          f"({len(codigos) / duracion * 60:.1f} códigos/minuto)")
@@ -1,19 +1,64 @@
-from selenium import webdriver
-from selenium.webdriver.edge.options import Options
-from selenium.webdriver.edge.service import Service as EdgeService
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 import time
 import os
 import subprocess
+import sys
 import datetime
 
+from arranque import clases_navegador, driver_desfasado, resolver_driver
+from bitacora import LOGS_DIR, configurar_logs, obtener_logger, opciones_log_driver
+from esperas import esperar_pagina_inicial, esperar_login_completado
+from instrumentacion import span, instrumentar_driver
+
+log = obtener_logger(__name__)
+
+
 # Constantes globales
 # Usar una ruta independiente del usuario
 EDGE_USER_DATA_DIR = os.path.join(os.environ.get('LOCALAPPDATA', ''), "Microsoft", "Edge", "User Data")
-# URL base para la plataforma SLIR
-BASE_URL = "https://str.apps.valeo.com/slir/single-slir"
+# URL base para la plataforma SLIR (SLIR_BASE_URL permite apuntar a otra, p. ej. el sitio local de pruebas)
+BASE_URL = os.environ.get("SLIR_BASE_URL", "https://str.apps.valeo.com/slir/single-slir")
+# Origen de la aplicación (para distinguirla de las páginas del proveedor de identidad)
+APP_ORIGIN = "/".join(BASE_URL.split("/")[:3])
+# Elementos que solo aparecen con la sesión iniciada (SLIR_MARCA_SESION permite cambiarlos)
+SELECTOR_AUTENTICADO = os.environ.get("SLIR_MARCA_SESION", "table tbody tr, .p-paginator, .p-datatable")
+
+
+# Peticiones que el perfil ligero bloquea (imágenes, fuentes, multimedia y analítica).
+# SLIR_BLOQUEAR añade patrones separados por comas.
+PATRONES_BLOQUEADOS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*clarity.ms*", "*hotjar*", "*applicationinsights*", "*dc.services.visualstudio.com*",
+    "*analytics*.js",
+] + [p.strip() for p in os.environ.get("SLIR_BLOQUEAR", "").split(",") if p.strip()]
+
+# Opciones del arranque ligero: nada de extensiones, sincronización ni tareas de fondo
+ARGUMENTOS_LIGEROS = [
+    "--disable-extensions",
+    "--disable-component-extensions-with-background-pages",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--blink-settings=imagesEnabled=false",
+]
+
+
+def configurar_base_url(url):
+    """
+    Cambia la URL de la aplicación SLIR en tiempo de ejecución (p. ej. para el sitio local de pruebas)
+
+    Args:
+        url (str): URL de la página de un código, sin el parámetro ?code=
+    """
+    global BASE_URL, APP_ORIGIN
+    BASE_URL = url
+    APP_ORIGIN = "/".join(url.split("/")[:3])
 
 def cerrar_procesos_edge():
     """Cierra procesos de Edge en ejecución usando taskkill"""
@@ -21,11 +66,11 @@ def cerrar_procesos_edge():
         resultado = subprocess.run(["taskkill", "/F", "/IM", "msedge.exe"], 
                                    stdout=subprocess.DEVNULL, 
                                    stderr=subprocess.DEVNULL)        
-        print("Procesos de Edge cerrados")
+        log.info("Procesos de Edge cerrados")
         
         return True
     except Exception as e:
-        print(f"Error al intentar cerrar Edge: {e}")
+        log.warning(f"Error al intentar cerrar Edge: {e}")
         return False
         
 def manejar_login(driver):
@@ -39,9 +84,14 @@ def manejar_login(driver):
         bool: True si se detectó y manejó el login, False en caso contrario
     """
     try:
-        print("Verificando si se requiere inicio de sesión...")
-        # Esperar un poco para que la página cargue completamente
-        time.sleep(2)
+        log.debug("Verificando si se requiere inicio de sesión...")
+        # Esperar a que la aplicación muestre el login o la tabla (sin pausa fija)
+        esperar_pagina_inicial(driver)
+        
+        # Vía rápida: con la aplicación ya autenticada no se busca ningún botón
+        if sesion_iniciada(driver):
+            log.debug("La sesión ya está iniciada, continuando...")
+            return False
         
         # Intentar varias estrategias para encontrar el botón de login
         login_button = None
@@ -67,115 +117,300 @@ def manejar_login(driver):
                 pass
         
         if login_button:
-            print("Pantalla de login detectada. Intentando iniciar sesión automáticamente...")
+            log.info("Pantalla de login detectada. Intentando iniciar sesión automáticamente...")
             # Hacer clic en el botón de login
             driver.execute_script("arguments[0].click();", login_button)
-            print("Se hizo clic en el botón de login")
+            log.debug("Se hizo clic en el botón de login")
             
             # Esperar a que se complete el proceso de login
-            time.sleep(3)
+            if not esperar_login_completado(driver, url_app=APP_ORIGIN):
+                log.warning("El login no terminó en el tiempo esperado, continuando...")
             return True
         else:
-            print("No se detectó pantalla de login, continuando...")
+            log.debug("No se detectó pantalla de login, continuando...")
             return False
             
     except Exception as e:
-        print(f"Error al intentar manejar el login: {e}")
+        log.warning(f"Error al intentar manejar el login: {e}")
         return False
     
 
-def open_page(slir_code, cerrar_previo=True, mantener_abierto=True, headless=True):
+def iniciar_navegador(cerrar_previo=True, mantener_abierto=True, headless=True,
+                      user_data_dir=None, log_path=None, navegador="edge", capturar_red=False,
+                      ligero=False):
     """
-    Abre Edge con el perfil del usuario y navega a la URL con el código SLIR proporcionado
+    Arranca Edge (o Chrome/Chromium) con el perfil indicado, sin navegar a ninguna página
 
     Args:
-        slir_code (str): Código SLIR (ej: "SLIR1ST230476")
         cerrar_previo (bool): Si True, cierra cualquier instancia de Edge antes de abrir una nueva
         mantener_abierto (bool): Si True, mantiene el navegador abierto con detach=True
         headless (bool): Si True, ejecuta Edge en modo sin interfaz gráfica (no visible)
+        user_data_dir (str): Carpeta de perfil a usar; por defecto EDGE_USER_DATA_DIR.
+                             Cada navegador concurrente necesita su propia carpeta
+        log_path (str): Fichero de log de msedgedriver; por defecto logs/edge_driver.log.
+                        Solo una muestra de los navegadores guarda el log completo
+                        (ver bitacora.opciones_log_driver)
+        navegador (str): "edge" (por defecto) o "chrome"; con "chrome" no se hace taskkill de Edge
+        capturar_red (bool): Si True, activa el registro de eventos de red (ver captura_red.py)
+        ligero (bool): Si True, arranque ligero: sin extensiones ni tareas de fondo, carga
+                       "eager" (driver.get no espera a imágenes ni fuentes; las esperas de la
+                       tabla son explícitas) y bloqueo de PATRONES_BLOQUEADOS.
+                       Pensado para un perfil mínimo (ver perfiles.copiar_perfil_minimo)
+
+    El driver se toma de la ruta fijada o guardada (ver arranque.resolver_driver) en lugar
+    de preguntar a Selenium Manager en cada arranque.
 
     Returns:
-        tuple: (webdriver.Edge, float) - Instancia del navegador Edge y tiempo de carga en segundos,
-               o (None, 0) si falla.
+        webdriver.Edge: Instancia del navegador, o None si falla
     """
-    # Iniciar cronómetro de apertura del navegador
-    tiempo_inicio_navegador = datetime.datetime.now()
+    # Configurar opciones para Edge (o Chrome, que comparte las mismas opciones de Chromium)
+    es_chrome = navegador == "chrome"
+    clase_opciones, clase_servicio, clase_driver = clases_navegador(navegador)
+    edge_options = clase_opciones()
+    edge_options.add_argument(f"--user-data-dir={user_data_dir or EDGE_USER_DATA_DIR}")
+    
+    # Configurar modo headless si se solicita
+    if headless:
+        log.debug("Ejecutando Edge en modo headless (sin interfaz gráfica)...")
+        edge_options.add_argument("--headless")
+        edge_options.add_argument("--disable-gpu")  # Necesario para algunos sistemas
+        # No usar detach en modo headless ya que no tiene sentido
+        mantener_abierto = False
+    else:
+        edge_options.add_argument("--start-maximized")  # Solo maximizar si no es headless
+    
+    # En Linux (contenedores, CI) Chromium necesita estas opciones para arrancar
+    if not sys.platform.startswith("win"):
+        edge_options.add_argument("--no-sandbox")
+        edge_options.add_argument("--disable-dev-shm-usage")
+
+    if ligero:
+        for argumento in ARGUMENTOS_LIGEROS:
+            edge_options.add_argument(argumento)
+        edge_options.page_load_strategy = "eager"
+
+    # Evitar detección de automatización
+    edge_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+   
+
+    if mantener_abierto:
+        edge_options.add_experimental_option("detach", True)
+
+    # Registro de rendimiento solo con los eventos de red, para leer las respuestas JSON de la tabla
+    if capturar_red:
+        edge_options.set_capability("goog:loggingPrefs" if es_chrome else "ms:loggingPrefs",
+                                    {"performance": "ALL"})
+        edge_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+
+    # Si se solicita, cerrar cualquier instancia de Edge existente
+    if cerrar_previo and not es_chrome:
+        cerrar_procesos_edge()
+
+    log.debug("Abriendo Chrome..." if es_chrome else "Abriendo Edge...")
+
     try:
-        # Configurar opciones para Edge
-        edge_options = Options()
-        edge_options.add_argument(f"--user-data-dir={EDGE_USER_DATA_DIR}")
+        # Configurar el servicio de Edge para redirigir logs
+        log_path, argumentos_log = opciones_log_driver(log_path or os.path.join(LOGS_DIR, "edge_driver.log"))
+        ruta_driver = resolver_driver(navegador)
+        edge_service = clase_servicio(executable_path=ruta_driver, log_output=log_path,
+                                      service_args=argumentos_log)
+        
+        # Opciones adicionales para silenciar mensajes
+        edge_options.add_argument("--disable-logging")
+        edge_options.add_argument("--log-level=3")  # FATAL = 3
+        edge_options.add_argument("--silent")
         
-        # Configurar modo headless si se solicita
-        if headless:
-            print("Ejecutando Edge en modo headless (sin interfaz gráfica)...")
-            edge_options.add_argument("--headless")
-            edge_options.add_argument("--disable-gpu")  # Necesario para algunos sistemas
-            # No usar detach en modo headless ya que no tiene sentido
-            mantener_abierto = False
-        else:
-            edge_options.add_argument("--start-maximized")  # Solo maximizar si no es headless
         
-        # Evitar detección de automatización
-        edge_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-       
+        with span("arranque_navegador"):
+            driver = instrumentar_driver(clase_driver(options=edge_options, service=edge_service))
+        if ligero:
+            bloquear_recursos(driver)
+        return driver
+    except Exception as e:
+        # El navegador se actualizó y el driver guardado ya no le corresponde: se pide otro
+        if driver_desfasado(e):
+            nueva_ruta = resolver_driver(navegador, refrescar=True)
+            if nueva_ruta and nueva_ruta != ruta_driver:
+                log.warning(f"El driver {ruta_driver} no corresponde a la versión del navegador; "
+                            f"se usa {nueva_ruta}")
+                try:
+                    edge_service = clase_servicio(executable_path=nueva_ruta, log_output=log_path,
+                                                  service_args=argumentos_log)
+                    with span("arranque_navegador", reintento=True):
+                        driver = instrumentar_driver(clase_driver(options=edge_options, service=edge_service))
+                    if ligero:
+                        bloquear_recursos(driver)
+                    return driver
+                except Exception as e2:
+                    e = e2
+        # Solo se matan procesos si el llamador lo permite (en lotes hay otros navegadores vivos)
+        if cerrar_previo and not es_chrome and ("user data directory is already in use" in str(e) or "crashed" in str(e)):
+            log.warning("El perfil de usuario está en uso. Intentando cerrar instancias de Edge...")
+            if cerrar_procesos_edge():
+                log.info("Intentando abrir Edge nuevamente después de cerrar procesos...")
+                time.sleep(0.5)
+                with span("arranque_navegador", reintento=True):
+                    driver = instrumentar_driver(clase_driver(options=edge_options, service=edge_service))
+                if ligero:
+                    bloquear_recursos(driver)
+                return driver
+            else:
+                log.warning("No se pudo liberar el perfil de usuario.")
+                return None
+        else:
+            log.warning(f"Error al iniciar Edge: {e}")
+            return None
 
-        if mantener_abierto:
-            edge_options.add_experimental_option("detach", True)
 
-        # Si se solicita, cerrar cualquier instancia de Edge existente
-        if cerrar_previo:
-            cerrar_procesos_edge()
+def bloquear_recursos(driver, patrones=None):
+    """
+    Bloquea por CDP (Network.setBlockedURLs) las peticiones que no hacen falta para la tabla
 
-        print("Abriendo Edge...")
+    Args:
+        driver: WebDriver de Edge o Chrome
+        patrones (list): Patrones de URL con comodines; por defecto PATRONES_BLOQUEADOS
 
-        try:
-            # Configurar el servicio de Edge para redirigir logs
-            log_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "edge_driver.log")
-            edge_service = EdgeService(log_output=log_path)
-            
-            # Opciones adicionales para silenciar mensajes
-            edge_options.add_argument("--disable-logging")
-            edge_options.add_argument("--log-level=3")  # FATAL = 3
-            edge_options.add_argument("--silent")
-            
-            
-            driver = webdriver.Edge(options=edge_options, service=edge_service)
-        except Exception as e:
-            if "user data directory is already in use" in str(e) or "crashed" in str(e):
-                print("El perfil de usuario está en uso. Intentando cerrar instancias de Edge...")
-                if cerrar_procesos_edge():
-                    print("Intentando abrir Edge nuevamente después de cerrar procesos...")
-                    time.sleep(0.5)
-                    driver = webdriver.Edge(options=edge_options, service=edge_service)
-                else:
-                    print("No se pudo liberar el perfil de usuario.")
-                    return None
-            else:
-                print(f"Error al iniciar Edge: {e}")
-                return None
+    Returns:
+        bool: True si se aplicó el bloqueo
+    """
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patrones or PATRONES_BLOQUEADOS)})
+        return True
+    except Exception as e:
+        log.warning(f"No se pudieron bloquear los recursos innecesarios: {e}")
+        return False
+
+
+def navegar_a_codigo(driver, slir_code):
+    """
+    Lleva un navegador ya abierto a la página del código SLIR indicado
 
-        # Construir la URL completa con el código SLIR y navegar a ella
-        full_url = f"{BASE_URL}?code={slir_code}"
+    Returns:
+        float: Tiempo de navegación en segundos
+    """
+    # Construir la URL completa con el código SLIR y navegar a ella
+    full_url = f"{BASE_URL}?code={slir_code}"
+    inicio = datetime.datetime.now()
+    with span("navegacion"):
         driver.get(full_url)
+    log.debug(f"Ya estamos en: {full_url}")
+    return (datetime.datetime.now() - inicio).total_seconds()
+
+
+def login_requerido(driver):
+    """
+    Comprueba, sin esperas, si la página muestra el botón de Login
+
+    Solo usa el selector por texto: los selectores por clase de manejar_login
+    pueden coincidir con otros botones una vez dentro de la aplicación.
+    """
+    try:
+        return bool(driver.find_elements(By.XPATH, "//button[contains(@class, 'p-button') and normalize-space(.)='Login']"))
+    except Exception:
+        return False
+
+
+def sesion_iniciada(driver):
+    """Comprueba, sin esperas, que se ve la aplicación autenticada (SELECTOR_AUTENTICADO y sin Login)"""
+    try:
+        return bool(driver.find_elements(By.CSS_SELECTOR, SELECTOR_AUTENTICADO)) and not login_requerido(driver)
+    except Exception:
+        return False
+
+
+def completar_login(driver, sesion_guardada=None, inyectada=False):
+    """
+    Hace login si la aplicación lo pide y mantiene al día la sesión guardada
+
+    Args:
+        driver: Navegador ya en una página de la aplicación
+        sesion_guardada (AlmacenSesion): Si se indica, tras un login (o si aún no hay
+                                         sesión guardada) se guarda la del navegador
+        inyectada (bool): Si se inyectó la sesión guardada antes de navegar
+
+    Returns:
+        str: "reutilizada" (bastó la sesión guardada), "activa" (el perfil ya tenía
+             sesión) o "login" (se hizo el login)
+    """
+    hubo_login = manejar_login(driver)
+    if sesion_guardada is None:
+        return "login" if hubo_login else "activa"
+
+    sesion_guardada.retirar(driver)
+    if not hubo_login:
+        if not inyectada and sesion_guardada.cargar() is None and sesion_iniciada(driver):
+            sesion_guardada.guardar(driver)
+        return "reutilizada" if inyectada else "activa"
+
+    if inyectada:
+        log.warning("La sesión guardada ya no era válida en el servidor; se ha iniciado sesión de nuevo.")
+    if driver.current_url.startswith(APP_ORIGIN) and not login_requerido(driver):
+        sesion_guardada.guardar(driver)
+    return "login"
+
+
+def open_page(slir_code, cerrar_previo=True, mantener_abierto=True, headless=True,
+              user_data_dir=None, log_path=None, metricas=None, capturar_red=False, ligero=False,
+              sesion_guardada=None):
+    """
+    Abre Edge con el perfil del usuario y navega a la URL con el código SLIR proporcionado
+
+    Args:
+        slir_code (str): Código SLIR (ej: "SLIR1ST230476")
+        cerrar_previo, mantener_abierto, headless, user_data_dir, log_path, capturar_red, ligero:
+            ver iniciar_navegador
+        metricas (dict): Si se indica, se rellena con tiempo_arranque, tiempo_navegacion,
+                         tiempo_carga y tiempo_login (segundos) y login (ver completar_login)
+        sesion_guardada (AlmacenSesion): Sesión cifrada en disco que se inyecta antes de
+                                         navegar para no repetir el login (ver sesion_guardada.py)
+
+    Returns:
+        tuple: (webdriver.Edge, float) - Instancia del navegador Edge y tiempo de carga en segundos,
+               o (None, 0) si falla.
+    """
+    # Iniciar cronómetro de apertura del navegador
+    tiempo_inicio_navegador = datetime.datetime.now()
+    try:
+        driver = iniciar_navegador(cerrar_previo, mantener_abierto, headless, user_data_dir, log_path,
+                                   capturar_red=capturar_red, ligero=ligero)
+        if not driver:
+            return None, 0
+        tiempo_arranque = (datetime.datetime.now() - tiempo_inicio_navegador).total_seconds()
+
+        inyectada = sesion_guardada.inyectar(driver) if sesion_guardada is not None else False
+        tiempo_navegacion = navegar_a_codigo(driver, slir_code)
 
         # Calcular tiempo de carga
         tiempo_fin_navegador = datetime.datetime.now()
         tiempo_carga_navegador = (tiempo_fin_navegador - tiempo_inicio_navegador).total_seconds()
 
-        print(f"Ya estamos en: {full_url}")
-        print(f"Tiempo de carga del navegador: {tiempo_carga_navegador:.2f} segundos")
+        log.debug(f"Tiempo de carga del navegador: {tiempo_carga_navegador:.2f} segundos")
 
         # Utilizar la función específica para manejar el login
+        inicio_login = datetime.datetime.now()
+        estado_login = None
         try:
-            manejar_login(driver)
+            with span("login"):
+                estado_login = completar_login(driver, sesion_guardada, inyectada)
         except Exception as e:
-            print(f"Error al manejar login, pero continuamos: {e}")
+            log.warning(f"Error al manejar login, pero continuamos: {e}")
             # No interrumpimos la ejecución por un error en el login
+        tiempo_login = (datetime.datetime.now() - inicio_login).total_seconds()
+
+        if metricas is not None:
+            metricas.update({
+                "tiempo_arranque": tiempo_arranque,
+                "tiempo_navegacion": tiempo_navegacion,
+                "tiempo_carga": tiempo_carga_navegador,
+                "tiempo_login": tiempo_login,
+                "login": estado_login,
+            })
 
         return driver, tiempo_carga_navegador
 
     except Exception as e:
-        print(f"Error durante la automatización: {e}")
+        log.warning(f"Error durante la automatización: {e}")
         return None, 0
 
 
@@ -192,6 +427,7 @@ def open_page(slir_code, cerrar_previo=True, mantener_abierto=True, headless=Tru
 
 # Ejemplo de uso si este script se ejecuta directamente
 if __name__ == "__main__":
+    configurar_logs("info")
     print("Iniciando proceso de apertura de la pagina...")
     tiempo_inicio_total = datetime.datetime.now()
 
@@ -0,0 +1,230 @@
+import time
+
+from selenium.webdriver.common.by import By
+
+from bitacora import obtener_logger
+from esperas import esperar_cambio_pagina, esperar_hasta, huella_pagina
+from politicas import POLITICA_POR_DEFECTO
+
+log = obtener_logger(__name__)
+
+
+# Desplegable de filas por página del paginador de PrimeNG (p-dropdown hasta v16, p-select desde v17)
+SELECTOR_DESPLEGABLE_FILAS = ".p-paginator .p-dropdown, .p-paginator .p-select, .p-paginator-rpp-options"
+SELECTOR_OPCIONES_FILAS = "li.p-dropdown-item, li.p-select-option, .p-dropdown-items li, [role='listbox'] [role='option']"
+# Clics de margen sobre la distancia a la página pedida antes de darla por inalcanzable
+MARGEN_TRANSICIONES = 10
+# Lecturas del paginador cuando no se ve (p. ej. mientras la tabla se repinta) y pausa entre ellas
+LECTURAS_PAGINADOR = 3
+PAUSA_LECTURA_PAGINADOR = 0.5
+
+# Estado del paginador en una sola llamada: página activa, páginas visibles y si hay siguiente
+SCRIPT_ESTADO_PAGINADOR = """
+const paginador = document.querySelector('.p-paginator');
+if (!paginador) return null;
+const activo = paginador.querySelector(".p-highlight[aria-label], [aria-current='page']");
+const visibles = Array.from(paginador.querySelectorAll('button[aria-label]'))
+    .map(b => b.getAttribute('aria-label'))
+    .filter(t => /^\\d+$/.test(t))
+    .map(Number);
+const siguiente = paginador.querySelector('button.p-paginator-next');
+const siguienteActivo = !!siguiente && !siguiente.disabled && !siguiente.classList.contains('p-disabled');
+const texto = (paginador.querySelector('.p-paginator-current') || {}).innerText || '';
+const actual = activo ? Number(activo.getAttribute('aria-label') || activo.innerText.trim()) : null;
+return {actual: actual, visibles: visibles, hay_siguiente: siguienteActivo, boton_siguiente: !!siguiente,
+        texto: texto};
+"""
+
+# Devuelve el botón a pulsar para acercarse a la página pedida: el de esa página si
+# está visible, si no el visible más cercano en esa dirección, y como último recurso
+# Siguiente/Anterior
+SCRIPT_BOTON_HACIA_PAGINA = """
+const objetivo = arguments[0];
+const paginador = document.querySelector('.p-paginator');
+if (!paginador) return null;
+const activo = paginador.querySelector(".p-highlight[aria-label], [aria-current='page']");
+const actual = activo ? Number(activo.getAttribute('aria-label') || activo.innerText.trim()) : null;
+const botones = Array.from(paginador.querySelectorAll('button[aria-label]'))
+    .filter(b => /^\\d+$/.test(b.getAttribute('aria-label')));
+const exacto = botones.find(b => Number(b.getAttribute('aria-label')) === objetivo);
+if (exacto) return exacto;
+const habilitado = b => b && !b.disabled && !b.classList.contains('p-disabled');
+if (actual !== null) {
+    const candidatos = botones
+        .map(b => [Number(b.getAttribute('aria-label')), b])
+        .filter(([n, b]) => objetivo > actual ? n > actual && n < objetivo : n < actual && n > objetivo)
+        .sort((a, b) => Math.abs(objetivo - a[0]) - Math.abs(objetivo - b[0]));
+    if (candidatos.length) return candidatos[0][1];
+}
+const flecha = paginador.querySelector(
+    actual !== null && objetivo < actual ? 'button.p-paginator-prev' : 'button.p-paginator-next');
+return habilitado(flecha) ? flecha : null;
+"""
+
+
+def estado_paginador(driver):
+    """
+    Lee el estado del paginador en una sola llamada
+
+    Returns:
+        dict: {"actual": int o None, "visibles": [int], "hay_siguiente": bool,
+               "boton_siguiente": bool, "texto": str}, o None si no hay paginador
+    """
+    return driver.execute_script(SCRIPT_ESTADO_PAGINADOR)
+
+
+def hay_varias_paginas(estado):
+    """Si una lectura del paginador (SCRIPT_ESTADO_PAGINADOR) tiene Siguiente habilitado"""
+    return bool(estado and estado.get("hay_siguiente"))
+
+
+def maximizar_filas_por_pagina(driver, wait_time=None, politica=None):
+    """
+    Sube el desplegable de filas por página del paginador a su valor máximo
+
+    Si la tabla ya cabe en una página (sin botón Siguiente o deshabilitado) no se toca:
+    la huella no cambiaría y la espera se agotaría en cada código pequeño.
+
+    Args:
+        driver: WebDriver de Selenium
+        wait_time: Tiempo máximo de espera en segundos; por defecto el adaptativo de
+                   la política (ver politicas.py)
+        politica (Politica): Política del tiempo adaptativo; por defecto POLITICA_POR_DEFECTO
+
+    Returns:
+        int: Filas por página seleccionadas, o None si no hay desplegable o no se pudo cambiar
+    """
+    wait_time = wait_time or (politica or POLITICA_POR_DEFECTO).timeout("cambio_pagina")
+    try:
+        desplegables = driver.find_elements(By.CSS_SELECTOR, SELECTOR_DESPLEGABLE_FILAS)
+        if not desplegables:
+            log.warning("El paginador no tiene selector de filas por página.")
+            return None
+        desplegable = desplegables[0]
+
+        actual_texto = desplegable.text.strip()
+        if not hay_varias_paginas(estado_paginador(driver)):
+            # Cambiar el tamaño no cambiaría la huella y se esperaría el timeout entero
+            log.debug("La tabla cabe en una página: no se cambian las filas por página.")
+            return int(actual_texto) if actual_texto.isdigit() else None
+        huella_anterior = huella_pagina(driver)
+
+        # Abrir el desplegable y leer sus opciones
+        driver.execute_script("arguments[0].click();", desplegable)
+        opciones = esperar_hasta(driver, wait_time,
+                                 lambda d: d.find_elements(By.CSS_SELECTOR, SELECTOR_OPCIONES_FILAS))
+        valores = []
+        for opcion in opciones:
+            texto = opcion.text.strip()
+            if texto.isdigit():
+                valores.append((int(texto), opcion))
+
+        if not valores:
+            log.warning("No se encontraron opciones numéricas de filas por página.")
+            return None
+
+        maximo, opcion_maxima = max(valores, key=lambda v: v[0])
+        if actual_texto == str(maximo):
+            # Ya estaba en el máximo: cerrar el desplegable sin cambiar nada
+            driver.execute_script("arguments[0].click();", desplegable)
+            return maximo
+
+        log.debug(f"Cambiando filas por página de {actual_texto or '?'} a {maximo}...")
+        driver.execute_script("arguments[0].click();", opcion_maxima)
+        if esperar_cambio_pagina(driver, huella_anterior, wait_time) is None:
+            log.warning("La tabla no se actualizó tras cambiar las filas por página.")
+        return maximo
+
+    except Exception as e:
+        log.warning(f"No se pudo cambiar el número de filas por página: {e}")
+        return None
+
+
+def limite_transiciones(numero, actual=None):
+    """Clics máximos para ir de la página actual (1 si no se conoce) a la página numero"""
+    return abs(numero - (actual or 1)) + MARGEN_TRANSICIONES
+
+
+def ir_a_pagina(driver, numero, wait_time=None, max_transiciones=None, politica=None):
+    """
+    Lleva la tabla a la página indicada pulsando directamente su botón
+
+    Si el botón de esa página no está visible (el paginador solo muestra unas pocas),
+    salta al botón visible más cercano y repite; Siguiente/Anterior solo se usan
+    cuando no hay otro botón útil.
+
+    Args:
+        driver: WebDriver de Selenium
+        numero (int): Página destino (empezando en 1)
+        wait_time: Tiempo máximo de espera por transición en segundos; por defecto el
+                   adaptativo de la política (ver politicas.py)
+        max_transiciones (int): Límite de clics para no quedarse en bucle; por defecto la
+                                distancia a la página pedida más MARGEN_TRANSICIONES
+                                (ver limite_transiciones)
+        politica (Politica): Política del tiempo adaptativo; por defecto POLITICA_POR_DEFECTO
+
+    Returns:
+        int: Número de transiciones realizadas, o None si no se pudo llegar
+    """
+    wait_time = wait_time or (politica or POLITICA_POR_DEFECTO).timeout("cambio_pagina")
+    transiciones = 0
+    while max_transiciones is None or transiciones < max_transiciones:
+        estado = estado_paginador(driver)
+        if max_transiciones is None:
+            max_transiciones = limite_transiciones(numero, (estado or {}).get("actual"))
+        if estado and estado.get("actual") == numero:
+            return transiciones
+
+        boton = driver.execute_script(SCRIPT_BOTON_HACIA_PAGINA, numero)
+        if boton is None:
+            log.warning(f"No hay ningún botón para avanzar hacia la página {numero}.")
+            return None
+
+        huella_anterior = huella_pagina(driver)
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center'}); arguments[0].click();", boton)
+        if esperar_cambio_pagina(driver, huella_anterior, wait_time) is None:
+            log.warning(f"La tabla no cambió de página en {wait_time} segundos.")
+            return None
+        transiciones += 1
+
+        # Sin página activa detectable no se puede comprobar más: se da por buena
+        if not estado or estado.get("actual") is None:
+            return transiciones
+
+    log.warning(f"No se llegó a la página {numero} tras {max_transiciones} transiciones.")
+    return None
+
+
+def ultima_pagina_segun(estado):
+    """
+    Interpreta una lectura del paginador (SCRIPT_ESTADO_PAGINADOR)
+
+    Returns:
+        bool: True si el paginador está y su botón Siguiente está deshabilitado, False si
+              Siguiente está habilitado, o None si no se ve el paginador o el botón (no se
+              sabe: puede estar repintándose)
+    """
+    if not estado or not estado.get("boton_siguiente"):
+        return None
+    return not estado.get("hay_siguiente")
+
+
+def es_ultima_pagina(driver, lecturas=LECTURAS_PAGINADOR, pausa=PAUSA_LECTURA_PAGINADOR):
+    """
+    Comprueba en el paginador que la página mostrada es la última
+
+    Un paginador ausente no se toma por la última página: se vuelve a leer hasta
+    lecturas veces por si la tabla se estaba repintando.
+
+    Returns:
+        bool: True solo si el paginador está y Siguiente está deshabilitado, False si hay
+              página siguiente, o None si no se pudo leer el paginador
+    """
+    for lectura in range(lecturas):
+        ultima = ultima_pagina_segun(estado_paginador(driver))
+        if ultima is not None:
+            return ultima
+        if lectura < lecturas - 1:
+            time.sleep(pausa)
+    log.warning("No se encuentra el paginador; no se puede verificar si es la última página.")
+    return None
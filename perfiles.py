@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+
+from bitacora import obtener_logger
+from open_page import EDGE_USER_DATA_DIR
+
+log = obtener_logger(__name__)
+
+
+# Carpeta donde se guardan las copias de perfil de cada worker
+PERFILES_WORKERS_DIR = os.path.join(tempfile.gettempdir(), "slir_perfiles")
+
+# Contenido del perfil que no hace falta para mantener la sesión y solo ocupa disco
+IGNORAR_EN_COPIA = shutil.ignore_patterns(
+    "Cache", "Code Cache", "GPUCache", "ShaderCache", "GrShaderCache", "DawnCache",
+    "Service Worker", "Crashpad", "BrowserMetrics*", "component_crx_cache",
+    "optimization_guide*", "Safe Browsing*", "*.log", "*.tmp",
+    "Singleton*", "lockfile",
+)
+
+# Lo único que necesita un perfil mínimo para mantener la sesión: la clave con la que
+# Edge cifra las cookies (Local State), las cookies y el almacenamiento local de la
+# aplicación (tokens de MSAL)
+CONTENIDO_PERFIL_MINIMO = (
+    "Local State",
+    os.path.join("Default", "Network", "Cookies"),
+    os.path.join("Default", "Network", "Cookies-journal"),
+    os.path.join("Default", "Cookies"),
+    os.path.join("Default", "Cookies-journal"),
+    os.path.join("Default", "Local Storage"),
+)
+
+
+def _copiar_tolerante(origen, destino):
+    """Copia un fichero ignorando los que Edge tiene bloqueados"""
+    try:
+        shutil.copy2(origen, destino)
+    except OSError:
+        pass
+
+
+def copiar_perfil(destino, origen=None, refrescar=False):
+    """
+    Crea una copia del perfil de Edge para que un navegador la use en exclusiva
+
+    Args:
+        destino (str): Carpeta donde crear la copia
+        origen (str): Perfil original; por defecto EDGE_USER_DATA_DIR
+        refrescar (bool): Si True, vuelve a copiar aunque la carpeta ya exista
+
+    Returns:
+        str: Ruta de la copia
+    """
+    origen = origen or EDGE_USER_DATA_DIR
+
+    if os.path.isdir(destino) and not refrescar:
+        return destino
+
+    if os.path.isdir(destino):
+        shutil.rmtree(destino, ignore_errors=True)
+
+    log.info(f"Copiando perfil de Edge en {destino}...")
+    shutil.copytree(origen, destino, ignore=IGNORAR_EN_COPIA,
+                    copy_function=_copiar_tolerante, dirs_exist_ok=True)
+    return destino
+
+
+def copiar_perfil_minimo(destino, origen=None, refrescar=False):
+    """
+    Crea un perfil con solo lo necesario para la sesión (ver CONTENIDO_PERFIL_MINIMO)
+
+    Sin extensiones, historial ni caché, el navegador arranca antes y pesa menos
+    copiarlo por worker.
+
+    Args:
+        destino (str): Carpeta donde crear el perfil
+        origen (str): Perfil original; por defecto EDGE_USER_DATA_DIR
+        refrescar (bool): Si True, vuelve a copiar aunque la carpeta ya exista
+
+    Returns:
+        str: Ruta del perfil mínimo
+    """
+    origen = origen or EDGE_USER_DATA_DIR
+
+    if os.path.isdir(destino) and not refrescar:
+        return destino
+
+    if os.path.isdir(destino):
+        shutil.rmtree(destino, ignore_errors=True)
+
+    log.info(f"Copiando perfil mínimo de Edge en {destino}...")
+    os.makedirs(destino, exist_ok=True)
+    for relativa in CONTENIDO_PERFIL_MINIMO:
+        ruta_origen = os.path.join(origen, relativa)
+        ruta_destino = os.path.join(destino, relativa)
+        if os.path.isdir(ruta_origen):
+            # Sin IGNORAR_EN_COPIA: los *.log de LevelDB guardan las últimas escrituras
+            shutil.copytree(ruta_origen, ruta_destino, ignore=shutil.ignore_patterns("LOCK"),
+                            copy_function=_copiar_tolerante, dirs_exist_ok=True)
+        elif os.path.isfile(ruta_origen):
+            os.makedirs(os.path.dirname(ruta_destino), exist_ok=True)
+            _copiar_tolerante(ruta_origen, ruta_destino)
+    return destino
+
+
+def preparar_perfiles_workers(num_workers, base_dir=None, origen=None, refrescar=False, minimo=False):
+    """
+    Prepara una copia del perfil por worker (worker_0, worker_1, ...)
+
+    Args:
+        minimo (bool): Si True, copia solo lo necesario para la sesión (worker_0_min, ...)
+
+    Returns:
+        list: Rutas de las carpetas de perfil, una por worker
+    """
+    base_dir = base_dir or PERFILES_WORKERS_DIR
+    os.makedirs(base_dir, exist_ok=True)
+    if minimo:
+        return [
+            copiar_perfil_minimo(os.path.join(base_dir, f"worker_{i}_min"), origen=origen, refrescar=refrescar)
+            for i in range(num_workers)
+        ]
+    return [
+        copiar_perfil(os.path.join(base_dir, f"worker_{i}"), origen=origen, refrescar=refrescar)
+        for i in range(num_workers)
+    ]
@@ -0,0 +1,231 @@
+"""
+Planificación de lotes: prioridades, códigos pequeños primero y límite de tasa por host
+
+- ColaPrioridad ordena los códigos por clase de prioridad ("urgente", "normal",
+  "baja") y, dentro de cada clase, por el número de páginas conocido en la caché
+  (el último get_total_pages guardado en CacheSlir): los SLIR pequeños salen antes
+  y la latencia mediana baja. Los códigos sin páginas conocidas se estiman con la
+  mediana de los conocidos.
+- LimitadorTasa es un cubo de tokens por host y tipo de acción ("navegacion" para
+  cada driver.get de un código, "clic" para cada cambio de página). Se comparte entre
+  todos los workers, así que el lote usa toda la concurrencia disponible sin superar
+  la tasa pactada con str.apps.valeo.com. Se conecta a la extracción a través de la
+  Politica (Politica(limitador=...)).
+
+Uso:
+    limitador = LimitadorTasa(navegaciones_por_segundo=0.5, clics_por_segundo=2)
+    ejecutar_lote(codigos, prioridades={"SLIR1ST230476": "urgente"}, cache=cache,
+                  politica=Politica(limitador=limitador))
+"""
+import heapq
+import itertools
+import statistics
+import threading
+import time
+from urllib.parse import urlparse
+
+import open_page
+
+# Clases de prioridad: las de menor valor salen antes
+PRIORIDADES = {"urgente": 0, "normal": 1, "baja": 2}
+PRIORIDAD_POR_DEFECTO = "normal"
+
+
+class CuboTokens:
+    """Cubo de tokens: admite ráfagas de hasta capacidad acciones y tasa acciones por segundo sostenidas"""
+
+    def __init__(self, tasa, capacidad=None):
+        self.tasa = tasa
+        self.capacidad = capacidad if capacidad is not None else max(1.0, tasa)
+        self._tokens = self.capacidad
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reservar(self, n):
+        """Descuenta n tokens (pueden quedar en negativo) y devuelve los segundos que hay que esperar"""
+        with self._lock:
+            ahora = time.monotonic()
+            self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+            self._ultimo = ahora
+            self._tokens -= n
+            return -self._tokens / self.tasa if self._tokens < 0 else 0.0
+
+    def tomar(self, n=1):
+        """
+        Espera hasta que haya n tokens y los consume
+
+        La reserva se hace antes de dormir, de modo que los hilos que esperan a la vez
+        quedan escalonados en lugar de despertar todos juntos.
+
+        Returns:
+            float: Segundos esperados
+        """
+        espera = self._reservar(n)
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+
+
+class LimitadorTasa:
+    """
+    Límite de tasa por host para navegaciones y clics, compartido entre workers
+
+    Attributes:
+        tasas (dict): {tipo: (acciones por segundo, ráfaga)}
+    """
+
+    def __init__(self, navegaciones_por_segundo=0.5, clics_por_segundo=2.0, rafaga_navegaciones=2,
+                 rafaga_clics=4):
+        """
+        Args:
+            navegaciones_por_segundo (float): Códigos abiertos por segundo en cada host
+            clics_por_segundo (float): Cambios de página por segundo en cada host
+            rafaga_navegaciones (int): Navegaciones seguidas permitidas sin esperar
+            rafaga_clics (int): Cambios de página seguidos permitidos sin esperar
+        """
+        self.tasas = {
+            "navegacion": (navegaciones_por_segundo, rafaga_navegaciones),
+            "clic": (clics_por_segundo, rafaga_clics),
+        }
+        self._cubos = {}
+        self._esperas = {}
+        self._lock = threading.Lock()
+
+    def _cubo(self, host, tipo):
+        with self._lock:
+            clave = (host, tipo)
+            if clave not in self._cubos:
+                tasa, rafaga = self.tasas[tipo]
+                self._cubos[clave] = CuboTokens(tasa, rafaga)
+                self._esperas[clave] = [0, 0, 0.0]
+            return self._cubos[clave], self._esperas[clave]
+
+    def esperar(self, tipo, host=None):
+        """
+        Bloquea hasta que la acción cabe en la tasa del host
+
+        Args:
+            tipo (str): "navegacion" o "clic"
+            host (str): Host de destino; por defecto el de open_page.BASE_URL
+
+        Returns:
+            float: Segundos esperados
+        """
+        if tipo not in self.tasas:
+            return 0.0
+        host = host or urlparse(open_page.BASE_URL).netloc
+        cubo, esperas = self._cubo(host, tipo)
+        espera = cubo.tomar()
+        with self._lock:
+            esperas[0] += 1
+            if espera > 0:
+                esperas[1] += 1
+                esperas[2] += espera
+        return espera
+
+    def metricas(self):
+        """Acciones, veces que hubo que esperar y segundos esperados por host y tipo"""
+        with self._lock:
+            return {
+                f"{host}/{tipo}": {
+                    "acciones": acciones,
+                    "esperas": esperas,
+                    "segundos_esperados": round(segundos, 2),
+                }
+                for (host, tipo), (acciones, esperas, segundos) in self._esperas.items()
+            }
+
+
+def paginas_conocidas(codigos, cache=None):
+    """
+    Páginas de cada código según la caché (el último total de get_total_pages)
+
+    Returns:
+        dict: {code: total de páginas} solo de los códigos que están en la caché
+    """
+    if cache is None:
+        return {}
+    paginas = {}
+    for code in codigos:
+        entrada = cache.obtener(code)
+        if entrada and entrada.get("total_paginas"):
+            paginas[code] = entrada["total_paginas"]
+    return paginas
+
+
+class ColaPrioridad:
+    """
+    Cola de códigos por prioridad y tamaño estimado (los pequeños primero)
+
+    A igualdad de prioridad y tamaño se respeta el orden de llegada. Los reintentos
+    conservan la prioridad del código. No es segura entre hilos: la usa el hilo que
+    reparte los códigos (ver ejecutar_lote).
+    """
+
+    def __init__(self, prioridades=None, paginas=None):
+        """
+        Args:
+            prioridades (dict): {code: "urgente" | "normal" | "baja"}; el resto, normal
+            paginas (dict): {code: páginas conocidas} (ver paginas_conocidas)
+        """
+        self.prioridades = prioridades or {}
+        self.paginas = paginas or {}
+        self._estimacion = statistics.median(self.paginas.values()) if self.paginas else 0
+        self._heap = []
+        self._orden = itertools.count()
+
+    def _clave(self, code):
+        clase = self.prioridades.get(code, PRIORIDAD_POR_DEFECTO)
+        if clase not in PRIORIDADES:
+            raise ValueError(f"Prioridad desconocida para {code}: {clase}")
+        return PRIORIDADES[clase], self.paginas.get(code, self._estimacion)
+
+    def append(self, tarea):
+        """Añade (code, intento)"""
+        heapq.heappush(self._heap, (*self._clave(tarea[0]), next(self._orden), tarea))
+
+    def popleft(self):
+        """Saca el siguiente (code, intento)"""
+        return heapq.heappop(self._heap)[-1]
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
+
+
+def leer_prioridades(origen):
+    """
+    Lee códigos con prioridad opcional: "SLIR1ST230476 urgente" (o separado por coma)
+
+    Se ignoran líneas vacías, comentarios (#) y códigos repetidos.
+
+    Args:
+        origen: Ruta de fichero o iterable de líneas
+
+    Returns:
+        tuple: (lista de códigos en el orden original, {code: prioridad} de los que la indican)
+    """
+    if isinstance(origen, str):
+        with open(origen, encoding="utf-8-sig") as f:
+            lineas = f.readlines()
+    else:
+        lineas = origen
+
+    codigos = []
+    vistos = set()
+    prioridades = {}
+    for linea in lineas:
+        partes = linea.replace(",", " ").split()
+        if not partes or partes[0].startswith("#") or partes[0] in vistos:
+            continue
+        code = partes[0]
+        vistos.add(code)
+        codigos.append(code)
+        if len(partes) > 1:
+            clase = partes[1].lower()
+            if clase not in PRIORIDADES:
+                raise ValueError(f"Prioridad desconocida para {code}: {partes[1]}")
+            prioridades[code] = clase
+    return codigos, prioridades
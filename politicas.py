@@ -0,0 +1,396 @@
+"""
+Política de reintentos, tiempos de espera y cortacircuitos de la extracción SLIR
+
+- Errores tipados: cada fallo se clasifica (tiempo agotado, paginación, página vacía,
+  navegador perdido, datos incompletos) y se sabe si tiene sentido reintentarlo.
+- Reintentos por página con espera exponencial y jitter, para que varios workers
+  no reintenten a la vez.
+- Tiempos de espera adaptativos: en lugar de 30/5/2 s fijos se usa un percentil de
+  las esperas observadas en el proceso (ver esperas.py), acotado entre un mínimo y
+  un máximo; cada reintento amplía el tiempo.
+- Cortacircuitos compartido por los workers: si fallan muchas operaciones seguidas
+  el lote se ralentiza y, si el backend sigue degradado, se pausa antes de continuar.
+
+Uso:
+    politica = Politica(cortacircuitos=Cortacircuitos())
+    process_slir_code(code, politica=politica)
+"""
+import asyncio
+import itertools
+import random
+import threading
+import time
+from collections import deque
+
+from selenium.common.exceptions import (InvalidSessionIdException, NoSuchWindowException,
+                                        StaleElementReferenceException, TimeoutException,
+                                        WebDriverException)
+
+from bitacora import obtener_logger
+from esperas import percentil_espera
+from instrumentacion import span
+
+log = obtener_logger(__name__)
+
+
+# Tiempos de espera por punto de espera (ver medir_espera): (por defecto, mínimo, máximo)
+TIMEOUTS = {
+    "tabla_cargada": (30, 5, 60),
+    "cambio_pagina": (5, 2, 30),
+    "paginador": (5, 2, 20),
+}
+# Esperas observadas necesarias antes de adaptar un tiempo de espera
+MUESTRAS_MINIMAS = 20
+# Mensajes de CDP que indican que se cerró la conexión con el navegador o la pestaña
+TEXTOS_CDP_NAVEGADOR_PERDIDO = ("conexión con devtools cerrada", "target closed",
+                                "no target with given id", "session with given id not found")
+
+
+class ErrorExtraccion(Exception):
+    """
+    Fallo de la extracción de un código SLIR
+
+    Attributes:
+        reintentable (bool): Si tiene sentido repetir la operación con el mismo navegador
+        pagina (int): Página en la que ocurrió, si se conoce
+    """
+
+    reintentable = True
+
+    def __init__(self, mensaje, pagina=None, causa=None):
+        super().__init__(mensaje)
+        self.pagina = pagina
+        self.causa = causa
+
+
+class ErrorTiempoAgotado(ErrorExtraccion):
+    """La tabla o el paginador no respondieron dentro del tiempo de espera"""
+
+
+class ErrorPaginacion(ErrorExtraccion):
+    """No se pudo llevar la tabla a la página pedida"""
+
+
+class ErrorPaginaVacia(ErrorExtraccion):
+    """Una página intermedia llegó sin filas (normalmente una respuesta lenta o cortada)"""
+
+
+class ErrorNavegador(ErrorExtraccion):
+    """El navegador o la sesión WebDriver se perdieron; hace falta otro navegador"""
+
+    reintentable = False
+
+
+class DatosIncompletos(ErrorExtraccion):
+    """La extracción terminó sin verificar la última página: el fichero está truncado"""
+
+    reintentable = False
+
+
+class ErrorCdp(Exception):
+    """Error devuelto por el navegador a un comando CDP o al evaluar un script (ver motor_cdp.py)"""
+
+
+def clasificar_error(error, pagina=None):
+    """
+    Convierte una excepción de Selenium o de CDP (o cualquier otra) en un ErrorExtraccion
+
+    Returns:
+        ErrorExtraccion: El propio error si ya estaba tipado
+    """
+    if isinstance(error, ErrorExtraccion):
+        return error
+    if isinstance(error, TimeoutException):
+        return ErrorTiempoAgotado(f"Tiempo de espera agotado: {error.msg or error}", pagina, error)
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException)):
+        return ErrorNavegador(f"Se perdió el navegador: {error}", pagina, error)
+    if isinstance(error, StaleElementReferenceException):
+        return ErrorPaginacion(f"La tabla cambió mientras se leía: {error}", pagina, error)
+    if isinstance(error, WebDriverException):
+        texto = str(error).lower()
+        if any(t in texto for t in ("disconnected", "invalid session", "no such window", "not reachable")):
+            return ErrorNavegador(f"Se perdió el navegador: {error}", pagina, error)
+    if isinstance(error, ErrorCdp):
+        texto = str(error).lower()
+        if any(t in texto for t in TEXTOS_CDP_NAVEGADOR_PERDIDO):
+            return ErrorNavegador(f"Se perdió el navegador: {error}", pagina, error)
+    return ErrorExtraccion(f"{type(error).__name__}: {error}", pagina, error)
+
+
+class Cortacircuitos:
+    """
+    Frena el lote cuando el backend se degrada
+
+    Guarda el resultado de las últimas operaciones de todos los workers. Con una
+    proporción de fallos por encima de umbral_lento añade una pausa antes de cada
+    operación (proporcional a los fallos); por encima de umbral_abierto se abre y
+    nadie continúa hasta pasada la pausa. Tras la pausa pasa una sola operación de
+    prueba (semiabierto): si sale bien se cierra, si falla se vuelve a abrir con el
+    doble de pausa, y si no dice nada del backend (navegador perdido, interrupción)
+    se libera para que pase otra.
+
+    esperar_turno devuelve el turno de la operación admitida y registrar lo recibe:
+    solo el resultado de la operación de prueba decide el semiabierto; los de
+    operaciones que empezaron antes de abrirse el circuito van a la ventana normal.
+    """
+
+    def __init__(self, ventana=20, umbral_lento=0.2, umbral_abierto=0.5, pausa=15.0,
+                 pausa_maxima=300.0, retraso_maximo=5.0):
+        """
+        Args:
+            ventana (int): Operaciones recientes que se tienen en cuenta
+            umbral_lento (float): Proporción de fallos a partir de la que se ralentiza
+            umbral_abierto (float): Proporción de fallos a partir de la que se pausa
+            pausa (float): Segundos de la primera pausa
+            pausa_maxima (float): Límite de la pausa tras fallos repetidos
+            retraso_maximo (float): Pausa antes de cada operación con umbral_abierto
+        """
+        self.ventana = ventana
+        self.umbral_lento = umbral_lento
+        self.umbral_abierto = umbral_abierto
+        self.pausa_inicial = pausa
+        self.pausa_maxima = pausa_maxima
+        self.retraso_maximo = retraso_maximo
+        self._lock = threading.Lock()
+        self._resultados = deque(maxlen=ventana)
+        self.estado = "cerrado"
+        self._pausa = pausa
+        self._reabrir_en = 0.0
+        self._turnos = itertools.count(1)
+        self._prueba = None
+        self.aperturas = 0
+
+    def _proporcion_fallos(self):
+        if len(self._resultados) < max(5, self.ventana // 4):
+            return 0.0
+        return self._resultados.count(False) / len(self._resultados)
+
+    def esperar_turno(self):
+        """
+        Bloquea mientras el circuito está abierto y ralentiza si hay muchos fallos
+
+        Returns:
+            int: Turno de la operación admitida, para registrar y liberar_prueba
+        """
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                turno = next(self._turnos)
+                if self.estado == "abierto" and ahora >= self._reabrir_en:
+                    self.estado = "semiabierto"
+                if self.estado == "semiabierto" and self._prueba is None:
+                    self._prueba = turno
+                    return turno
+                if self.estado == "cerrado":
+                    fallos = self._proporcion_fallos()
+                    retraso = 0.0
+                    if fallos > self.umbral_lento:
+                        retraso = self.retraso_maximo * min(1.0, (fallos - self.umbral_lento)
+                                                            / (self.umbral_abierto - self.umbral_lento))
+                    break
+                espera = max(0.1, self._reabrir_en - ahora) if self.estado == "abierto" else 0.5
+            time.sleep(espera)
+        if retraso:
+            time.sleep(retraso)
+        return turno
+
+    def registrar(self, exito, turno=None):
+        """
+        Anota el resultado de una operación
+
+        Args:
+            exito (bool): Si la operación salió bien
+            turno (int): El que devolvió esperar_turno al admitirla
+        """
+        with self._lock:
+            if self.estado == "semiabierto" and turno is not None and turno == self._prueba:
+                self._prueba = None
+                if exito:
+                    log.info("[cortacircuitos] El backend responde de nuevo; se reanuda el lote.")
+                    self.estado = "cerrado"
+                    self._resultados.clear()
+                    self._pausa = self.pausa_inicial
+                else:
+                    self._pausa = min(self.pausa_maxima, self._pausa * 2)
+                    self._abrir()
+                return
+
+            self._resultados.append(bool(exito))
+            if self.estado == "cerrado" and self._proporcion_fallos() >= self.umbral_abierto:
+                self._abrir()
+
+    def liberar_prueba(self, turno):
+        """Si el turno es el de la operación de prueba, la libera sin anotar su resultado"""
+        with self._lock:
+            if self.estado == "semiabierto" and turno == self._prueba:
+                self._prueba = None
+
+    def _abrir(self):
+        self.estado = "abierto"
+        self.aperturas += 1
+        self._reabrir_en = time.monotonic() + self._pausa
+        log.warning(f"[cortacircuitos] Demasiados fallos seguidos; se pausa el lote {self._pausa:.0f} s.")
+
+    def metricas(self):
+        with self._lock:
+            return {
+                "estado": self.estado,
+                "aperturas": self.aperturas,
+                "proporcion_fallos": round(self._proporcion_fallos(), 3),
+            }
+
+
+class Politica:
+    """
+    Reintentos con jitter, tiempos de espera adaptativos y cortacircuitos opcional
+
+    No guarda estado del código en curso, así que una misma política se puede
+    compartir entre workers (el cortacircuitos es común a todos).
+    """
+
+    def __init__(self, max_intentos=3, espera_base=0.5, espera_maxima=10.0, adaptativa=True,
+                 percentil=95, factor=3.0, cortacircuitos=None, permitir_incompletos=False,
+                 limitador=None):
+        """
+        Args:
+            max_intentos (int): Intentos por operación (página, cambio de página)
+            espera_base (float): Segundos de la primera espera entre intentos
+            espera_maxima (float): Límite de la espera entre intentos
+            adaptativa (bool): Si False, se usan siempre los tiempos de espera por defecto
+            percentil (int): Percentil de las esperas observadas que se toma como referencia
+            factor (float): Margen sobre ese percentil
+            cortacircuitos (Cortacircuitos): Si se indica, cada operación pasa por él
+            permitir_incompletos (bool): Si True, una extracción sin la última página
+                                         verificada se da por buena (comportamiento anterior)
+            limitador (LimitadorTasa): Si se indica, cada navegación a un código y cada
+                                       cambio de página esperan su turno (ver planificador.py)
+        """
+        self.max_intentos = max(1, max_intentos)
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.adaptativa = adaptativa
+        self.percentil = percentil
+        self.factor = factor
+        self.cortacircuitos = cortacircuitos
+        self.permitir_incompletos = permitir_incompletos
+        self.limitador = limitador
+
+    def limitar(self, tipo):
+        """Espera a que la acción ("navegacion" o "clic") quepa en el límite de tasa, si lo hay"""
+        if self.limitador is None:
+            return
+        with span("limite_tasa", tipo=tipo):
+            self.limitador.esperar(tipo)
+
+    def timeout(self, punto, intento=1):
+        """
+        Tiempo de espera para un punto de espera
+
+        Con suficientes esperas observadas es factor × percentil, acotado a su mínimo y
+        máximo; cada reintento lo multiplica por 1.5 (sin pasar del máximo).
+
+        Returns:
+            float: Segundos
+        """
+        por_defecto, minimo, maximo = TIMEOUTS.get(punto, (10, 2, 60))
+        valor = por_defecto
+        if self.adaptativa:
+            n, observado = percentil_espera(punto, self.percentil)
+            if n >= MUESTRAS_MINIMAS:
+                valor = min(maximo, max(minimo, observado * self.factor))
+        return round(min(maximo, valor * 1.5 ** (intento - 1)), 2)
+
+    def espera_reintento(self, intento):
+        """Espera exponencial con jitter completo antes del intento siguiente"""
+        return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** (intento - 1)))
+
+    def ejecutar(self, operacion, descripcion, pagina=None):
+        """
+        Ejecuta una operación con reintentos
+
+        Args:
+            operacion: Función que recibe el número de intento (para ampliar el tiempo de
+                       espera) y lanza una excepción si falla
+            descripcion (str): Qué se está haciendo, para los mensajes
+            pagina (int): Página afectada, si la hay
+
+        Returns:
+            El resultado de la operación
+
+        Raises:
+            ErrorExtraccion: Si falla con un error no reintentable o se agotan los intentos
+        """
+        for intento in range(1, self.max_intentos + 1):
+            turno = self.cortacircuitos.esperar_turno() if self.cortacircuitos is not None else None
+            try:
+                resultado = operacion(intento)
+            except Exception as e:
+                error = clasificar_error(e, pagina)
+            except BaseException:
+                if self.cortacircuitos is not None:
+                    self.cortacircuitos.liberar_prueba(turno)
+                raise
+            else:
+                if self.cortacircuitos is not None:
+                    self.cortacircuitos.registrar(True, turno)
+                return resultado
+
+            espera = self._anotar_fallo(error, intento, descripcion, turno)
+            with span("reintento", operacion=descripcion, pagina=pagina, error=type(error).__name__):
+                time.sleep(espera)
+
+    async def ejecutar_async(self, operacion, descripcion, pagina=None):
+        """
+        Igual que ejecutar, para operaciones asíncronas (motor CDP)
+
+        operacion(intento) es una corrutina; las esperas del cortacircuitos y entre
+        intentos no bloquean el bucle de eventos.
+        """
+        for intento in range(1, self.max_intentos + 1):
+            turno = None
+            if self.cortacircuitos is not None:
+                turno = await asyncio.to_thread(self.cortacircuitos.esperar_turno)
+            try:
+                resultado = await operacion(intento)
+            except Exception as e:
+                error = clasificar_error(e, pagina)
+            except BaseException:
+                if self.cortacircuitos is not None:
+                    self.cortacircuitos.liberar_prueba(turno)
+                raise
+            else:
+                if self.cortacircuitos is not None:
+                    self.cortacircuitos.registrar(True, turno)
+                return resultado
+
+            espera = self._anotar_fallo(error, intento, descripcion, turno)
+            with span("reintento", operacion=descripcion, pagina=pagina, error=type(error).__name__):
+                await asyncio.sleep(espera)
+
+    def _anotar_fallo(self, error, intento, descripcion, turno=None):
+        """
+        Pasa el fallo al cortacircuitos (con el turno de la operación) y decide si se reintenta
+
+        Returns:
+            float: Segundos de espera antes del intento siguiente
+
+        Raises:
+            ErrorExtraccion: El propio error si no es reintentable o era el último intento
+        """
+        if self.cortacircuitos is not None:
+            if isinstance(error, ErrorNavegador):
+                # Un navegador perdido no dice nada del backend: no cuenta como fallo,
+                # pero si era la operación de prueba hay que dejar pasar otra
+                self.cortacircuitos.liberar_prueba(turno)
+            else:
+                self.cortacircuitos.registrar(False, turno)
+        if not error.reintentable or intento == self.max_intentos:
+            raise error
+        espera = self.espera_reintento(intento)
+        log.warning(f"{descripcion}: {error} (intento {intento}/{self.max_intentos}); "
+                    f"se reintenta en {espera:.1f} s")
+        return espera
+
+
+# Política de process_slir_code cuando no se indica otra
+POLITICA_POR_DEFECTO = Politica()
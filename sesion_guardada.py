@@ -0,0 +1,319 @@
+"""
+Sesión de la aplicación SLIR guardada en disco (cifrada) para no repetir el login
+
+Tras un login se guardan las cookies del navegador (todas, incluidas las httpOnly y
+las del proveedor de identidad, leídas por CDP) y el localStorage/sessionStorage de
+la aplicación, donde MSAL guarda sus tokens. En un navegador nuevo las cookies se
+inyectan con Network.setCookies y el almacenamiento con un script que se ejecuta
+antes que la aplicación en la primera carga, así que la página abre ya autenticada.
+
+El fichero se cifra con Fernet si está instalado cryptography (pip install
+cryptography); si no, en Windows se usa DPAPI (solo lo puede descifrar el mismo
+usuario). Sin ninguno de los dos no se guarda nada en disco.
+
+La sesión guardada caduca pasado su ttl o cuando vence la primera de sus cookies con
+fecha de caducidad; además, si tras inyectarla la aplicación vuelve a pedir login,
+se hace el login normal y se sobrescribe.
+
+Uso:
+    almacen = AlmacenSesion()
+    open_page(code, sesion_guardada=almacen)
+    DriverPool(tamano=2, sesion_guardada=almacen)
+"""
+import base64
+import ctypes
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+from bitacora import obtener_logger
+
+log = obtener_logger(__name__)
+
+
+# cryptography es opcional: sin él se usa DPAPI en Windows
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+    InvalidToken = ValueError
+
+# Carpeta privada del usuario (junto a los datos de Edge en Windows)
+DIRECTORIO_SESION = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"), "slir")
+RUTA_SESION = os.environ.get("SLIR_RUTA_SESION", os.path.join(DIRECTORIO_SESION, "sesion.bin"))
+# Clave Fernet (base64 de 32 bytes); si no se da se genera una en un fichero junto a la sesión
+VARIABLE_CLAVE = "SLIR_CLAVE_SESION"
+# Vida máxima de una sesión guardada aunque sus cookies no digan otra cosa
+TTL_SESION = 8 * 3600
+# Campos de Network.getAllCookies que acepta Network.setCookies
+CAMPOS_COOKIE = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+
+# Rellena el almacenamiento de la aplicación antes de que arranque (solo en su origen
+# y sin pisar lo que ya hubiera)
+PLANTILLA_SCRIPT_ALMACENAMIENTO = """
+(() => {
+    const datos = __DATOS__;
+    if (location.origin !== datos.origen) return;
+    for (const [tipo, valores] of [['localStorage', datos.local], ['sessionStorage', datos.sesion]]) {
+        try {
+            const almacen = window[tipo];
+            for (const [clave, valor] of Object.entries(valores)) {
+                if (almacen.getItem(clave) === null) almacen.setItem(clave, valor);
+            }
+        } catch (e) {}
+    }
+})();
+"""
+
+SCRIPT_LEER_ALMACENAMIENTO = """
+const volcar = almacen => {
+    const datos = {};
+    for (let i = 0; i < almacen.length; i++) {
+        const clave = almacen.key(i);
+        datos[clave] = almacen.getItem(clave);
+    }
+    return datos;
+};
+return {origen: location.origin, local: volcar(localStorage), sesion: volcar(sessionStorage)};
+"""
+
+
+class _DatosDpapi(ctypes.Structure):
+    _fields_ = [("cbData", ctypes.c_uint32), ("pbData", ctypes.POINTER(ctypes.c_char))]
+
+
+def _dpapi(datos, cifrar):
+    """Cifra o descifra con la DPAPI de Windows (ligada al usuario actual)"""
+    buffer = ctypes.create_string_buffer(datos, len(datos))
+    entrada = _DatosDpapi(len(datos), ctypes.cast(buffer, ctypes.POINTER(ctypes.c_char)))
+    salida = _DatosDpapi()
+    crypt32 = ctypes.windll.crypt32
+    funcion = crypt32.CryptProtectData if cifrar else crypt32.CryptUnprotectData
+    if not funcion(ctypes.byref(entrada), None, None, None, None, 0, ctypes.byref(salida)):
+        raise OSError("DPAPI no pudo procesar la sesión guardada")
+    try:
+        return ctypes.string_at(salida.pbData, salida.cbData)
+    finally:
+        ctypes.windll.kernel32.LocalFree(salida.pbData)
+
+
+def _clave_fernet(ruta_clave):
+    """Clave de SLIR_CLAVE_SESION o del fichero de clave (que se crea solo legible por el usuario)"""
+    clave = os.environ.get(VARIABLE_CLAVE)
+    if clave:
+        return clave.encode("ascii")
+    if os.path.exists(ruta_clave):
+        with open(ruta_clave, "rb") as f:
+            return f.read().strip()
+    clave = Fernet.generate_key()
+    os.makedirs(os.path.dirname(ruta_clave), exist_ok=True)
+    descriptor = os.open(ruta_clave, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(descriptor, "wb") as f:
+        f.write(clave)
+    return clave
+
+
+def metodo_cifrado():
+    """
+    Método con el que se cifrará la sesión en este equipo
+
+    Returns:
+        str: "fernet", "dpapi" o None si no hay ninguno disponible
+    """
+    if Fernet is not None:
+        return "fernet"
+    if sys.platform.startswith("win"):
+        return "dpapi"
+    return None
+
+
+def _host_de_dominio(host, dominio):
+    dominio = (dominio or "").lstrip(".")
+    return bool(dominio) and (host == dominio or host.endswith("." + dominio))
+
+
+class AlmacenSesion:
+    """
+    Sesión autenticada guardada en disco y cifrada, compartible entre workers
+
+    Guarda una sola sesión (la de la última aplicación con login) y la mantiene en
+    memoria para no descifrar el fichero en cada navegador.
+    """
+
+    def __init__(self, ruta=RUTA_SESION, ttl=TTL_SESION):
+        """
+        Args:
+            ruta (str): Fichero cifrado de la sesión; la clave Fernet generada va en ruta + ".key"
+            ttl (float): Segundos tras los que la sesión guardada se da por caducada
+        """
+        self.ruta = ruta
+        self.ruta_clave = ruta + ".key"
+        self.ttl = ttl
+        self.metodo = metodo_cifrado()
+        self._lock = threading.Lock()
+        self._estado = None
+        self._cargado = False
+        if self.metodo is None:
+            log.warning("No hay cifrado disponible (pip install cryptography); la sesión no se guardará en disco.")
+
+    # --- Cifrado ------------------------------------------------------------------
+
+    def _cifrar(self, datos):
+        if self.metodo == "fernet":
+            return b"FERNET\n" + Fernet(_clave_fernet(self.ruta_clave)).encrypt(datos)
+        return b"DPAPI\n" + base64.b64encode(_dpapi(datos, cifrar=True))
+
+    def _descifrar(self, contenido):
+        metodo, _, cuerpo = contenido.partition(b"\n")
+        if metodo == b"FERNET" and Fernet is not None:
+            return Fernet(_clave_fernet(self.ruta_clave)).decrypt(cuerpo)
+        if metodo == b"DPAPI" and sys.platform.startswith("win"):
+            return _dpapi(base64.b64decode(cuerpo), cifrar=False)
+        raise ValueError(f"Sesión cifrada con un método no disponible: {metodo.decode(errors='replace')}")
+
+    # --- Estado -------------------------------------------------------------------
+
+    def caducidad(self, estado):
+        """
+        Momento (epoch) en que caduca una sesión guardada: su ttl o la primera cookie
+        de la aplicación con fecha de caducidad que venza antes
+
+        Returns:
+            float: Segundos desde epoch
+        """
+        limite = estado["guardado"] + self.ttl
+        host = urlparse(estado.get("origen", "")).hostname or ""
+        for cookie in estado.get("cookies", []):
+            expira = cookie.get("expires") or -1
+            if expira > 0 and _host_de_dominio(host, cookie.get("domain")):
+                limite = min(limite, expira)
+        return limite
+
+    def cargar(self):
+        """
+        Sesión guardada vigente
+
+        Returns:
+            dict: {"origen", "guardado", "cookies", "local", "sesion"}, o None si no hay,
+                  caducó o no se puede descifrar
+        """
+        with self._lock:
+            if not self._cargado:
+                self._cargado = True
+                self._estado = self._leer()
+            estado = self._estado
+        if estado and self.caducidad(estado) <= time.time():
+            log.info("La sesión guardada ha caducado; hará falta iniciar sesión.")
+            self.borrar()
+            return None
+        return estado
+
+    def _leer(self):
+        if self.metodo is None or not os.path.exists(self.ruta):
+            return None
+        try:
+            with open(self.ruta, "rb") as f:
+                return json.loads(self._descifrar(f.read()).decode("utf-8"))
+        except (OSError, ValueError, InvalidToken) as e:
+            log.warning(f"No se pudo leer la sesión guardada, se ignora: {e}")
+            return None
+
+    def guardar(self, driver):
+        """
+        Guarda la sesión del navegador (debe estar en una página de la aplicación)
+
+        Returns:
+            bool: True si se guardó
+        """
+        try:
+            cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+            almacenamiento = driver.execute_script(SCRIPT_LEER_ALMACENAMIENTO)
+        except Exception as e:
+            log.warning(f"No se pudo leer la sesión del navegador: {e}")
+            return False
+
+        estado = {
+            "origen": almacenamiento.get("origen"),
+            "guardado": time.time(),
+            "cookies": [{k: c[k] for k in CAMPOS_COOKIE if k in c} for c in cookies],
+            "local": almacenamiento.get("local") or {},
+            "sesion": almacenamiento.get("sesion") or {},
+        }
+        with self._lock:
+            self._estado = estado
+            self._cargado = True
+            if self.metodo is None:
+                return False
+            try:
+                os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+                temporal = self.ruta + ".tmp"
+                with open(temporal, "wb") as f:
+                    f.write(self._cifrar(json.dumps(estado).encode("utf-8")))
+                os.replace(temporal, self.ruta)
+            except (OSError, ValueError) as e:
+                log.warning(f"No se pudo guardar la sesión: {e}")
+                return False
+        log.info(f"Sesión guardada ({len(estado['cookies'])} cookies) en: {self.ruta}")
+        return True
+
+    def borrar(self):
+        """Olvida la sesión guardada (en memoria y en disco)"""
+        with self._lock:
+            self._estado = None
+            self._cargado = True
+            try:
+                os.remove(self.ruta)
+            except OSError:
+                pass
+
+    # --- Navegador ----------------------------------------------------------------
+
+    def inyectar(self, driver):
+        """
+        Prepara un navegador recién arrancado para abrir la aplicación con la sesión guardada
+
+        Hay que llamarlo antes de la primera navegación a la aplicación.
+
+        Returns:
+            bool: True si se inyectó una sesión
+        """
+        estado = self.cargar()
+        if not estado:
+            return False
+        ahora = time.time()
+        cookies = []
+        for cookie in estado["cookies"]:
+            cookie = dict(cookie)
+            expira = cookie.get("expires") or -1
+            if 0 < expira <= ahora:
+                continue
+            if expira <= 0:
+                # Cookie de sesión: sin fecha
+                cookie.pop("expires", None)
+            cookies.append(cookie)
+        try:
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+            datos = {"origen": estado["origen"], "local": estado["local"], "sesion": estado["sesion"]}
+            script = PLANTILLA_SCRIPT_ALMACENAMIENTO.replace(
+                "__DATOS__", json.dumps(datos).replace("</", "<\\/"))
+            respuesta = driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": script})
+            driver._slir_script_sesion = respuesta.get("identifier")
+        except Exception as e:
+            log.warning(f"No se pudo inyectar la sesión guardada: {e}")
+            return False
+        log.debug(f"Sesión guardada inyectada ({len(cookies)} cookies).")
+        return True
+
+    def retirar(self, driver):
+        """Quita el script de almacenamiento una vez cargada la aplicación"""
+        identificador = getattr(driver, "_slir_script_sesion", None)
+        if not identificador:
+            return
+        driver._slir_script_sesion = None
+        try:
+            driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": identificador})
+        except Exception:
+            pass
@@ -0,0 +1,665 @@
+"""
+Destinos (sinks) para las filas extraídas de SLIR
+
+Todos reciben las filas página a página con escribir_pagina(numero, filas) y se
+terminan con cerrar(completo). Formatos:
+
+    csv      CSV UTF-8 con BOM, valores como texto (comportamiento de siempre)
+    csv.gz   Igual pero comprimido con gzip (un miembro gzip por página)
+    parquet  Parquet con tipos de columna inferidos
+    arrow    Arrow IPC (fichero) con tipos de columna inferidos
+
+DatasetParquet agrupa muchos códigos en un único dataset particionado (columna
+"code" añadida a cada fila) para no generar un fichero por código; CsvConsolidado
+hace lo mismo en un único CSV (o CSV.gz).
+
+Parquet y Arrow necesitan pyarrow, que es opcional.
+"""
+from datetime import datetime
+import gzip
+import os
+import re
+import threading
+import uuid
+
+from bitacora import obtener_logger
+from escritor_csv import SUFIJO_PROGRESO, EscritorCsvIncremental, buscar_csv_pendiente
+from esquema_tabla import FilasPagina
+
+log = obtener_logger(__name__)
+
+
+# pyarrow es opcional: solo hace falta para los formatos columnares y se importa
+# la primera vez que se usa uno (ver _comprobar_pyarrow), no al cargar el módulo
+pa = None
+pa_ipc = None
+pq = None
+
+EXTENSIONES = {"csv": ".csv", "csv.gz": ".csv.gz", "parquet": ".parquet", "arrow": ".arrow"}
+FORMATOS = tuple(EXTENSIONES)
+
+_RE_ENTERO = re.compile(r"^[+-]?\d+$")
+_RE_DECIMAL = re.compile(r"^[+-]?(\d+\.\d*|\.\d+)([eE][+-]?\d+)?$")
+_FORMATOS_FECHA = ("%Y-%m-%d", "%d/%m/%Y")
+_FORMATOS_FECHA_HORA = ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M")
+
+
+def _comprobar_pyarrow():
+    global pa, pa_ipc, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Los formatos parquet y arrow necesitan pyarrow (pip install pyarrow)")
+    pa, pa_ipc, pq = pyarrow, pyarrow.ipc, pyarrow.parquet
+
+
+class Sink:
+    """
+    Interfaz común de los destinos de filas
+
+    Atributos:
+        destino (str): Fichero o carpeta donde se escriben las filas
+        ultima_pagina (int): Última página escrita (0 si ninguna)
+        total_filas (int): Filas escritas
+        admite_reanudar (bool): Si puede continuar una extracción a medias
+    """
+
+    admite_reanudar = False
+
+    def escribir_pagina(self, numero, filas):
+        raise NotImplementedError
+
+    def cerrar(self, completo=True):
+        pass
+
+
+class CsvSink(EscritorCsvIncremental, Sink):
+    """CSV UTF-8 con BOM escrito página a página (ver EscritorCsvIncremental)"""
+
+    admite_reanudar = True
+
+    @property
+    def destino(self):
+        return self.csv_filename
+
+
+class GzipCsvSink(CsvSink):
+    """CSV comprimido con gzip; cada página se añade como un miembro gzip completo"""
+
+    def _abrir(self, ruta, modo):
+        # Un fichero con varios miembros gzip concatenados sigue siendo un gzip válido,
+        # y cortar tras un miembro (al reanudar) también
+        return gzip.open(ruta, modo + "t", newline="", encoding="utf-8", compresslevel=6)
+
+
+# --- Inferencia de tipos ----------------------------------------------------------
+
+def _es_fecha(texto, formatos):
+    for formato in formatos:
+        try:
+            datetime.strptime(texto, formato)
+            return True
+        except ValueError:
+            pass
+    return False
+
+
+def _tipo_valor(valor):
+    """Tipo lógico de un valor: vacio, bool, int, float, date, timestamp o text"""
+    if valor is None or valor == "":
+        return "vacio"
+    if isinstance(valor, bool):
+        return "bool"
+    if isinstance(valor, int):
+        return "int"
+    if isinstance(valor, float):
+        return "float"
+    if not isinstance(valor, str):
+        return "text"
+
+    texto = valor.strip()
+    if _RE_ENTERO.match(texto):
+        digitos = texto.lstrip("+-")
+        # Los ceros a la izquierda indican un código, no un número
+        if (len(digitos) > 1 and digitos[0] == "0") or len(digitos) > 18:
+            return "text"
+        return "int"
+    if _RE_DECIMAL.match(texto):
+        return "float"
+    if texto.lower() in ("true", "false"):
+        return "bool"
+    if _es_fecha(texto, _FORMATOS_FECHA):
+        return "date"
+    if _es_fecha(texto, _FORMATOS_FECHA_HORA):
+        return "timestamp"
+    return "text"
+
+
+def _combinar_tipos(a, b):
+    if a == b or b == "vacio":
+        return a
+    if a == "vacio":
+        return b
+    if {a, b} == {"int", "float"}:
+        return "float"
+    return "text"
+
+
+def inferir_tipos(filas, tipos=None):
+    """
+    Infiere el tipo de cada columna combinándolo con los tipos ya conocidos
+
+    Args:
+        filas (list): Filas como diccionarios o FilasPagina
+        tipos (dict): Tipos previos {columna: tipo}
+
+    Returns:
+        dict: {columna: tipo} en el orden de aparición de las columnas
+    """
+    tipos = dict(tipos or {})
+    if isinstance(filas, FilasPagina) and filas.compacta:
+        for columna, valores in filas.por_columna().items():
+            tipo = tipos.get(columna, "vacio")
+            for valor in valores:
+                tipo = _combinar_tipos(tipo, _tipo_valor(valor))
+            tipos[columna] = tipo
+        return tipos
+    for fila in filas:
+        for columna, valor in fila.items():
+            tipos[columna] = _combinar_tipos(tipos.get(columna, "vacio"), _tipo_valor(valor))
+    return tipos
+
+
+def _convertir(valor, tipo):
+    if valor is None or valor == "":
+        return None
+    if tipo in ("text", "vacio"):
+        return valor if isinstance(valor, str) else str(valor)
+    if not isinstance(valor, str):
+        return valor
+    texto = valor.strip()
+    if tipo == "int":
+        return int(texto)
+    if tipo == "float":
+        return float(texto)
+    if tipo == "bool":
+        return texto.lower() == "true"
+    formatos = _FORMATOS_FECHA if tipo == "date" else _FORMATOS_FECHA_HORA
+    for formato in formatos:
+        try:
+            fecha = datetime.strptime(texto, formato)
+            return fecha.date() if tipo == "date" else fecha
+        except ValueError:
+            pass
+    return None
+
+
+def _tipo_arrow(tipo):
+    return {
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "date": pa.date32(),
+        "timestamp": pa.timestamp("s"),
+    }.get(tipo, pa.string())
+
+
+def esquema_arrow(tipos):
+    """Esquema de pyarrow para unos tipos lógicos"""
+    _comprobar_pyarrow()
+    return pa.schema([(columna, _tipo_arrow(tipo)) for columna, tipo in tipos.items()])
+
+
+def tabla_arrow(filas, tipos):
+    """Convierte filas en una tabla de pyarrow con los tipos indicados"""
+    esquema = esquema_arrow(tipos)
+    if isinstance(filas, FilasPagina) and filas.compacta:
+        por_columna = filas.por_columna()
+        nulos = [None] * len(filas)
+        columnas = [
+            pa.array([_convertir(valor, tipo) for valor in por_columna.get(columna, nulos)],
+                     type=_tipo_arrow(tipo))
+            for columna, tipo in tipos.items()
+        ]
+        return pa.Table.from_arrays(columnas, schema=esquema)
+    columnas = [
+        pa.array([_convertir(fila.get(columna), tipo) for fila in filas], type=_tipo_arrow(tipo))
+        for columna, tipo in tipos.items()
+    ]
+    return pa.Table.from_arrays(columnas, schema=esquema)
+
+
+def _valores_columnas(filas, columnas):
+    """Valores de texto de las columnas indicadas, fila a fila (None si la fila no la tiene)"""
+    if isinstance(filas, FilasPagina) and filas.compacta:
+        por_columna = filas.por_columna()
+        nulos = [None] * len(filas)
+        return {columna: list(por_columna.get(columna, nulos)) for columna in columnas}
+    return {columna: [fila.get(columna) for fila in filas] for columna in columnas}
+
+
+def adaptar_tabla(tabla, esquema, tipos=None, originales=None):
+    """
+    Ajusta una tabla ya escrita a un esquema ampliado (columnas nuevas a nulo, tipos ensanchados)
+
+    Las columnas que cambian de tipo se reconstruyen desde su texto original si se da
+    (originales = {columna: valores}); convertir el valor ya tipado cambiaría el texto
+    (p. ej. "31/01/2024" pasaría a "2024-01-31" y "1.50" a "1.5").
+    """
+    originales = originales or {}
+    columnas = []
+    for campo in esquema:
+        if campo.name in tabla.column_names and not tabla[campo.name].type.equals(campo.type) \
+                and tipos and campo.name in originales:
+            tipo = tipos[campo.name]
+            columnas.append(pa.array([_convertir(valor, tipo) for valor in originales[campo.name]],
+                                     type=campo.type))
+        elif campo.name in tabla.column_names:
+            columnas.append(tabla[campo.name].cast(campo.type))
+        else:
+            columnas.append(pa.nulls(tabla.num_rows, type=campo.type))
+    return pa.Table.from_arrays(columnas, schema=esquema)
+
+
+# --- Sinks columnares -------------------------------------------------------------
+
+class _SinkColumnar(Sink):
+    """
+    Base de los sinks columnares: infiere tipos por página y, si una página añade
+    columnas o ensancha un tipo, llama a _esquema_cambiado antes de escribirla
+    """
+
+    def __init__(self):
+        _comprobar_pyarrow()
+        self.tipos = {}
+        self.ultima_pagina = 0
+        self.total_filas = 0
+        self.cambios_esquema = 0
+
+    def escribir_pagina(self, numero, filas):
+        if filas:
+            tipos = inferir_tipos(filas, self.tipos)
+            cambia = bool(self.tipos) and tipos != self.tipos
+            self.tipos = tipos
+            if cambia:
+                self.cambios_esquema += 1
+                self._esquema_cambiado()
+            self._escribir_tabla(tabla_arrow(filas, self.tipos))
+            self._recordar_originales(filas)
+        self.ultima_pagina = numero
+        self.total_filas += len(filas)
+
+    def _escribir_tabla(self, tabla):
+        raise NotImplementedError
+
+    def _esquema_cambiado(self):
+        raise NotImplementedError
+
+    def _recordar_originales(self, filas):
+        """Se llama tras escribir cada página con sus filas tal como llegaron"""
+
+
+class _SinkFicheroColumnar(_SinkColumnar):
+    """
+    Un fichero columnar por código. Si el esquema cambia a mitad, lo ya escrito se
+    reescribe con el esquema nuevo (caso poco frecuente).
+
+    Para reescribirlo sin alterar el texto se guarda el valor original de las columnas
+    con tipo (no texto) ya escritas; una columna que pasa a texto ya no puede cambiar
+    más y deja de guardarse.
+    """
+
+    def __init__(self, ruta):
+        super().__init__()
+        self.ruta = ruta
+        self._ruta_actual = ruta
+        self._writer = None
+        self._fichero = None
+        self._originales = {}
+        self._filas_escritas = 0
+
+    @property
+    def destino(self):
+        return self.ruta
+
+    def _abrir_writer(self, ruta, esquema):
+        raise NotImplementedError
+
+    def _leer(self, ruta):
+        raise NotImplementedError
+
+    def _cerrar_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._fichero is not None:
+            self._fichero.close()
+            self._fichero = None
+
+    def _escribir_tabla(self, tabla):
+        if self._writer is None:
+            self._abrir_writer(self._ruta_actual, tabla.schema)
+        self._writer.write_table(tabla)
+
+    def _esquema_cambiado(self):
+        if self._writer is None:
+            return
+        self._cerrar_writer()
+        anterior = self._ruta_actual
+        previa = self._leer(anterior)
+
+        self._ruta_actual = f"{self.ruta}.{self.cambios_esquema}.tmp"
+        esquema = esquema_arrow(self.tipos)
+        self._abrir_writer(self._ruta_actual, esquema)
+        self._writer.write_table(adaptar_tabla(previa, esquema, self.tipos, self._originales))
+        os.remove(anterior)
+
+    def _recordar_originales(self, filas):
+        con_tipo = [columna for columna, tipo in self.tipos.items() if tipo not in ("text", "vacio")]
+        for columna in list(self._originales):
+            if columna not in con_tipo:
+                del self._originales[columna]
+        for columna, valores in _valores_columnas(filas, con_tipo).items():
+            self._originales.setdefault(columna, [None] * self._filas_escritas).extend(valores)
+        self._filas_escritas += len(filas)
+
+    def cerrar(self, completo=True):
+        self._cerrar_writer()
+        if self._ruta_actual != self.ruta and os.path.exists(self._ruta_actual):
+            os.replace(self._ruta_actual, self.ruta)
+            self._ruta_actual = self.ruta
+
+
+class ParquetSink(_SinkFicheroColumnar):
+    """Parquet con un row group por página (compresión zstd)"""
+
+    def _abrir_writer(self, ruta, esquema):
+        self._writer = pq.ParquetWriter(ruta, esquema, compression="zstd")
+
+    def _leer(self, ruta):
+        return pq.read_table(ruta)
+
+
+class ArrowSink(_SinkFicheroColumnar):
+    """Fichero Arrow IPC con un record batch por página"""
+
+    def _abrir_writer(self, ruta, esquema):
+        self._fichero = pa.OSFile(ruta, "wb")
+        self._writer = pa_ipc.new_file(self._fichero, esquema)
+
+    def _leer(self, ruta):
+        with pa.memory_map(ruta, "r") as fuente:
+            return pa_ipc.open_file(fuente).read_all()
+
+
+class DatasetParquet:
+    """
+    Dataset Parquet particionado que reúne muchos códigos SLIR
+
+    Cada fila lleva una columna "code". Las filas se agrupan en particiones estilo
+    Hive (base/fecha=AAAA-MM-DD/ o base/code=XXX/) con un fichero por partición y
+    ejecución, en lugar de un fichero por código. Se puede compartir entre hilos.
+    La fecha de la partición se fija la primera vez que se escribe cada código, así
+    que un código que pasa de medianoche no se reparte entre dos particiones.
+
+    Si el esquema cambia se empieza un fichero nuevo en la partición. Al cerrar, las
+    partes de la ejecución escritas con un esquema anterior se reescriben con el final
+    (igual que _SinkFicheroColumnar, desde el texto original de las columnas con tipo,
+    que se guarda aparte en .textos.parquet ocultos mientras dura la ejecución) y se
+    escribe _common_metadata con ese esquema para leer todas las partes juntas.
+
+    Uso:
+        with DatasetParquet("output/dataset") as dataset:
+            process_slir_code(code, formato=dataset)
+    """
+
+    def __init__(self, base_dir, particion="fecha"):
+        """
+        Args:
+            base_dir (str): Carpeta raíz del dataset
+            particion (str): "fecha" (fecha de extracción) o "code"
+        """
+        _comprobar_pyarrow()
+        if particion not in ("fecha", "code"):
+            raise ValueError(f"Partición no soportada: {particion}")
+        self.base_dir = base_dir
+        self.particion = particion
+        self.id_ejecucion = f"{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}_{uuid.uuid4().hex[:6]}"
+        self.tipos = {}
+        self.total_filas = 0
+        self._writers = {}
+        self._partes = {}
+        self._escritas = []
+        self._fechas = {}
+        self._progreso = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+
+    @property
+    def destino(self):
+        return self.base_dir
+
+    def sink_para(self, code, reanudar=False):
+        """
+        Devuelve el sink de un código que escribe en este dataset
+
+        Con reanudar, continúa tras la última página que se escribió del código en
+        esta misma ejecución (p. ej. en un reintento del lote)
+        """
+        return _SinkDataset(self, code, reanudar)
+
+    def _valor_particion(self, code):
+        if self.particion == "code":
+            return code
+        if code not in self._fechas:
+            self._fechas[code] = datetime.now().strftime("%Y-%m-%d")
+        return self._fechas[code]
+
+    def _parte_para(self, valor, esquema):
+        """Parte abierta de la partición para el esquema dado (se empieza otra si cambia)"""
+        parte = self._writers.get(valor)
+        if parte is not None and parte["writer"].schema.equals(esquema):
+            return parte
+        if parte is not None:
+            self._cerrar_parte(parte)
+
+        numero = self._partes.get(valor, -1) + 1
+        self._partes[valor] = numero
+        carpeta = os.path.join(self.base_dir, f"{self.particion}={valor}")
+        os.makedirs(carpeta, exist_ok=True)
+        nombre = f"part-{self.id_ejecucion}-{numero:03d}"
+        ruta = os.path.join(carpeta, f"{nombre}.parquet")
+        parte = {"ruta": ruta, "writer": pq.ParquetWriter(ruta, esquema, compression="zstd"), "textos": None}
+        # Texto original de las columnas con tipo, por si hay que reescribir la parte
+        con_tipo = [campo.name for campo in esquema if not campo.type.equals(pa.string())]
+        if con_tipo:
+            ruta_textos = os.path.join(carpeta, f".{nombre}.textos.parquet")
+            parte["textos"] = ruta_textos
+            parte["writer_textos"] = pq.ParquetWriter(
+                ruta_textos, pa.schema([(columna, pa.string()) for columna in con_tipo]), compression="zstd")
+        self._writers[valor] = parte
+        self._escritas.append(parte)
+        return parte
+
+    @staticmethod
+    def _cerrar_parte(parte):
+        parte["writer"].close()
+        if parte["textos"]:
+            parte["writer_textos"].close()
+
+    def escribir(self, code, filas):
+        """Añade al dataset las filas de un código"""
+        if not filas:
+            return
+        filas = [{"code": code, **fila} for fila in filas]
+        with self._lock:
+            self.tipos = inferir_tipos(filas, self.tipos)
+            tabla = tabla_arrow(filas, self.tipos)
+            parte = self._parte_para(self._valor_particion(code), tabla.schema)
+            parte["writer"].write_table(tabla)
+            if parte["textos"]:
+                esquema_textos = parte["writer_textos"].schema
+                textos = _valores_columnas(filas, esquema_textos.names)
+                parte["writer_textos"].write_table(pa.Table.from_pydict(
+                    {columna: [None if valor is None else str(valor) for valor in valores]
+                     for columna, valores in textos.items()}, schema=esquema_textos))
+            self.total_filas += len(filas)
+
+    def _unificar_partes(self, esquema):
+        """Reescribe con el esquema final las partes de la ejecución escritas con otro"""
+        for parte in self._escritas:
+            try:
+                # ParquetFile y no read_table: no debe añadir la columna de la partición
+                tabla = pq.ParquetFile(parte["ruta"]).read()
+                if not tabla.schema.equals(esquema):
+                    originales = pq.ParquetFile(parte["textos"]).read().to_pydict() if parte["textos"] else {}
+                    temporal = f"{parte['ruta']}.tmp"
+                    pq.write_table(adaptar_tabla(tabla, esquema, self.tipos, originales), temporal,
+                                   compression="zstd")
+                    os.replace(temporal, parte["ruta"])
+            finally:
+                if parte["textos"] and os.path.exists(parte["textos"]):
+                    os.remove(parte["textos"])
+        self._escritas = []
+
+    def cerrar(self):
+        """Cierra los ficheros abiertos, unifica el esquema de las partes y guarda el esquema común"""
+        with self._lock:
+            for parte in self._writers.values():
+                self._cerrar_parte(parte)
+            self._writers = {}
+            if self.tipos:
+                esquema = esquema_arrow(self.tipos)
+                self._unificar_partes(esquema)
+                pq.write_metadata(esquema, os.path.join(self.base_dir, "_common_metadata"))
+
+
+class CsvConsolidado:
+    """
+    CSV único que reúne muchos códigos SLIR, con una columna "code" al principio
+
+    Las páginas de todos los códigos se añaden al mismo fichero según llegan (se
+    puede compartir entre hilos). Si un código trae columnas nuevas se amplía la
+    cabecera como en EscritorCsvIncremental. Las filas de un código que falla a
+    medias se quedan en el fichero; el manifiesto del lote indica cuáles fallaron.
+
+    Uso:
+        with CsvConsolidado("output/slir_todos.csv") as salida:
+            process_slir_code(code, formato=salida)
+    """
+
+    def __init__(self, ruta):
+        """
+        Args:
+            ruta (str): Fichero de salida; si termina en .gz se comprime con gzip
+        """
+        self.ruta = ruta
+        clase = GzipCsvSink if ruta.endswith(".gz") else CsvSink
+        self._escritor = clase(ruta)
+        self._paginas = 0
+        self._progreso = {}
+        self._lock = threading.Lock()
+        self.total_filas = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+
+    @property
+    def destino(self):
+        return self.ruta
+
+    def sink_para(self, code, reanudar=False):
+        """Devuelve el sink de un código que escribe en este CSV (ver DatasetParquet.sink_para)"""
+        return _SinkDataset(self, code, reanudar)
+
+    def escribir(self, code, filas):
+        """Añade al CSV las filas de un código"""
+        if not filas:
+            return
+        filas = [{"code": code, **fila} for fila in filas]
+        with self._lock:
+            self._paginas += 1
+            self._escritor.escribir_pagina(self._paginas, filas)
+            self.total_filas += len(filas)
+
+    def cerrar(self):
+        """Termina el fichero (se borra su progreso)"""
+        with self._lock:
+            self._escritor.cerrar()
+
+
+class _SinkDataset(Sink):
+    """Sink de un código dentro de una salida compartida (DatasetParquet o CsvConsolidado)"""
+
+    # Se reanuda tras lo escrito del código en la misma ejecución
+    admite_reanudar = True
+
+    def __init__(self, dataset, code, reanudar=False):
+        self.dataset = dataset
+        self.code = code
+        self.ultima_pagina, self.total_filas = dataset._progreso.get(code, (0, 0)) if reanudar else (0, 0)
+
+    @property
+    def destino(self):
+        return self.dataset.destino
+
+    def escribir_pagina(self, numero, filas):
+        self.dataset.escribir(self.code, filas)
+        self.ultima_pagina = numero
+        self.total_filas += len(filas)
+        self.dataset._progreso[self.code] = (self.ultima_pagina, self.total_filas)
+
+
+def crear_sink(formato, output_dir, code, timestamp, reanudar=False, id_salida=None):
+    """
+    Crea el sink de un código
+
+    Args:
+        formato: "csv", "csv.gz", "parquet", "arrow" o una salida compartida
+                 (DatasetParquet o CsvConsolidado)
+        output_dir (str): Carpeta de salida
+        code (str): Código SLIR
+        timestamp (str): Marca de tiempo para el nombre del fichero
+        reanudar (bool): Si True, continúa el último fichero a medias del código
+                         (solo csv y csv.gz)
+        id_salida (str): Marca fija que sustituye a timestamp en el nombre; con reanudar
+                         solo se continúa el fichero de esa marca, nunca el de otra ejecución
+
+    Returns:
+        Sink
+    """
+    if hasattr(formato, "sink_para"):
+        return formato.sink_para(code, reanudar=reanudar)
+    if formato not in EXTENSIONES:
+        raise ValueError(f"Formato de salida no soportado: {formato}")
+
+    extension = EXTENSIONES[formato]
+    marca = id_salida or timestamp
+    if formato in ("csv", "csv.gz"):
+        ruta = os.path.join(output_dir, f"slir_{code}_{marca}_data{extension}")
+        pendiente = None
+        if reanudar and id_salida:
+            # Con una marca fija solo se reanuda ese mismo fichero si quedó a medias
+            pendiente = ruta if os.path.exists(ruta + SUFIJO_PROGRESO) else None
+        elif reanudar:
+            pendiente = buscar_csv_pendiente(output_dir, code, extension)
+        ruta = pendiente or ruta
+        clase = CsvSink if formato == "csv" else GzipCsvSink
+        return clase(ruta, reanudar=bool(pendiente))
+
+    if reanudar:
+        log.warning(f"El formato {formato} no admite reanudar; se extrae el código completo.")
+    ruta = os.path.join(output_dir, f"slir_{code}_{marca}_data{extension}")
+    return ParquetSink(ruta) if formato == "parquet" else ArrowSink(ruta)
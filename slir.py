@@ -0,0 +1,209 @@
+"""
+Línea de comandos para extraer muchos códigos SLIR
+
+Lee los códigos de uno o varios ficheros (uno por línea, con prioridad opcional:
+"SLIR1ST230476 urgente") o de la entrada estándar con "-", los procesa con
+ejecutar_lote y escribe un manifiesto JSON con el estado, filas, páginas y tiempos
+de cada código. Con --consolidar todas las filas van a una única salida con una
+columna "code" (CSV, CSV.gz o dataset Parquet) en lugar de un fichero por código.
+
+Uso:
+    python slir.py codigos.txt
+    python slir.py codigos.txt -w 4 --consolidar output/slir_todos.csv.gz
+    type codigos.txt | python slir.py - --visible --manifiesto manifiesto.json
+    python slir.py -c SLIR1ST230476 -c SLIR1ST230477
+
+El arranque es diferido: Selenium y la ruta del driver (SLIR_EDGEDRIVER, o la
+guardada en drivers.json) se preparan en segundo plano mientras se leen los códigos
+y cada worker arranca su navegador antes de recibir el primero.
+
+Por defecto la consola solo muestra una línea por código y los avisos; -v añade
+los mensajes de progreso y -vv los de cada página (ver bitacora.py).
+
+Termina con código 0 si todos los códigos se extrajeron, 1 si alguno falló y
+2 si no hay códigos que procesar.
+"""
+import argparse
+from datetime import datetime
+import json
+import os
+import sys
+
+from arranque import precalentar
+from batch_runner import ejecutar_lote
+from bitacora import LOGS_DIR, configurar_logs
+from cache_slir import CacheSlir
+from extract_info import obtener_directorio_salida
+from planificador import LimitadorTasa, leer_prioridades
+from sesion_guardada import AlmacenSesion
+from sinks import CsvConsolidado, DatasetParquet, EXTENSIONES
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog="slir",
+        description="Extrae las tablas de una lista de códigos SLIR con varios navegadores en paralelo.")
+    parser.add_argument("ficheros", nargs="*", metavar="FICHERO",
+                        help='Ficheros con un código por línea (prioridad opcional: "CODIGO urgente"); '
+                             '"-" lee de la entrada estándar')
+    parser.add_argument("-c", "--codigo", action="append", default=[], metavar="CODIGO",
+                        help="Código suelto (se puede repetir)")
+    parser.add_argument("-w", "--workers", type=int, default=2,
+                        help="Navegadores en paralelo (por defecto 2)")
+    parser.add_argument("--visible", action="store_true",
+                        help="Muestra los navegadores (por defecto van en modo headless)")
+    parser.add_argument("-f", "--formato", choices=sorted(EXTENSIONES), default="csv",
+                        help="Formato de los ficheros por código (por defecto csv)")
+    parser.add_argument("--consolidar", metavar="RUTA",
+                        help="Escribe todos los códigos en una sola salida con columna code: "
+                             ".csv o .csv.gz para un CSV, cualquier otra ruta para un dataset Parquet")
+    parser.add_argument("-m", "--manifiesto", metavar="RUTA",
+                        help="Manifiesto JSON (por defecto output/manifiesto_<fecha>.json)")
+    parser.add_argument("-r", "--reintentos", type=int, default=2,
+                        help="Reintentos por código tras el primer fallo (por defecto 2)")
+    parser.add_argument("--cache", action="store_true",
+                        help="Omite los códigos sin cambios según la caché local (sus filas no se "
+                             "repiten en la salida consolidada)")
+    parser.add_argument("--ligero", action="store_true",
+                        help="Arranque ligero con perfil mínimo y recursos bloqueados")
+    parser.add_argument("--captura-red", action="store_true",
+                        help="Toma las filas de las respuestas JSON de la aplicación")
+    parser.add_argument("--sin-limite", action="store_true",
+                        help="No limita la tasa de navegaciones y clics contra el servidor")
+    parser.add_argument("--sin-sesion-guardada", action="store_true",
+                        help="No reutiliza la sesión cifrada entre ejecuciones")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="Más detalle en consola: -v progreso, -vv cada página y clic")
+    parser.add_argument("--dir-logs", default=LOGS_DIR, metavar="CARPETA",
+                        help="Carpeta de los logs rotativos por worker (por defecto logs/)")
+    return parser
+
+
+def leer_entradas(ficheros, codigos_sueltos, entrada=None):
+    """
+    Junta los códigos de los ficheros, de la entrada estándar ("-") y de --codigo
+
+    Returns:
+        tuple: (códigos sin duplicados en el orden de llegada, {code: prioridad})
+    """
+    lineas = []
+    for fichero in ficheros:
+        if fichero == "-":
+            lineas.extend((entrada or sys.stdin).read().splitlines())
+        else:
+            with open(fichero, encoding="utf-8-sig") as f:
+                lineas.extend(f.read().splitlines())
+    lineas.extend(codigos_sueltos)
+    return leer_prioridades(lineas)
+
+
+def crear_salida_consolidada(ruta):
+    """CsvConsolidado si la ruta es .csv o .csv.gz; si no, DatasetParquet en esa carpeta"""
+    if ruta.endswith((".csv", ".csv.gz")):
+        carpeta = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(carpeta, exist_ok=True)
+        return CsvConsolidado(ruta)
+    return DatasetParquet(ruta)
+
+
+def construir_manifiesto(informe, argumentos, salida_consolidada=None):
+    """
+    Resume el informe del lote en un manifiesto legible por máquinas
+
+    Returns:
+        dict: {"fecha", "parametros", "resumen", "salida_consolidada", "codigos": [...]} con
+              estado ("ok", "sin_cambios" o "fallido"), filas, páginas, tiempos y fichero de cada código
+    """
+    codigos = []
+    for r in informe["codigos"]:
+        estado = "fallido"
+        if r["success"]:
+            estado = "sin_cambios" if r["sin_cambios"] else "ok"
+        codigos.append({
+            "code": r["code"],
+            "estado": estado,
+            "filas": r["total_rows"],
+            "paginas": r["pages_processed"],
+            "intentos": r["intentos"],
+            "segundos": r["segundos"],
+            "latencia": r.get("latencia"),
+            "tiempos": r["tiempos"],
+            "fichero": r["csv_file"],
+            "error": r["error"],
+            "mensaje": r["message"] if not r["success"] else None,
+        })
+    return {
+        "fecha": informe["fecha"],
+        "parametros": {
+            "workers": argumentos.workers,
+            "headless": not argumentos.visible,
+            "formato": argumentos.formato,
+            "reintentos": argumentos.reintentos,
+            "cache": argumentos.cache,
+            "ligero": argumentos.ligero,
+            "captura_red": argumentos.captura_red,
+        },
+        "resumen": {
+            "total": informe["total"],
+            "exitosos": informe["exitosos"],
+            "fallidos": informe["fallidos"],
+            "sin_cambios": informe["sin_cambios"],
+            "filas": sum(c["filas"] or 0 for c in codigos),
+            "duracion_segundos": informe["duracion_segundos"],
+            "codigos_por_minuto": informe["codigos_por_minuto"],
+            "latencia_mediana": informe.get("latencia_mediana"),
+            "errores": informe["errores"],
+        },
+        "salida_consolidada": salida_consolidada,
+        "codigos": codigos,
+    }
+
+
+def main(argv=None):
+    argumentos = crear_parser().parse_args(argv)
+    configurar_logs(("silencioso", "info", "debug")[min(argumentos.verbose, 2)], argumentos.dir_logs)
+    if not argumentos.ficheros and not argumentos.codigo:
+        argumentos.ficheros = ["-"]
+    # Selenium se importa mientras se leen los códigos (ver arranque.py); el driver solo
+    # se busca si hay algo que procesar, porque puede acabar en Selenium Manager
+    precalentamiento = precalentar(resolver=False)
+    codigos, prioridades = leer_entradas(argumentos.ficheros, argumentos.codigo)
+    precalentamiento.esperar()
+    if not codigos:
+        print("No hay códigos que procesar.")
+        return 2
+    precalentar()
+
+    salida = crear_salida_consolidada(argumentos.consolidar) if argumentos.consolidar else None
+    ruta_manifiesto = argumentos.manifiesto or os.path.join(
+        obtener_directorio_salida(), f"manifiesto_{datetime.now():%Y%m%d_%H%M%S}.json")
+
+    print(f"Procesando {len(codigos)} códigos con {argumentos.workers} workers...")
+    try:
+        informe = ejecutar_lote(
+            codigos, num_workers=argumentos.workers, reintentos=argumentos.reintentos,
+            headless=not argumentos.visible, cache=CacheSlir() if argumentos.cache else None,
+            ruta_metricas_jsonl=os.path.join(argumentos.dir_logs, "metricas.jsonl"),
+            captura_red=argumentos.captura_red, ligero=argumentos.ligero,
+            sesion_guardada=None if argumentos.sin_sesion_guardada else AlmacenSesion(),
+            prioridades=prioridades, limitador=None if argumentos.sin_limite else LimitadorTasa(),
+            formato=salida or argumentos.formato)
+    finally:
+        if salida is not None:
+            salida.cerrar()
+
+    manifiesto = construir_manifiesto(informe, argumentos, salida.destino if salida is not None else None)
+    with open(ruta_manifiesto, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+
+    resumen = manifiesto["resumen"]
+    print(f"\nExitosos: {resumen['exitosos']} / {resumen['total']} ({resumen['filas']} filas, "
+          f"{resumen['codigos_por_minuto']} códigos/minuto)")
+    if salida is not None:
+        print(f"Salida consolidada: {salida.destino}")
+    print(f"Manifiesto guardado en: {ruta_manifiesto}")
+    return 0 if resumen["fallidos"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
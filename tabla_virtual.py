@@ -0,0 +1,197 @@
+"""
+Lectura por ventanas de tablas con scroll virtual (o con muchas filas por página)
+
+Con scroll virtual PrimeNG solo mantiene en el DOM las filas que caben en el visor
+(más un pequeño margen), así que 'table tbody tr' no tiene toda la página. Aquí se
+desplaza el visor de la tabla por tramos y en cada tramo se leen, en una sola llamada
+asíncrona, las filas que se acaban de pintar. Las filas ya vistas se descartan por su
+clave (aria-rowindex o data-p-index de la fila si existen; si no, las columnas de
+clave indicadas o la posición vertical de la fila dentro del contenido del visor) y
+las nuevas se entregan en cuanto se leen. La posición no depende del contenido, así
+que dos filas idénticas siguen siendo dos filas.
+
+Uso:
+    for filas in iterar_ventanas(driver, esquema):
+        ...  # FilasPagina con las filas nuevas de cada tramo
+    filas = extraer_filas_virtuales(driver, esquema)  # toda la página de una vez
+"""
+import time
+
+from esquema_tabla import EsquemaTabla, FilasPagina
+
+# Visores de scroll virtual de PrimeNG (p-scroller en v16+, CDK y el cuerpo virtual antiguo)
+SELECTOR_VISOR_VIRTUAL = ".p-scroller, cdk-virtual-scroll-viewport, .p-datatable-virtual-scrollable-body"
+# Parte del visor que se vuelve a leer en el tramo siguiente (para no saltarse filas)
+SOLAPAMIENTO = 0.1
+# Milisegundos que se espera tras desplazar el visor, además de dos frames de pintado
+ESPERA_PINTADO_MS = 50
+# Relecturas del mismo tramo mientras tenga filas sin pintar (celdas vacías)
+RELECTURAS_MAXIMAS = 3
+# Tramos máximos por página (protección frente a visores que crecen sin fin)
+MAX_VENTANAS = 10000
+
+# Desplaza el visor a arguments[1] (si no es null), espera a que se pinte y devuelve
+# las filas visibles con su clave, su posición en el contenido del visor y la geometría
+# del visor. arguments[0] es la firma
+# del esquema conocido (los encabezados solo se devuelven si cambia).
+SCRIPT_VENTANA_TABLA = """
+const firma = arguments[0], objetivo = arguments[1], esperaMs = arguments[2];
+const hecho = arguments[arguments.length - 1];
+const texto = el => (el.getClientRects().length ? el.innerText : '').trim();
+const tbody = document.querySelector('table tbody');
+let visor = document.querySelector('""" + SELECTOR_VISOR_VIRTUAL + """');
+const virtual = !!visor;
+if (!visor && tbody) {
+    for (let el = tbody.parentElement; el && el !== document.body; el = el.parentElement) {
+        if (/(auto|scroll)/.test(getComputedStyle(el).overflowY) && el.scrollHeight > el.clientHeight) {
+            visor = el;
+            break;
+        }
+    }
+}
+if (visor && objetivo !== null) visor.scrollTop = objetivo;
+const leer = () => {
+    const headers = Array.from(document.querySelectorAll("th, [role='columnheader']"))
+        .map(texto)
+        .filter(t => t);
+    const rows = [], claves = [], posiciones = [];
+    const origen = visor ? visor.getBoundingClientRect().top - visor.scrollTop : 0;
+    let vacias = 0;
+    document.querySelectorAll('table tbody tr').forEach(tr => {
+        const celdas = Array.from(tr.querySelectorAll("td, [role='cell']")).map(texto);
+        if (celdas.length && !celdas.some(c => c)) vacias++;
+        rows.push(celdas);
+        claves.push(tr.getAttribute('aria-rowindex') || tr.getAttribute('data-p-index'));
+        posiciones.push(Math.round(tr.getBoundingClientRect().top - origen));
+    });
+    hecho({
+        headers: headers.join('\\u001f') === firma ? null : headers,
+        rows: rows,
+        claves: claves,
+        posiciones: posiciones,
+        vacias: vacias,
+        virtual: virtual,
+        desplazable: !!visor,
+        scrollTop: visor ? visor.scrollTop : 0,
+        scrollHeight: visor ? visor.scrollHeight : 0,
+        clientHeight: visor ? visor.clientHeight : 0,
+    });
+};
+if (objetivo === null) leer();
+else requestAnimationFrame(() => requestAnimationFrame(() => setTimeout(leer, esperaMs)));
+"""
+
+
+def es_tabla_virtual(snapshot):
+    """Si una lectura de la tabla (SCRIPT_FILAS_TABLA) detectó un visor de scroll virtual"""
+    return bool(snapshot and snapshot.get("virtual"))
+
+
+def iterar_ventanas(driver, esquema=None, clave=None, solapamiento=SOLAPAMIENTO,
+                    espera_ms=ESPERA_PINTADO_MS, metricas=None):
+    """
+    Recorre el visor de la tabla de arriba abajo y entrega las filas nuevas de cada tramo
+
+    Si la tabla no tiene visor desplazable se lee una sola vez (como extraer_filas_compactas).
+
+    Args:
+        driver: WebDriver de Selenium con la tabla cargada
+        esquema (EsquemaTabla): Esquema ya conocido del código (se relee si cambia)
+        clave (list): Columnas que identifican una fila cuando la tabla no numera sus
+                      filas (aria-rowindex); por defecto la posición de la fila en el
+                      contenido del visor, que conserva las filas idénticas
+        solapamiento (float): Parte del visor que se repite entre tramos
+        espera_ms (int): Espera tras cada desplazamiento antes de leer
+        metricas (dict): Si se indica, se rellena con ventanas, filas, duplicadas,
+                         relecturas y segundos
+
+    Yields:
+        FilasPagina: Filas que no se habían visto, en orden de aparición
+    """
+    metricas = metricas if metricas is not None else {}
+    metricas.update({"ventanas": 0, "filas": 0, "duplicadas": 0, "relecturas": 0, "segundos": 0.0})
+    inicio = time.perf_counter()
+    vistas = set()
+    posicion = 0
+    relecturas = 0
+    indices_clave = None
+
+    try:
+        while metricas["ventanas"] < MAX_VENTANAS:
+            ventana = driver.execute_async_script(SCRIPT_VENTANA_TABLA, esquema.firma if esquema else None,
+                                                  posicion, espera_ms)
+            metricas["ventanas"] += 1
+            if ventana.get("headers") is not None:
+                esquema = EsquemaTabla(ventana["headers"])
+                indices_clave = None
+            if clave and indices_clave is None:
+                indices_clave = [esquema.columnas.index(c) for c in clave if c in esquema.columnas]
+
+            nuevas = []
+            filas = ventana.get("rows") or []
+            claves = ventana.get("claves") or [None] * len(filas)
+            posiciones = ventana.get("posiciones") or [None] * len(filas)
+            repetidas = {}
+            for celdas, clave_dom, posicion_fila in zip(filas, claves, posiciones):
+                if not any(celdas):
+                    continue
+                if clave_dom is not None:
+                    identificador = clave_dom
+                elif indices_clave:
+                    identificador = tuple(celdas[i] if i < len(celdas) else "" for i in indices_clave)
+                elif posicion_fila is not None:
+                    identificador = ("posicion", posicion_fila)
+                else:
+                    # Sin posición: las filas iguales de un mismo tramo se distinguen por su orden
+                    celdas_clave = tuple(celdas)
+                    repetidas[celdas_clave] = repetidas.get(celdas_clave, 0) + 1
+                    identificador = (celdas_clave, repetidas[celdas_clave])
+                if identificador in vistas:
+                    metricas["duplicadas"] += 1
+                    continue
+                vistas.add(identificador)
+                nuevas.append(celdas)
+
+            if nuevas:
+                metricas["filas"] += len(nuevas)
+                yield FilasPagina.desde_matriz(esquema, nuevas)
+
+            if not ventana.get("desplazable"):
+                return
+            # Filas aún sin pintar (celdas vacías): se relee el mismo tramo
+            if ventana.get("vacias") and relecturas < RELECTURAS_MAXIMAS:
+                relecturas += 1
+                metricas["relecturas"] += 1
+                posicion = ventana["scrollTop"]
+                continue
+            relecturas = 0
+
+            alto = ventana["clientHeight"] or 1
+            if ventana["scrollTop"] + alto >= ventana["scrollHeight"] - 1 and not nuevas:
+                return
+            siguiente = ventana["scrollTop"] + max(1, int(alto * (1 - solapamiento)))
+            if siguiente == posicion and not nuevas:
+                # El visor no avanza y no aparecen filas nuevas
+                return
+            posicion = min(siguiente, ventana["scrollHeight"])
+    finally:
+        metricas["segundos"] = round(time.perf_counter() - inicio, 3)
+
+
+def extraer_filas_virtuales(driver, esquema=None, clave=None, metricas=None):
+    """
+    Lee todas las filas de la página recorriendo el visor por tramos
+
+    Las filas se juntan en una sola FilasPagina para que el sink escriba la página
+    completa de una vez (el progreso de reanudación es por página).
+
+    Returns:
+        FilasPagina: Filas de la página sin duplicados (vacía si no hay ninguna)
+    """
+    valores = []
+    for filas in iterar_ventanas(driver, esquema, clave=clave, metricas=metricas):
+        esquema = filas.esquema
+        valores.extend(filas.valores)
+    if esquema is None:
+        esquema = EsquemaTabla([])
+    return FilasPagina(esquema, valores)
@@ -0,0 +1,47 @@
+import json
+
+import api_extractor
+from api_extractor import ClienteApiSlir, process_slir_code_api
+
+
+class RespuestaFalsa:
+    status = 200
+    data = json.dumps({"content": [], "totalPages": 1}).encode("utf-8")
+
+
+class HttpFalso:
+    def __init__(self):
+        self.urls = []
+
+    def request(self, metodo, url, headers=None):
+        self.urls.append(url)
+        return RespuestaFalsa()
+
+
+class ClienteFalso:
+    def __init__(self, filas):
+        self.filas = filas
+
+    def extraer(self, code):
+        return {"table_data": self.filas, "pages_processed": 1, "total_pages": 1, "total_rows": len(self.filas)}
+
+
+def test_el_codigo_se_escapa_en_la_url():
+    cliente = ClienteApiSlir(url_api="https://slir.test/api/{code}")
+    cliente.http = HttpFalso()
+    cliente.obtener_pagina("SLIR 1/2#3", 0)
+    assert cliente.http.urls == ["https://slir.test/api/SLIR%201%2F2%233?page=0&size=1000"]
+
+
+def test_fallo_al_guardar_el_csv_no_es_exito(tmp_path, monkeypatch):
+    # Una carpeta de salida que no existe hace fallar la escritura
+    monkeypatch.setattr(api_extractor, "obtener_directorio_salida", lambda: str(tmp_path / "no_existe"))
+    assert process_slir_code_api("SLIR1", ClienteFalso([{"a": "1"}])) is None
+
+
+def test_exito_con_el_csv_escrito(tmp_path, monkeypatch):
+    monkeypatch.setattr(api_extractor, "obtener_directorio_salida", lambda: str(tmp_path))
+    resultado = process_slir_code_api("SLIR1", ClienteFalso([{"a": "1"}]))
+    assert resultado["success"]
+    with open(resultado["csv_file"], encoding="utf-8-sig") as f:
+        assert f.read().splitlines() == ["a", "1"]
@@ -0,0 +1,40 @@
+import time
+
+import pytest
+
+from api_extractor import ClienteApiSlir
+from mock_slir_site import ServidorMock, generar_registros
+
+REGISTROS = generar_registros(23, 3)
+
+
+@pytest.mark.parametrize("primera_pagina", [0, 1])
+def test_extrae_todas_las_paginas_en_orden(primera_pagina):
+    with ServidorMock({"SLIR1": REGISTROS}, primera_pagina=primera_pagina) as servidor:
+        cliente = ClienteApiSlir(url_api=servidor.url_api, tam_pagina=5, hilos=4,
+                                 primera_pagina=primera_pagina)
+        datos = cliente.extraer("SLIR1")
+
+    assert (datos["total_pages"], datos["pages_processed"], datos["total_rows"]) == (5, 5, 23)
+    assert datos["table_data"] == REGISTROS
+    assert servidor.peticiones == 5
+
+
+def test_las_paginas_siguientes_se_piden_en_paralelo():
+    latencia = 0.2
+    with ServidorMock({"SLIR1": REGISTROS}, latencia=latencia) as servidor:
+        cliente = ClienteApiSlir(url_api=servidor.url_api, tam_pagina=5, hilos=4)
+        inicio = time.perf_counter()
+        datos = cliente.extraer("SLIR1")
+        duracion = time.perf_counter() - inicio
+
+    assert datos["table_data"] == REGISTROS
+    # La primera página y después las otras cuatro a la vez; en serie serían cinco esperas
+    assert duracion < 4 * latencia
+
+
+def test_una_sola_pagina():
+    with ServidorMock({"SLIR1": REGISTROS[:3]}) as servidor:
+        datos = ClienteApiSlir(url_api=servidor.url_api, tam_pagina=5).extraer("SLIR1")
+    assert (datos["total_pages"], datos["total_rows"]) == (1, 3)
+    assert servidor.peticiones == 1
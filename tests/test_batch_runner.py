@@ -0,0 +1,56 @@
+import pytest
+
+import batch_runner
+
+
+class PoolFalso:
+    """DriverPool sin navegador"""
+
+    def __init__(self, **opciones):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def precalentar(self):
+        pass
+
+    def metricas(self):
+        return {"tiempo_login_total": 0.0, "logins_realizados": 0, "sesiones_reutilizadas": 0}
+
+
+@pytest.fixture
+def sin_navegador(monkeypatch, tmp_path):
+    monkeypatch.setattr(batch_runner, "LOGS_DIR", str(tmp_path / "logs"))
+    monkeypatch.setattr(batch_runner, "DriverPool", PoolFalso)
+    monkeypatch.setattr(batch_runner, "preparar_perfiles_workers",
+                        lambda n, **opciones: [str(tmp_path / f"perfil{i}") for i in range(n)])
+
+
+def test_lote_vacio_no_prepara_perfiles(monkeypatch, tmp_path):
+    def no_llamar(*args, **kwargs):
+        raise AssertionError("no se deben preparar perfiles")
+
+    monkeypatch.setattr(batch_runner, "LOGS_DIR", str(tmp_path / "logs"))
+    monkeypatch.setattr(batch_runner, "preparar_perfiles_workers", no_llamar)
+    monkeypatch.setattr(batch_runner, "DriverPool", no_llamar)
+    informe = batch_runner.ejecutar_lote([])
+    assert informe["total"] == 0 and informe["workers"] == 0
+    assert informe["por_worker"] == {}
+
+
+def test_los_reintentos_reanudan_solo_la_salida_del_lote(monkeypatch, sin_navegador):
+    llamadas = []
+
+    def procesar(code, **opciones):
+        llamadas.append(opciones)
+        return {"success": len(llamadas) > 1, "error": "navegador"}
+
+    monkeypatch.setattr(batch_runner, "process_slir_code", procesar)
+    informe = batch_runner.ejecutar_lote(["SLIR1"], num_workers=1, reintentos=1)
+    assert informe["exitosos"] == 1 and informe["reintentos"] == 1
+    assert [o["reanudar"] for o in llamadas] == [False, True]
+    assert llamadas[0]["id_salida"] and llamadas[0]["id_salida"] == llamadas[1]["id_salida"]
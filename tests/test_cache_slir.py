@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import pytest
+
+import cache_slir
+from cache_slir import CacheSlir, hash_filas
+from esquema_tabla import EsquemaTabla, FilasPagina
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    """Hora controlada por el test"""
+    reloj = SimpleNamespace(ahora=1000.0)
+    monkeypatch.setattr(cache_slir, "time", SimpleNamespace(time=lambda: reloj.ahora))
+    return reloj
+
+
+def guardar(cache, code, hash_primera="h1", paginas=2):
+    hashes = {i: f"{hash_primera}-{i}" if i > 1 else hash_primera for i in range(1, paginas + 1)}
+    cache.guardar(code, paginas, 10 * paginas, hashes, {i: 10 for i in hashes}, f"{code}.csv")
+
+
+def test_sin_cambios_solo_con_la_misma_primera_pagina_y_paginas(tmp_path, reloj):
+    cache = CacheSlir(str(tmp_path / "cache.sqlite3"))
+    guardar(cache, "SLIR1")
+
+    assert cache.sin_cambios("SLIR1", 2, "h1")["fichero"] == "SLIR1.csv"
+    assert cache.sin_cambios("SLIR1", 3, "h1") is None
+    assert cache.sin_cambios("SLIR1", 2, "otro") is None
+    assert cache.sin_cambios("SLIR1", None, "h1") is None
+    assert cache.sin_cambios("SLIR2", 2, "h1") is None
+    assert cache.hashes_paginas("SLIR1") == {1: "h1", 2: "h1-2"}
+
+
+def test_las_entradas_caducan_tras_el_ttl(tmp_path, reloj):
+    cache = CacheSlir(str(tmp_path / "cache.sqlite3"), ttl=60)
+    guardar(cache, "SLIR1")
+    reloj.ahora += 59
+    assert cache.sin_cambios("SLIR1", 2, "h1") is not None
+    reloj.ahora += 2
+    assert cache.sin_cambios("SLIR1", 2, "h1") is None
+
+    assert cache.desalojar() == 1
+    assert cache.obtener("SLIR1") is None
+    assert cache.hashes_paginas("SLIR1") == {}
+
+
+def test_se_desalojan_los_usados_hace_mas_tiempo(tmp_path, reloj):
+    cache = CacheSlir(str(tmp_path / "cache.sqlite3"), max_codigos=2)
+    guardar(cache, "A")
+    reloj.ahora += 1
+    guardar(cache, "B")
+    reloj.ahora += 1
+    # Consultar A lo marca como usado: el menos usado pasa a ser B
+    assert cache.sin_cambios("A", 2, "h1") is not None
+    reloj.ahora += 1
+    guardar(cache, "C")
+
+    assert cache.obtener("B") is None
+    assert cache.obtener("A") and cache.obtener("C")
+    assert cache.hashes_paginas("B") == {}
+
+
+def test_la_huella_de_filas_compactas_es_la_de_sus_diccionarios():
+    filas = FilasPagina.desde_matriz(EsquemaTabla(["a", "b"]), [["1", "x"], ["2", "y"]])
+    assert hash_filas(filas) == hash_filas([{"a": "1", "b": "x"}, {"a": "2", "b": "y"}])
+    assert hash_filas(filas) != hash_filas([{"a": "1", "b": "x"}])
@@ -0,0 +1,104 @@
+import time
+
+import pytest
+
+import cola_trabajo
+from cola_trabajo import ColaMemoria, ColaSqlite
+from sinks import crear_sink
+
+
+@pytest.fixture(params=["sqlite", "memoria"])
+def crear_cola(request, tmp_path, monkeypatch):
+    # Sin espera entre reintentos para no tener que dormir en las pruebas
+    monkeypatch.setattr(cola_trabajo, "ESPERA_REINTENTO", 0)
+
+    def crear(max_intentos=3):
+        if request.param == "sqlite":
+            return ColaSqlite(str(tmp_path / "cola.sqlite3"), max_intentos=max_intentos, id_salida="c1")
+        return ColaMemoria(max_intentos=max_intentos, id_salida="c1")
+    return crear
+
+
+def estado_de(cola, code):
+    return next(t for t in cola.tareas() if t["code"] == code)
+
+
+def test_reserva_vencida_pasa_a_otro_worker(crear_cola):
+    cola = crear_cola()
+    cola.encolar(["A"])
+    tarea = cola.reservar("h1", "h1/0", visibilidad=0.05)
+    assert tarea.code == "A" and tarea.intentos == 1
+    # Mientras la reserva está vigente nadie más recibe el código
+    assert cola.reservar("h2", "h2/0") is None
+
+    time.sleep(0.1)
+    otra = cola.reservar("h2", "h2/0")
+    assert otra.code == "A" and otra.intentos == 2
+    # El primer worker ya no puede renovar ni publicar su resultado
+    assert not cola.renovar(tarea)
+    assert not cola.completar(tarea, {"total_rows": 1})
+    assert cola.completar(otra, {"total_rows": 5})
+    assert estado_de(cola, "A")["estado"] == "hecha"
+    assert estado_de(cola, "A")["worker"] == "h2/0"
+
+
+def test_renovar_mantiene_la_reserva(crear_cola):
+    cola = crear_cola()
+    cola.encolar(["A"])
+    tarea = cola.reservar("h1", "h1/0", visibilidad=0.05)
+    assert cola.renovar(tarea, visibilidad=60)
+    time.sleep(0.1)
+    assert cola.reservar("h2", "h2/0") is None
+
+
+def test_fallos_repetidos_van_a_la_cola_de_muertos(crear_cola):
+    cola = crear_cola(max_intentos=2)
+    cola.encolar(["A"])
+    assert cola.fallar(cola.reservar("h1", "h1/0"), "primero")
+    assert estado_de(cola, "A")["estado"] == "pendiente"
+    assert cola.fallar(cola.reservar("h1", "h1/0"), "segundo")
+
+    muerta = estado_de(cola, "A")
+    assert muerta["estado"] == "muerta" and muerta["error"] == "segundo"
+    assert cola.reservar("h1", "h1/0") is None
+    assert not cola.quedan()
+
+    assert cola.reactivar_muertas() == 1
+    tarea = cola.reservar("h1", "h1/0")
+    assert tarea.code == "A" and tarea.intentos == 1
+
+
+def test_reserva_vencida_en_el_ultimo_intento_va_a_muertos(crear_cola):
+    cola = crear_cola(max_intentos=1)
+    cola.encolar(["A"])
+    cola.reservar("h1", "h1/0", visibilidad=0.05)
+    time.sleep(0.1)
+    assert cola.reservar("h2", "h2/0") is None
+    muerta = estado_de(cola, "A")
+    assert muerta["estado"] == "muerta" and muerta["error"] == "Reserva vencida"
+
+
+def csv_a_medias(directorio, code, marca):
+    sink = crear_sink("csv", str(directorio), code, marca)
+    sink.escribir_pagina(1, [{"a": "1"}])
+    sink.cerrar(completo=False)
+    return sink.destino
+
+
+def test_reanudar_con_id_salida_solo_continua_su_fichero(tmp_path):
+    ajeno = csv_a_medias(tmp_path, "A", "20240101_000000")
+
+    sink = crear_sink("csv", str(tmp_path), "A", "20240102_000000", reanudar=True, id_salida="c1")
+    assert sink.destino != ajeno
+    assert sink.destino.endswith("slir_A_c1_data.csv")
+    assert sink.ultima_pagina == 0
+    sink.cerrar(completo=False)
+
+    sink = crear_sink("csv", str(tmp_path), "A", "20240103_000000", reanudar=True, id_salida="c1")
+    assert sink.destino.endswith("slir_A_c1_data.csv")
+    assert sink.ultima_pagina == 0
+
+    propio = csv_a_medias(tmp_path, "B", "c1")
+    sink = crear_sink("csv", str(tmp_path), "B", "20240104_000000", reanudar=True, id_salida="c1")
+    assert sink.destino == propio
+    assert sink.ultima_pagina == 1
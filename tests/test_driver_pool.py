@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import pytest
+from selenium.webdriver.common.by import By
+
+import driver_pool
+from driver_pool import DriverPool
+
+
+class DriverSpa:
+    """Página que tarda unas lecturas en pintar el botón de Login o la tabla"""
+
+    def __init__(self, pinta, lecturas_vacias=3):
+        self.pinta = pinta
+        self.lecturas_vacias = lecturas_vacias
+
+    def find_elements(self, by, selector):
+        if self.lecturas_vacias:
+            self.lecturas_vacias -= 1
+            return []
+        es_login = by == By.XPATH
+        return [object()] if (self.pinta == "login") == es_login else []
+
+
+@pytest.fixture
+def logins(monkeypatch):
+    hechos = []
+    monkeypatch.setattr(driver_pool, "navegar_a_codigo", lambda driver, code: 0.1)
+    monkeypatch.setattr(driver_pool, "completar_login",
+                        lambda driver, sesion_guardada=None: hechos.append(driver) or "login")
+    return hechos
+
+
+def test_sesion_caducada_con_login_tardio(logins):
+    pool = DriverPool()
+    sesion = SimpleNamespace(driver=DriverSpa("login"))
+    assert pool.navegar(sesion, "SLIR1") == 0.1
+    assert logins == [sesion.driver]
+    assert pool.logins_realizados == 1
+
+
+def test_sesion_iniciada_no_repite_el_login(logins):
+    pool = DriverPool()
+    assert pool.navegar(SimpleNamespace(driver=DriverSpa("tabla")), "SLIR1") == 0.1
+    assert logins == []
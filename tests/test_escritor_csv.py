@@ -0,0 +1,67 @@
+import csv
+import os
+
+from escritor_csv import SUFIJO_PROGRESO, EscritorCsvIncremental, buscar_csv_pendiente
+from esquema_tabla import EsquemaTabla, FilasPagina
+
+
+def leer(ruta):
+    with open(ruta, newline="", encoding="utf-8-sig") as f:
+        return list(csv.reader(f))
+
+
+def test_reanuda_tras_la_ultima_pagina_escrita(tmp_path):
+    ruta = str(tmp_path / "slir_X_1_data.csv")
+    escritor = EscritorCsvIncremental(ruta)
+    escritor.escribir_pagina(1, [{"a": "1", "b": "x"}])
+    escritor.escribir_pagina(2, [{"a": "2", "b": "y"}])
+    escritor.cerrar(completo=False)
+    # Restos de una página que no llegó a guardar su progreso
+    with open(ruta, "a", encoding="utf-8") as f:
+        f.write("3,incompleta\r\n")
+
+    assert buscar_csv_pendiente(str(tmp_path), "X") == ruta
+    escritor = EscritorCsvIncremental(ruta, reanudar=True)
+    assert (escritor.ultima_pagina, escritor.total_filas) == (2, 2)
+    escritor.escribir_pagina(3, [{"a": "3", "b": "z"}])
+    escritor.cerrar()
+
+    assert leer(ruta) == [["a", "b"], ["1", "x"], ["2", "y"], ["3", "z"]]
+    assert not os.path.exists(ruta + SUFIJO_PROGRESO)
+    assert buscar_csv_pendiente(str(tmp_path), "X") is None
+
+
+def test_sin_reanudar_empieza_de_cero(tmp_path):
+    ruta = str(tmp_path / "salida.csv")
+    escritor = EscritorCsvIncremental(ruta)
+    escritor.escribir_pagina(1, [{"a": "1"}])
+    escritor.cerrar(completo=False)
+
+    escritor = EscritorCsvIncremental(ruta)
+    assert escritor.ultima_pagina == 0
+    escritor.escribir_pagina(1, [{"a": "nuevo"}])
+    escritor.cerrar()
+    assert leer(ruta) == [["a"], ["nuevo"]]
+
+
+def test_columnas_nuevas_amplian_la_cabecera(tmp_path):
+    ruta = str(tmp_path / "salida.csv")
+    escritor = EscritorCsvIncremental(ruta)
+    escritor.escribir_pagina(1, [{"a": "1", "b": "x"}])
+    escritor.escribir_pagina(2, [{"a": "2", "c": "nuevo"}])
+    escritor.cerrar()
+
+    assert escritor.rehechos == 1
+    assert leer(ruta) == [["a", "b", "c"], ["1", "x", ""], ["2", "", "nuevo"]]
+
+
+def test_filas_compactas_con_celdas_de_mas(tmp_path):
+    ruta = str(tmp_path / "salida.csv")
+    esquema = EsquemaTabla(["a", "b"])
+    escritor = EscritorCsvIncremental(ruta)
+    escritor.escribir_pagina(1, FilasPagina.desde_matriz(esquema, [["1", "x"]]))
+    escritor.escribir_pagina(2, FilasPagina.desde_matriz(esquema, [["2", "y", "extra"], ["3"]]))
+    escritor.cerrar()
+
+    assert escritor.total_filas == 3
+    assert leer(ruta) == [["a", "b", "column_2"], ["1", "x", ""], ["2", "y", "extra"], ["3", "", ""]]
@@ -0,0 +1,33 @@
+import pytest
+
+import esperas
+
+
+@pytest.fixture(autouse=True)
+def esperas_limpias(monkeypatch):
+    monkeypatch.setattr(esperas, "_tiempos", {})
+    monkeypatch.setattr(esperas, "_completadas", {})
+    monkeypatch.setattr(esperas, "MUESTRAS_HISTOGRAMA", 50)
+
+
+def test_histograma_exacto_con_muestras_acotadas():
+    for i in range(1000):
+        esperas.registrar_espera("cambio_pagina", 0.01 if i % 2 else 2.0)
+
+    datos = esperas.histograma_esperas()["cambio_pagina"]
+    assert datos["n"] == 1000
+    assert datos["total"] == pytest.approx(500 * 0.01 + 500 * 2.0)
+    assert datos["max"] == 2.0
+    assert datos["cubos"]["<=0.05"] == 500
+    assert datos["cubos"]["<=2"] == 1000
+    assert datos["cubos"]["+Inf"] == 1000
+    assert len(esperas._tiempos["cambio_pagina"]["muestras"]) == 50
+    assert datos["p50"] in (0.01, 2.0)
+
+
+def test_las_agotadas_no_adaptan_los_tiempos():
+    esperas.registrar_espera("tabla_cargada", 0.2)
+    esperas.registrar_espera("tabla_cargada", 30.0, agotada=True)
+    assert esperas.percentil_espera("tabla_cargada", 95) == (1, 0.2)
+    assert esperas.histograma_esperas(reiniciar=True)["tabla_cargada"]["n"] == 2
+    assert esperas.histograma_esperas() == {}
@@ -0,0 +1,36 @@
+from esquema_tabla import EsquemaTabla, FilasPagina
+
+
+def test_filas_compactas_se_comportan_como_diccionarios():
+    esquema = EsquemaTabla(["a", "b"])
+    filas = FilasPagina.desde_matriz(esquema, [["1", "x"], ["", ""], ["2", "y", "extra"]])
+
+    # Las filas sin datos se omiten y las celdas de más amplían el esquema
+    assert len(filas) == 2 and filas
+    assert esquema.columnas == ["a", "b", "column_2"]
+    assert filas.columnas == ["a", "b", "column_2"]
+    assert filas[0] == {"a": "1", "b": "x"}
+    assert filas[1:] == [{"a": "2", "b": "y", "column_2": "extra"}]
+    assert filas.como_dicts() == [{"a": "1", "b": "x"}, {"a": "2", "b": "y", "column_2": "extra"}]
+    assert filas.por_columna() == {"a": ["1", "2"], "b": ["x", "y"], "column_2": [None, "extra"]}
+
+
+def test_pagina_vacia():
+    filas = FilasPagina.desde_matriz(EsquemaTabla(["a"]), [[""]])
+    assert not filas and filas.columnas == [] and filas.por_columna() == {}
+
+
+def test_la_firma_identifica_los_encabezados():
+    esquema = EsquemaTabla(["a", "b"])
+    assert esquema.coincide(["a", "b"])
+    assert not esquema.coincide(["a", "b", "c"])
+    # Con la firma no se confunden encabezados que contienen el separador de una unión simple
+    assert not EsquemaTabla(["a,b"]).coincide(["a", "b"])
+
+
+def test_encabezados_repetidos_no_son_compactos():
+    assert EsquemaTabla(["a", "b"]).unico
+    filas = FilasPagina.desde_matriz(EsquemaTabla(["a", "a"]), [["1", "2"]])
+    assert not filas.compacta
+    # Como en extract_table_rows, el diccionario se queda con la última celda
+    assert filas[0] == {"a": "2"}
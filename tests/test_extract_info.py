@@ -0,0 +1,42 @@
+import extract_info
+from politicas import Politica
+
+
+class PoliticaAnotada(Politica):
+    """Anota los puntos de espera por los que se le pregunta"""
+
+    def __init__(self):
+        super().__init__()
+        self.puntos = []
+
+    def timeout(self, punto, intento=1):
+        self.puntos.append(punto)
+        return 1.0
+
+
+class Boton:
+    def __init__(self, etiqueta):
+        self.etiqueta = etiqueta
+
+    def get_attribute(self, nombre):
+        return self.etiqueta
+
+
+class DriverPaginador:
+    """Tabla cargada con un paginador de tres botones"""
+
+    def find_element(self, by, selector):
+        return object()
+
+    def find_elements(self, by, selector):
+        if selector == "button[aria-label]":
+            return [Boton("1"), Boton("2"), Boton("3")]
+        return []
+
+
+def test_las_esperas_usan_la_politica_indicada():
+    politica = PoliticaAnotada()
+    driver = DriverPaginador()
+    extract_info.esperar_tabla(driver, politica=politica)
+    assert extract_info.get_total_pages(driver, politica=politica) == 3
+    assert politica.puntos == ["tabla_cargada", "paginador"]
@@ -0,0 +1,71 @@
+from paginacion import (MARGEN_TRANSICIONES, SCRIPT_ESTADO_PAGINADOR, es_ultima_pagina, limite_transiciones,
+                        maximizar_filas_por_pagina, ultima_pagina_segun)
+
+
+class DriverFalso:
+    """Devuelve, en orden, las lecturas del paginador indicadas (la última se repite)"""
+
+    def __init__(self, *lecturas):
+        self.lecturas = list(lecturas)
+        self.llamadas = 0
+
+    def execute_script(self, script, *args):
+        self.llamadas += 1
+        return self.lecturas.pop(0) if len(self.lecturas) > 1 else self.lecturas[0]
+
+
+def estado(hay_siguiente, boton_siguiente=True):
+    return {"actual": 1, "visibles": [1, 2], "hay_siguiente": hay_siguiente,
+            "boton_siguiente": boton_siguiente, "texto": ""}
+
+
+def test_ultima_solo_con_siguiente_deshabilitado():
+    assert ultima_pagina_segun(estado(False)) is True
+    assert ultima_pagina_segun(estado(True)) is False
+    assert ultima_pagina_segun(estado(False, boton_siguiente=False)) is None
+    assert ultima_pagina_segun(None) is None
+
+
+def test_paginador_ausente_no_es_la_ultima():
+    driver = DriverFalso(None)
+    assert es_ultima_pagina(driver, lecturas=3, pausa=0) is None
+    assert driver.llamadas == 3
+
+
+def test_paginador_ausente_se_vuelve_a_leer():
+    driver = DriverFalso(None, estado(True))
+    assert es_ultima_pagina(driver, lecturas=3, pausa=0) is False
+    driver = DriverFalso(None, None, estado(False))
+    assert es_ultima_pagina(driver, lecturas=3, pausa=0) is True
+
+
+def test_limite_transiciones_crece_con_la_distancia():
+    assert limite_transiciones(200) == 199 + MARGEN_TRANSICIONES
+    assert limite_transiciones(200, actual=150) == 50 + MARGEN_TRANSICIONES
+    assert limite_transiciones(3, actual=10) == 7 + MARGEN_TRANSICIONES
+
+
+class Desplegable:
+    text = "10"
+
+
+class DriverUnaPagina:
+    """Paginador de una sola página; anota los scripts que no son la lectura del estado"""
+
+    def __init__(self):
+        self.otros_scripts = []
+
+    def find_elements(self, by, selector):
+        return [Desplegable()]
+
+    def execute_script(self, script, *args):
+        if script == SCRIPT_ESTADO_PAGINADOR:
+            return estado(False)
+        self.otros_scripts.append(script)
+
+
+def test_no_se_maximizan_las_filas_si_cabe_en_una_pagina():
+    driver = DriverUnaPagina()
+    assert maximizar_filas_por_pagina(driver, wait_time=5) == 10
+    # Ni se abre el desplegable ni se espera un cambio de página que no va a llegar
+    assert driver.otros_scripts == []
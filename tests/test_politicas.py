@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from selenium.common.exceptions import InvalidSessionIdException
+
+from politicas import (Cortacircuitos, ErrorCdp, ErrorExtraccion, ErrorNavegador, ErrorTiempoAgotado, Politica,
+                       clasificar_error)
+
+
+def crear_cortacircuitos(pausa=0.05):
+    return Cortacircuitos(ventana=8, umbral_lento=0.9, umbral_abierto=0.5, pausa=pausa, pausa_maxima=1.0)
+
+
+def abrir(cortacircuitos):
+    for _ in range(8):
+        cortacircuitos.registrar(False)
+    assert cortacircuitos.estado == "abierto"
+
+
+def esperar_turno_en(cortacircuitos, limite=1.0):
+    """Llama a esperar_turno en un hilo; True si vuelve antes de limite segundos"""
+    hilo = threading.Thread(target=cortacircuitos.esperar_turno, daemon=True)
+    hilo.start()
+    hilo.join(limite)
+    return not hilo.is_alive()
+
+
+def test_se_abre_con_muchos_fallos():
+    cortacircuitos = crear_cortacircuitos()
+    for _ in range(4):
+        cortacircuitos.registrar(True)
+    assert cortacircuitos.estado == "cerrado"
+    abrir(cortacircuitos)
+    assert cortacircuitos.aperturas == 1
+
+
+def test_abierto_bloquea_hasta_la_pausa():
+    cortacircuitos = crear_cortacircuitos(pausa=0.3)
+    abrir(cortacircuitos)
+    inicio = time.monotonic()
+    cortacircuitos.esperar_turno()
+    assert time.monotonic() - inicio >= 0.25
+    assert cortacircuitos.estado == "semiabierto"
+
+
+def test_solo_pasa_una_prueba_en_semiabierto():
+    cortacircuitos = crear_cortacircuitos()
+    abrir(cortacircuitos)
+    cortacircuitos.esperar_turno()
+    assert not esperar_turno_en(cortacircuitos, limite=0.3)
+
+
+def test_prueba_correcta_cierra():
+    cortacircuitos = crear_cortacircuitos()
+    abrir(cortacircuitos)
+    turno = cortacircuitos.esperar_turno()
+    cortacircuitos.registrar(True, turno)
+    assert cortacircuitos.estado == "cerrado"
+    assert esperar_turno_en(cortacircuitos)
+
+
+def test_prueba_fallida_reabre_con_el_doble_de_pausa():
+    cortacircuitos = crear_cortacircuitos()
+    abrir(cortacircuitos)
+    turno = cortacircuitos.esperar_turno()
+    cortacircuitos.registrar(False, turno)
+    assert cortacircuitos.estado == "abierto"
+    assert cortacircuitos.aperturas == 2
+    assert cortacircuitos._pausa == pytest.approx(0.1)
+
+
+def test_solo_cuenta_el_resultado_de_la_prueba():
+    cortacircuitos = crear_cortacircuitos()
+    anterior = cortacircuitos.esperar_turno()
+    abrir(cortacircuitos)
+    prueba = cortacircuitos.esperar_turno()
+    # Una operación admitida antes de abrirse no decide el semiabierto
+    cortacircuitos.registrar(True, anterior)
+    assert cortacircuitos.estado == "semiabierto"
+    assert not esperar_turno_en(cortacircuitos, limite=0.2)
+    cortacircuitos.liberar_prueba(anterior)
+    assert cortacircuitos.estado == "semiabierto"
+    cortacircuitos.registrar(False, prueba)
+    assert cortacircuitos.estado == "abierto"
+
+
+def test_operacion_anterior_concurrente_con_la_prueba():
+    cortacircuitos = crear_cortacircuitos()
+    politica = Politica(max_intentos=1, cortacircuitos=cortacircuitos)
+    empezada, terminar_anterior = threading.Event(), threading.Event()
+    prueba_empezada, terminar_prueba = threading.Event(), threading.Event()
+
+    def anterior(intento):
+        empezada.set()
+        terminar_anterior.wait(5)
+        return "ok"
+
+    def prueba(intento):
+        prueba_empezada.set()
+        terminar_prueba.wait(5)
+        raise TimeoutError("sigue caído")
+
+    hilo_anterior = threading.Thread(target=politica.ejecutar, args=(anterior, "anterior"), daemon=True)
+    hilo_anterior.start()
+    assert empezada.wait(1)
+    abrir(cortacircuitos)
+    def ejecutar_prueba():
+        with pytest.raises(ErrorExtraccion):
+            politica.ejecutar(prueba, "prueba")
+
+    hilo_prueba = threading.Thread(target=ejecutar_prueba, daemon=True)
+    hilo_prueba.start()
+    assert prueba_empezada.wait(1)
+
+    # La operación anterior termina bien mientras la prueba sigue en curso: no cierra
+    terminar_anterior.set()
+    hilo_anterior.join(1)
+    assert cortacircuitos.estado == "semiabierto"
+
+    # El fallo de la prueba vuelve a abrir el circuito
+    terminar_prueba.set()
+    hilo_prueba.join(1)
+    assert cortacircuitos.estado == "abierto"
+    assert cortacircuitos.aperturas == 2
+
+
+def test_navegador_perdido_en_la_prueba_libera_el_turno():
+    cortacircuitos = crear_cortacircuitos()
+    abrir(cortacircuitos)
+    politica = Politica(max_intentos=1, cortacircuitos=cortacircuitos)
+
+    def operacion(intento):
+        raise InvalidSessionIdException("invalid session id")
+
+    with pytest.raises(ErrorNavegador):
+        politica.ejecutar(operacion, "prueba")
+    assert cortacircuitos.estado == "semiabierto"
+    assert esperar_turno_en(cortacircuitos)
+
+
+def test_interrupcion_en_la_prueba_libera_el_turno():
+    cortacircuitos = crear_cortacircuitos()
+    abrir(cortacircuitos)
+    politica = Politica(max_intentos=1, cortacircuitos=cortacircuitos)
+
+    def operacion(intento):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        politica.ejecutar(operacion, "prueba")
+    assert esperar_turno_en(cortacircuitos)
+
+
+def test_reintenta_errores_reintentables():
+    politica = Politica(max_intentos=3, espera_base=0.0)
+    intentos = []
+
+    def operacion(intento):
+        intentos.append(intento)
+        if intento < 3:
+            raise ErrorTiempoAgotado("lenta")
+        return "ok"
+
+    assert politica.ejecutar(operacion, "prueba") == "ok"
+    assert intentos == [1, 2, 3]
+
+
+def test_conexion_cdp_cerrada_es_navegador_perdido():
+    for mensaje in ("Conexión con DevTools cerrada: Connection to remote host was lost.",
+                    "Target closed", "No target with given id found"):
+        assert isinstance(clasificar_error(ErrorCdp(mensaje)), ErrorNavegador)
+    error = clasificar_error(ErrorCdp("Error en el script de la página: x is not defined"))
+    assert type(error) is ErrorExtraccion and error.reintentable
+
+
+def test_motor_cdp_no_reintenta_con_el_navegador_perdido():
+    politica = Politica(max_intentos=3, espera_base=0.0)
+    intentos = []
+
+    async def operacion(intento):
+        intentos.append(intento)
+        raise ErrorCdp("Conexión con DevTools cerrada: socket is already closed.")
+
+    with pytest.raises(ErrorNavegador):
+        asyncio.run(politica.ejecutar_async(operacion, "prueba"))
+    assert intentos == [1]
@@ -0,0 +1,94 @@
+import os
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import sinks
+from esquema_tabla import EsquemaTabla, FilasPagina
+
+
+def leer(formato, ruta):
+    sinks._comprobar_pyarrow()
+    if formato == "parquet":
+        return sinks.pq.read_table(ruta)
+    with sinks.pa.memory_map(ruta, "r") as fuente:
+        return sinks.pa_ipc.open_file(fuente).read_all()
+
+
+@pytest.mark.parametrize("formato", ["parquet", "arrow"])
+@pytest.mark.parametrize("compacta", [True, False])
+def test_ensanchar_tipo_conserva_el_texto_original(tmp_path, formato, compacta):
+    esquema = EsquemaTabla(["fecha", "importe", "cantidad"])
+
+    def pagina(matriz):
+        filas = FilasPagina.desde_matriz(esquema, matriz)
+        return filas if compacta else [dict(zip(esquema.columnas, fila)) for fila in matriz]
+
+    sink = sinks.crear_sink(formato, str(tmp_path), "SLIR1", "t")
+    sink.escribir_pagina(1, pagina([["31/01/2024", "1.50", "7"], ["01/02/2024", "2.25", "8"]]))
+    # La página 2 obliga a pasar fecha e importe a texto y cantidad a decimal
+    sink.escribir_pagina(2, pagina([["pendiente", "n/d", "9.5"]]))
+    sink.cerrar()
+
+    tabla = leer(formato, sink.destino)
+    assert sink.cambios_esquema == 1
+    assert tabla.column("fecha").to_pylist() == ["31/01/2024", "01/02/2024", "pendiente"]
+    assert tabla.column("importe").to_pylist() == ["1.50", "2.25", "n/d"]
+    assert tabla.column("cantidad").to_pylist() == [7.0, 8.0, 9.5]
+    assert os.listdir(tmp_path) == [os.path.basename(sink.destino)]
+
+
+def test_columna_nueva_en_pagina_posterior(tmp_path):
+    sink = sinks.crear_sink("parquet", str(tmp_path), "SLIR1", "t")
+    sink.escribir_pagina(1, [{"a": "1"}])
+    sink.escribir_pagina(2, [{"a": "2", "b": "01/02/2024"}])
+    sink.escribir_pagina(3, [{"a": "x", "b": "otra"}])
+    sink.cerrar()
+
+    tabla = leer("parquet", sink.destino)
+    assert tabla.column("a").to_pylist() == ["1", "2", "x"]
+    assert tabla.column("b").to_pylist() == [None, "01/02/2024", "otra"]
+
+
+def test_dataset_unifica_el_esquema_de_las_partes(tmp_path):
+    base = tmp_path / "dataset"
+    with sinks.DatasetParquet(str(base)) as dataset:
+        primero = sinks.crear_sink(dataset, None, "SLIR1", "t")
+        primero.escribir_pagina(1, [{"dia": "31/01/2024", "cantidad": "007"}])
+        # Otro código obliga a pasar ambas columnas a texto: se empieza otra parte
+        segundo = sinks.crear_sink(dataset, None, "SLIR2", "t")
+        segundo.escribir_pagina(1, [{"dia": "pendiente", "cantidad": "n/d", "nota": "x"}])
+
+    particiones = os.listdir(base)
+    assert len([p for p in particiones if p.startswith("fecha=")]) == 1
+    carpeta = base / next(p for p in particiones if p.startswith("fecha="))
+    # Los textos originales auxiliares no quedan en el dataset
+    assert sorted(f.startswith("part-") for f in os.listdir(carpeta)) == [True, True]
+
+    tabla = sinks.pq.read_table(str(base)).sort_by("code")
+    assert tabla.column("code").to_pylist() == ["SLIR1", "SLIR2"]
+    assert tabla.column("dia").to_pylist() == ["31/01/2024", "pendiente"]
+    assert tabla.column("cantidad").to_pylist() == ["007", "n/d"]
+    assert tabla.column("nota").to_pylist() == [None, "x"]
+    comun = sinks.pq.read_schema(str(base / "_common_metadata"))
+    for ruta in carpeta.iterdir():
+        assert sinks.pq.read_schema(str(ruta)).equals(comun)
+
+
+def test_dataset_fija_la_fecha_de_cada_codigo(tmp_path, monkeypatch):
+    # Arranque del dataset, primera página y segunda página
+    horas = iter([datetime(2024, 1, 31, 23, 58), datetime(2024, 1, 31, 23, 59), datetime(2024, 2, 1, 0, 1)])
+
+    class Reloj(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return next(horas)
+
+    monkeypatch.setattr(sinks, "datetime", Reloj)
+    with sinks.DatasetParquet(str(tmp_path)) as dataset:
+        sink = sinks.crear_sink(dataset, None, "SLIR1", "t")
+        sink.escribir_pagina(1, [{"a": "1"}])
+        sink.escribir_pagina(2, [{"a": "2"}])
+    assert sorted(p for p in os.listdir(tmp_path) if p.startswith("fecha=")) == ["fecha=2024-01-31"]
@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+import arranque
+import slir
+
+
+@pytest.fixture
+def resoluciones(monkeypatch):
+    """Navegadores cuyo driver se pidió resolver (sin llegar a Selenium Manager)"""
+    pedidos = []
+    monkeypatch.setattr(arranque, "resolver_driver", lambda navegador="edge", refrescar=False:
+                        pedidos.append(navegador))
+    yield pedidos
+    # Que ningún precalentamiento llegue al resolver real tras deshacer el parche
+    for hilo in threading.enumerate():
+        if hilo.name == "slir-precalentar":
+            hilo.join()
+
+
+def test_sin_codigos_no_se_busca_el_driver(tmp_path, resoluciones):
+    vacio = tmp_path / "codigos.txt"
+    vacio.write_text("\n", encoding="utf-8")
+    assert slir.main([str(vacio), "--dir-logs", str(tmp_path / "logs")]) == 2
+    assert resoluciones == []
+
+
+def test_metricas_en_la_carpeta_de_logs(tmp_path, monkeypatch, resoluciones):
+    class Parar(Exception):
+        pass
+
+    argumentos = {}
+
+    def ejecutar_lote(codigos, **kwargs):
+        argumentos.update(kwargs)
+        raise Parar
+
+    monkeypatch.setattr(slir, "ejecutar_lote", ejecutar_lote)
+    dir_logs = tmp_path / "logs"
+    with pytest.raises(Parar):
+        slir.main(["-c", "SLIR1", "--dir-logs", str(dir_logs), "--sin-sesion-guardada",
+                   "-m", str(tmp_path / "manifiesto.json")])
+    assert argumentos["ruta_metricas_jsonl"] == str(dir_logs / "metricas.jsonl")
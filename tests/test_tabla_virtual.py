@@ -0,0 +1,108 @@
+from tabla_virtual import extraer_filas_virtuales, iterar_ventanas
+
+ALTO_FILA = 24
+
+
+class VisorFalso:
+    """
+    Visor de scroll virtual que responde como SCRIPT_VENTANA_TABLA: solo entrega las
+    filas que caben en el visor (más un margen), sin aria-rowindex salvo que se pida
+    """
+
+    def __init__(self, headers, filas, alto_visor=72, margen=1, numerar=False, desplazable=True,
+                 vacias_pendientes=0):
+        self.headers = headers
+        self.filas = filas
+        self.alto_visor = alto_visor
+        self.margen = margen
+        self.numerar = numerar
+        self.desplazable = desplazable
+        self.vacias_pendientes = vacias_pendientes
+        self.lecturas = 0
+
+    def execute_async_script(self, script, firma, objetivo, espera_ms):
+        self.lecturas += 1
+        alto_total = len(self.filas) * ALTO_FILA
+        maximo = max(0, alto_total - self.alto_visor)
+        scroll = min(objetivo or 0, maximo) if self.desplazable else 0
+        if self.desplazable:
+            primera = max(0, scroll // ALTO_FILA - self.margen)
+            ultima = min(len(self.filas), -(-(scroll + self.alto_visor) // ALTO_FILA) + self.margen)
+        else:
+            primera, ultima = 0, len(self.filas)
+        rows = [list(fila) for fila in self.filas[primera:ultima]]
+        vacias = 0
+        if self.vacias_pendientes:
+            # La última fila del tramo aún no se ha pintado
+            self.vacias_pendientes -= 1
+            rows[-1] = [""] * len(rows[-1])
+            vacias = 1
+        return {
+            "headers": None if firma == "\x1f".join(self.headers) else self.headers,
+            "rows": rows,
+            "claves": [str(i + 1) if self.numerar else None for i in range(primera, ultima)],
+            "posiciones": [i * ALTO_FILA for i in range(primera, ultima)],
+            "vacias": vacias,
+            "virtual": self.desplazable,
+            "desplazable": self.desplazable,
+            "scrollTop": scroll,
+            "scrollHeight": alto_total if self.desplazable else 0,
+            "clientHeight": self.alto_visor if self.desplazable else 0,
+        }
+
+
+def filas_con_repetidas():
+    # Bloques de filas idénticas, algunos más largos que el visor
+    filas = []
+    for i in range(10):
+        filas.extend([("A", "1")] * (i % 4 + 1))
+        filas.append((f"B{i}", str(i)))
+    return filas
+
+
+def test_filas_identicas_no_se_fusionan():
+    filas = filas_con_repetidas()
+    metricas = {}
+    leidas = extraer_filas_virtuales(VisorFalso(["x", "y"], filas), metricas=metricas)
+    assert leidas.valores == filas
+    assert leidas.esquema.columnas == ["x", "y"]
+    # El solapamiento entre tramos sí se descarta
+    assert metricas["ventanas"] > 1 and metricas["duplicadas"] > 0
+
+
+def test_filas_numeradas_por_la_tabla():
+    filas = filas_con_repetidas()
+    assert extraer_filas_virtuales(VisorFalso(["x", "y"], filas, numerar=True)).valores == filas
+
+
+def test_sin_posiciones_se_conservan_las_repetidas_de_un_tramo():
+    class VisorSinPosiciones(VisorFalso):
+        def execute_async_script(self, *args):
+            ventana = super().execute_async_script(*args)
+            ventana["posiciones"] = None
+            return ventana
+
+    filas = [("A", "1")] * 3
+    visor = VisorSinPosiciones(["x", "y"], filas, desplazable=False)
+    assert extraer_filas_virtuales(visor).valores == filas
+
+
+def test_la_clave_indicada_descarta_las_repetidas():
+    filas = [("1", "a"), ("1", "b"), ("2", "c")]
+    visor = VisorFalso(["id", "v"], filas, desplazable=False)
+    assert extraer_filas_virtuales(visor, clave=["id"]).valores == [("1", "a"), ("2", "c")]
+
+
+def test_tabla_sin_visor_se_lee_una_vez():
+    filas = [("A", "1"), ("B", "2")]
+    visor = VisorFalso(["x", "y"], filas, desplazable=False)
+    assert [f.valores for f in iterar_ventanas(visor)] == [filas]
+    assert visor.lecturas == 1
+
+
+def test_tramo_sin_pintar_se_relee():
+    filas = [(f"F{i}", str(i)) for i in range(8)]
+    metricas = {}
+    visor = VisorFalso(["x", "y"], filas, vacias_pendientes=1)
+    assert extraer_filas_virtuales(visor, metricas=metricas).valores == filas
+    assert metricas["relecturas"] == 1